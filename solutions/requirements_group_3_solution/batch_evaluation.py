@@ -0,0 +1,133 @@
+"""
+Evaluation of many positions at once with NumPy, for analytics over large
+numbers of stored positions.
+
+Positions are encoded as in the solved positions file: one integer per cell,
+in cell number order, 0 for empty, 1 for X and 2 for O. A batch is a 2D array
+with one encoded position per row.
+
+NumPy is an optional dependency: these functions need it to be installed.
+"""
+
+from typing import Iterable, Optional, Tuple
+
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.lines import get_line_layout
+from solutions.requirements_group_3_solution.numpy_board import NUMPY_IS_AVAILABLE, np
+from solutions.requirements_group_3_solution.symmetry import CELL_CODES, get_position
+
+# Statuses of a position. The winning statuses match the code of the mark
+ONGOING = 0
+X_WINS = CELL_CODES["X"]
+O_WINS = CELL_CODES["O"]
+DRAW = 3
+
+NO_WINNING_LINE = -1
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def encode_boards(boards: Iterable[Board]) -> "np.ndarray":
+    """
+    Encode the positions on some boards as a batch.
+    :param boards: the boards to encode. They must all have the same shape.
+    :return: the batch, one row per board.
+    :raises ImportError: if NumPy is not installed.
+    """
+    _check_numpy_is_available()
+    return np.array(
+        [[CELL_CODES[content] for content in get_position(board)] for board in boards],
+        dtype=np.int8,
+    )
+
+
+def evaluate_positions(
+    positions: "np.ndarray",
+    column_count: int,
+    row_count: Optional[int] = None,
+    win_length: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Find the status and the winning line of every position of a batch.
+
+    Lines are the ones of Board._all_possible_lines_in_board, checked in the
+    same order, and the first complete one is the winning line. The cells of
+    a winning line are get_line_layout(...).lines[line_index].
+    :param positions: the batch of encoded positions, one per row.
+    :param column_count: the number of cells in each row of the board.
+    :param row_count: the number of rows of the board. Defaults to the column
+    count.
+    :param win_length: how many marks in a row are needed to win. Defaults to
+    the column count.
+    :param chunk_size: how many positions to evaluate at a time, which bounds
+    the memory used by the intermediate arrays.
+    :return: the status of every position, one of ONGOING, X_WINS, O_WINS and
+    DRAW, and the index of its winning line, NO_WINNING_LINE if it has none.
+    :raises ImportError: if NumPy is not installed.
+    :raises ValueError: if the positions don't have one column per cell.
+    """
+    _check_numpy_is_available()
+    row_count = column_count if row_count is None else row_count
+    win_length = column_count if win_length is None else win_length
+    layout = get_line_layout(
+        column_count=column_count, row_count=row_count, win_length=win_length
+    )
+
+    positions = np.asarray(positions)
+    if positions.ndim != 2 or positions.shape[1] != column_count * row_count:
+        raise ValueError(
+            f"Expected one column per cell of a {column_count}x{row_count} "
+            f"board, got an array of shape {positions.shape}."
+        )
+
+    line_cell_indices = np.array(layout.lines, dtype=np.intp) - 1
+    statuses = np.empty(len(positions), dtype=np.int8)
+    winning_lines = np.empty(len(positions), dtype=np.int32)
+
+    for chunk_start in range(0, len(positions), chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        statuses[chunk], winning_lines[chunk] = _evaluate_chunk(
+            positions[chunk], line_cell_indices
+        )
+
+    return statuses, winning_lines
+
+
+def _evaluate_chunk(
+    positions: "np.ndarray", line_cell_indices: "np.ndarray"
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Find the status and the winning line of every position of a chunk.
+    :param positions: the encoded positions, one per row.
+    :param line_cell_indices: the cell indices of every line, one per row.
+    :return: the statuses and the winning line indices.
+    """
+    # Shape (positions, lines, win length)
+    line_contents = positions[:, line_cell_indices]
+    first_contents = line_contents[:, :, 0]
+    complete_lines = (first_contents != 0) & (
+        line_contents == first_contents[:, :, np.newaxis]
+    ).all(axis=2)
+
+    has_winning_line = complete_lines.any(axis=1)
+    first_complete_lines = complete_lines.argmax(axis=1)
+    winning_codes = first_contents[np.arange(len(positions)), first_complete_lines]
+    board_is_full = (positions != 0).all(axis=1)
+
+    statuses = np.where(
+        has_winning_line,
+        winning_codes,
+        np.where(board_is_full, DRAW, ONGOING),
+    )
+    winning_lines = np.where(has_winning_line, first_complete_lines, NO_WINNING_LINE)
+    return statuses, winning_lines
+
+
+def _check_numpy_is_available() -> None:
+    """
+    Fail early with a clear message when NumPy is missing.
+    :return: None
+    :raises ImportError: if NumPy is not installed.
+    """
+    if not NUMPY_IS_AVAILABLE:
+        raise ImportError("Batch evaluation needs NumPy: pip install numpy")
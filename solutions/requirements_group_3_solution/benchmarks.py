@@ -0,0 +1,446 @@
+"""
+Benchmarks of the hot paths of the board, the renderer and whole matches,
+across board engines and sizes.
+"""
+
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from solutions.requirements_group_3_solution.match import BOARD_ENGINES
+from solutions.requirements_group_3_solution.rendering import (
+    BoardRenderer,
+    SpecificCellsFilter,
+)
+from solutions.requirements_group_3_solution.simulation import simulate
+
+DEFAULT_SIZES = (3, 4, 5, 7, 9, 11, 13, 15, 17, 19)
+DEFAULT_MAX_WIN_LENGTH = 5
+OPERATIONS_PER_ITERATION = 100
+RENDERS_PER_ITERATION = 10
+MATCHES_PER_ITERATION = 10
+SEEDS_TO_FIND_A_WIN = 50
+
+
+class BenchmarkResult:
+    """
+    The timing and memory figures of one benchmark.
+    """
+
+    # One argument per figure, all passed by keyword
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        engine: str,
+        size: int,
+        win_length: int,
+        operations: int,
+        seconds: float,
+        peak_memory_bytes: int,
+    ):
+        """
+        Receive the figures.
+        :param name: what was measured.
+        :param engine: the board engine used.
+        :param size: the size of the board.
+        :param win_length: how many marks in a row were needed to win.
+        :param operations: how many operations were timed.
+        :param seconds: how long all the operations took.
+        :param peak_memory_bytes: the peak memory allocated by one iteration.
+        """
+        self.name = name
+        self.engine = engine
+        self.size = size
+        self.win_length = win_length
+        self.operations = operations
+        self.seconds = seconds
+        self.peak_memory_bytes = peak_memory_bytes
+
+    @property
+    def operations_per_second(self) -> float:
+        """
+        Throughput of the operation.
+        :return: the number of operations per second.
+        """
+        if self.seconds == 0:
+            return 0.0
+        return self.operations / self.seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the result in a plain dict.
+        :return: the figures of the result.
+        """
+        return {
+            "name": self.name,
+            "engine": self.engine,
+            "size": self.size,
+            "win_length": self.win_length,
+            "operations": self.operations,
+            "seconds": self.seconds,
+            "operations_per_second": self.operations_per_second,
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
+
+
+def measure(
+    setup: Callable[[], Any], operation: Callable[[Any], int], min_time: float
+) -> Dict[str, Any]:
+    """
+    Run an operation repeatedly until enough time has been spent on it, timing
+    only the operation and not its setup.
+    :param setup: builds the state each iteration of the operation needs.
+    :param operation: takes that state, runs and returns how many operations
+    it did.
+    :param min_time: the least number of seconds to spend on the operation.
+    :return: the number of operations, the seconds they took and the peak
+    memory allocated by one iteration.
+    """
+    state = setup()
+    tracemalloc.start()
+    operation(state)
+    _, peak_memory_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    operations = 0
+    seconds = 0.0
+    while seconds < min_time:
+        state = setup()
+        start_time = time.perf_counter()
+        operations += operation(state)
+        seconds += time.perf_counter() - start_time
+
+    return {
+        "operations": operations,
+        "seconds": seconds,
+        "peak_memory_bytes": peak_memory_bytes,
+    }
+
+
+def find_move_sequence(engine: str, size: int, win_length: int, seed: int) -> List[int]:
+    """
+    Play a random match and record its moves.
+    :param engine: the board engine to use.
+    :param size: the size of the board.
+    :param win_length: how many marks in a row are needed to win.
+    :param seed: the seed of the random play.
+    :return: the number ids of the cells played, in order.
+    """
+    board = BOARD_ENGINES[engine](size=size, win_length=win_length)
+    cell_ids = list(range(board.first_cell_id, board.last_cell_id + 1))
+    random.Random(seed).shuffle(cell_ids)
+
+    moves = []
+    for move_index, cell_id in enumerate(cell_ids):
+        if board.there_is_winning_combo or board.there_is_stalemate:
+            break
+        board.write_mark_on_cell_if_empty(cell_id, "XO"[move_index % 2])
+        moves.append(cell_id)
+
+    return moves
+
+
+def measure_board_memory(engine: str, size: int, win_length: int) -> Dict[str, Any]:
+    """
+    Measure the memory that one board holds on to, empty and after the moves
+    of a random match. The line layout, which every board of a shape shares,
+    is built beforehand so it isn't counted.
+    :param engine: the board engine to use.
+    :param size: the size of the board.
+    :param win_length: how many marks in a row are needed to win.
+    :return: the bytes held by the empty board and by the played board.
+    """
+    board_class = BOARD_ENGINES[engine]
+    match_moves = find_move_sequence(engine, size, win_length, seed=0)
+
+    tracemalloc.start()
+    board = board_class(size=size, win_length=win_length)
+    empty_board_bytes, _ = tracemalloc.get_traced_memory()
+    for move_index, cell_id in enumerate(match_moves):
+        board.write_mark_on_cell_if_empty(cell_id, "XO"[move_index % 2])
+    played_board_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "engine": engine,
+        "size": size,
+        "win_length": win_length,
+        "empty_board_bytes": empty_board_bytes,
+        "played_board_bytes": played_board_bytes,
+    }
+
+
+def benchmark_engine(
+    engine: str, size: int, win_length: int, min_time: float
+) -> List[BenchmarkResult]:
+    """
+    Run every benchmark for one board engine and size. Benchmarks that need a
+    won board are skipped if random play doesn't produce one.
+    :param engine: the board engine to use.
+    :param size: the size of the board.
+    :param win_length: how many marks in a row are needed to win.
+    :param min_time: the least number of seconds to spend on each benchmark.
+    :return: the results of every benchmark.
+    """
+    results = []
+    for name, (setup, operation) in _build_benchmarks(engine, size, win_length).items():
+        figures = measure(setup, operation, min_time)
+        results.append(
+            BenchmarkResult(
+                name=name,
+                engine=engine,
+                size=size,
+                win_length=win_length,
+                **figures,
+            )
+        )
+
+    return results
+
+
+def _build_benchmarks(
+    engine: str, size: int, win_length: int
+) -> Dict[str, Tuple[Callable[[], Any], Callable[[Any], int]]]:
+    """
+    Build the setup and the operation of every benchmark for one board engine
+    and size.
+    :param engine: the board engine to use.
+    :param size: the size of the board.
+    :param win_length: how many marks in a row are needed to win.
+    :return: the setup and the operation of each benchmark, by name.
+    """
+    board_class = BOARD_ENGINES[engine]
+
+    def new_board():
+        return board_class(size=size, win_length=win_length)
+
+    def board_after(moves):
+        board = new_board()
+        for move_index, cell_id in enumerate(moves):
+            board.write_mark_on_cell_if_empty(cell_id, "XO"[move_index % 2])
+        return board
+
+    match_moves = find_move_sequence(engine, size, win_length, seed=0)
+    halfway = len(match_moves) // 2
+
+    def construct_boards(_):
+        for _ in range(0, OPERATIONS_PER_ITERATION):
+            new_board()
+        return OPERATIONS_PER_ITERATION
+
+    def write_match_moves(board):
+        for move_index, cell_id in enumerate(match_moves):
+            board.write_mark_on_cell_if_empty(cell_id, "XO"[move_index % 2])
+        return len(match_moves)
+
+    def check_winning_combo_after_writes(board):
+        # The status is worked out on write, so reading it alone would only
+        # time a cached attribute: every read follows a fresh write
+        for move_index in range(halfway, len(match_moves)):
+            board.write_mark_on_cell_if_empty(
+                match_moves[move_index], "XO"[move_index % 2]
+            )
+            _ = board.there_is_winning_combo
+        return len(match_moves) - halfway
+
+    def render_after_writes(renderer_and_board):
+        # Every render has the row of the move just written to render again
+        renderer, board = renderer_and_board
+        for move_index in range(halfway, len(match_moves)):
+            board.write_mark_on_cell_if_empty(
+                match_moves[move_index], "XO"[move_index % 2]
+            )
+            renderer.render()
+        return len(match_moves) - halfway
+
+    def play_matches(_):
+        return simulate(
+            MATCHES_PER_ITERATION,
+            board_size=size,
+            board_engine=engine,
+            win_length=win_length,
+            seed=0,
+        ).games_played
+
+    benchmarks = {
+        "board_construction": (lambda: None, construct_boards),
+        "write_mark_on_cell_if_empty": (new_board, write_match_moves),
+        "there_is_winning_combo": (
+            lambda: board_after(match_moves[:halfway]),
+            check_winning_combo_after_writes,
+        ),
+        "render": (
+            lambda: (BoardRenderer(board_after(match_moves[:halfway])), None),
+            _render,
+        ),
+        "render_after_write": (
+            lambda: _warm_renderer(board_after(match_moves[:halfway])),
+            render_after_writes,
+        ),
+        "headless_match": (lambda: None, play_matches),
+    }
+
+    winning_moves = _find_winning_move_sequence(engine, size, win_length)
+    if winning_moves is not None:
+        benchmarks["get_winning_cells"] = (
+            lambda: board_after(winning_moves),
+            _get_winning_cells,
+        )
+        benchmarks["render_with_filter"] = (
+            lambda: _renderer_and_filter(board_after(winning_moves)),
+            _render,
+        )
+
+    return benchmarks
+
+
+def _find_winning_move_sequence(
+    engine: str, size: int, win_length: int
+) -> Optional[List[int]]:
+    """
+    Play random matches until one of them is won, and record its moves.
+    :param engine: the board engine to use.
+    :param size: the size of the board.
+    :param win_length: how many marks in a row are needed to win.
+    :return: the number ids of the cells played, in order, or None if no
+    match was won.
+    """
+    for seed in range(0, SEEDS_TO_FIND_A_WIN):
+        moves = find_move_sequence(engine, size, win_length, seed=seed)
+        board = BOARD_ENGINES[engine](size=size, win_length=win_length)
+        for move_index, cell_id in enumerate(moves):
+            board.write_mark_on_cell_if_empty(cell_id, "XO"[move_index % 2])
+        if board.there_is_winning_combo:
+            return moves
+    return None
+
+
+def _get_winning_cells(board) -> int:
+    """
+    Get the winning cells of a won board a number of times.
+    :param board: a board with a winning line.
+    :return: how many times the cells were got.
+    """
+    for _ in range(0, OPERATIONS_PER_ITERATION):
+        board.get_winning_cells()
+    return OPERATIONS_PER_ITERATION
+
+
+def _render(renderer_and_filter: tuple) -> int:
+    """
+    Render a board a number of times, without changing it in between.
+    :param renderer_and_filter: the renderer and the filter to render with.
+    :return: how many renders were done.
+    """
+    renderer, active_filter = renderer_and_filter
+    for _ in range(0, RENDERS_PER_ITERATION):
+        renderer.render(active_filter)
+    return RENDERS_PER_ITERATION
+
+
+def _warm_renderer(board) -> tuple:
+    """
+    Build a renderer for a board and render it once, so its row cache is full.
+    :param board: the board to render.
+    :return: the renderer and the board.
+    """
+    renderer = BoardRenderer(board)
+    renderer.render()
+    return renderer, board
+
+
+def _renderer_and_filter(board) -> tuple:
+    """
+    Build a renderer for a won board and a filter that keeps the winning cells.
+    :param board: a board with a winning line.
+    :return: the renderer and the filter.
+    """
+    return (
+        BoardRenderer(board),
+        SpecificCellsFilter(cells_to_keep=board.get_winning_cells()),
+    )
+
+
+def run_suite(
+    sizes=DEFAULT_SIZES,
+    engines: Optional[List[str]] = None,
+    max_win_length: int = DEFAULT_MAX_WIN_LENGTH,
+    min_time: float = 0.2,
+) -> Dict[str, Any]:
+    """
+    Run every benchmark for every engine and size.
+    :param sizes: the board sizes to benchmark.
+    :param engines: the engines to benchmark. Defaults to all of them.
+    :param max_win_length: the win length on boards larger than it. Smaller
+    boards need a line across the whole board.
+    :param min_time: the least number of seconds to spend on each benchmark.
+    :return: the environment and the results, ready to be dumped as JSON.
+    """
+    engines = engines if engines is not None else sorted(BOARD_ENGINES)
+
+    results = []
+    board_memory = []
+    for engine in engines:
+        for size in sizes:
+            win_length = min(size, max_win_length)
+            results += benchmark_engine(engine, size, win_length, min_time)
+            board_memory.append(measure_board_memory(engine, size, win_length))
+
+    return {
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [result.as_dict() for result in results],
+        "board_memory": board_memory,
+    }
+
+
+def run_from_cli() -> None:
+    """
+    Run the suite with the options given on the command line and print the
+    results, as a table or as JSON.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark board hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument(
+        "--engines", nargs="+", choices=sorted(BOARD_ENGINES), default=None
+    )
+    parser.add_argument("--max-win-length", type=int, default=DEFAULT_MAX_WIN_LENGTH)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--json", help="Write the results as JSON to this path.")
+    arguments = parser.parse_args()
+
+    suite = run_suite(
+        sizes=arguments.sizes,
+        engines=arguments.engines,
+        max_win_length=arguments.max_win_length,
+        min_time=arguments.min_time,
+    )
+
+    if arguments.json:
+        with open(arguments.json, "w", encoding="utf-8") as file:
+            json.dump(suite, file, indent=2)
+
+    for result in suite["results"]:
+        print(
+            f"{result['engine']:>8} {result['size']:>2}x{result['size']:<2} "
+            f"k={result['win_length']:<2} {result['name']:<28} "
+            f"{result['operations_per_second']:>14,.0f} ops/s "
+            f"{result['peak_memory_bytes']:>10,} B peak"
+        )
+
+    for figures in suite["board_memory"]:
+        print(
+            f"{figures['engine']:>8} {figures['size']:>2}x{figures['size']:<2} "
+            f"k={figures['win_length']:<2} {'board_memory':<28} "
+            f"{figures['empty_board_bytes']:>10,} B empty "
+            f"{figures['played_board_bytes']:>10,} B played"
+        )
+
+
+if __name__ == "__main__":
+    run_from_cli()
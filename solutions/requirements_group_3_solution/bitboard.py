@@ -0,0 +1,405 @@
+"""
+A board engine that keeps the state of the board as one integer bitmask per
+mark, instead of a grid of cell objects.
+"""
+
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from solutions.requirements_group_3_solution.board import (
+    Cell,
+    CellGroup,
+    decode_position,
+)
+from solutions.requirements_group_3_solution.lines import get_line_layout
+from solutions.requirements_group_3_solution.zobrist import (
+    ZobristHashes,
+    get_zobrist_table,
+)
+
+BINARY_DIGITS_TO_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class BitBoard:
+    """
+    The state of the board, stored as bitmasks. Exposes the same public
+    methods as Board, so it can be used in its place.
+
+    Cell number n is represented by bit n - 1 of each mask.
+    """
+
+    # The masks, the cached status and the history are read on every move, so
+    # they are kept in flat slots rather than grouped behind another lookup.
+    # The public ones are the interface shared by every engine
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "column_count",
+        "row_count",
+        "shape",
+        "first_cell_id",
+        "last_cell_id",
+        "_full_mask",
+        "_occupied_mask",
+        "_masks_by_mark",
+        "win_length",
+        "_line_layout",
+        "_winning_mark",
+        "_winning_line_mask",
+        "_is_stalemate",
+        "row_versions",
+        "_move_history",
+        "_zobrist_table",
+        "_zobrist_hashes",
+    )
+
+    def __init__(
+        self,
+        size: int,
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ):
+        """
+        Generate a blank board with no contents. The masks of the lines are
+        shared with every other board of the same shape.
+        :param size: indicates the size of the board, as the number of cells in
+        each row.
+        :param win_length: how many marks in a row are needed to win. Defaults
+        to the size, so a line must span the whole board.
+        :param row_count: the number of rows, for non square boards. Defaults
+        to the size.
+        """
+        self.column_count = size
+        self.row_count = size if row_count is None else row_count
+        self.shape = (self.column_count, self.row_count)
+        self.first_cell_id = 1
+        self.last_cell_id = self.column_count * self.row_count
+        self._full_mask = (1 << self.last_cell_id) - 1
+        self._occupied_mask = 0
+        self._masks_by_mark: Dict[str, int] = {}
+        self.win_length = size if win_length is None else win_length
+        self._line_layout = get_line_layout(
+            column_count=self.column_count,
+            row_count=self.row_count,
+            win_length=self.win_length,
+        )
+        self._winning_mark: Optional[str] = None
+        self._winning_line_mask = 0
+        self._is_stalemate = False
+        self.row_versions = [0] * self.row_count
+        self._zobrist_table = get_zobrist_table(
+            column_count=self.column_count, row_count=self.row_count
+        )
+        self._zobrist_hashes = self._zobrist_table.empty_hashes
+        self._move_history: List[Tuple[int, str, Optional[str], int, bool]] = []
+
+    @classmethod
+    def from_moves(
+        cls,
+        size: int,
+        moves: Iterable[Tuple[int, str]],
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ) -> "BitBoard":
+        """
+        Build a board with a list of moves already played on it, working out
+        its status once, after the last move.
+        :param size: the number of cells in each row.
+        :param moves: the number id of each cell played, with its mark.
+        :param win_length: how many marks in a row are needed to win.
+        :param row_count: the number of rows, for non square boards.
+        :return: the board.
+        :raises ValueError: if a cell is played twice.
+        """
+        board = cls(size=size, win_length=win_length, row_count=row_count)
+        board.apply_moves(moves)
+        return board
+
+    @classmethod
+    def from_encoded(
+        cls,
+        size: int,
+        encoded_position: Sequence[int],
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ) -> "BitBoard":
+        """
+        Build a board with an encoded position on it, working out its status
+        once, after every mark is written.
+        :param size: the number of cells in each row.
+        :param encoded_position: the code of the contents of every cell, in
+        cell number order, as in CELL_CODES.
+        :param win_length: how many marks in a row are needed to win.
+        :param row_count: the number of rows, for non square boards.
+        :return: the board.
+        :raises ValueError: if the position doesn't have one code per cell, or
+        a code is not one of CELL_CODES.
+        """
+        board = cls(size=size, win_length=win_length, row_count=row_count)
+        if len(encoded_position) != board.last_cell_id:
+            raise ValueError(
+                f"A {board.column_count}x{board.row_count} position needs "
+                f"{board.last_cell_id} cells, not {len(encoded_position)}."
+            )
+        board.apply_moves(decode_position(encoded_position))
+        return board
+
+    def apply_moves(self, moves: Iterable[Tuple[int, str]]) -> None:
+        """
+        Write a batch of marks into the masks, working out the status of the
+        board once at the end instead of after every mark. Marks are written
+        even after a line is complete, and the history of moves is cleared,
+        as in Board.apply_moves.
+        :param moves: the number id of each cell to write into, with its mark.
+        :return: None
+        :raises ValueError: if a cell is not empty. The marks before it are
+        kept.
+        """
+        masks_by_mark = self._masks_by_mark
+        occupied_mask = self._occupied_mask
+        written_moves = []
+        try:
+            for cell_number, mark in moves:
+                if not self.first_cell_id <= cell_number <= self.last_cell_id:
+                    raise KeyError(cell_number)
+                cell_bit = 1 << (cell_number - 1)
+                if occupied_mask & cell_bit:
+                    raise ValueError("Can't write on cell, it has contents")
+                occupied_mask |= cell_bit
+                masks_by_mark[mark] = masks_by_mark.get(mark, 0) | cell_bit
+                written_moves.append((cell_number, mark))
+        finally:
+            self._occupied_mask = occupied_mask
+            self._update_status_after_batch(written_moves)
+
+    def write_mark_on_cell_if_empty(self, cell_number: int, mark: str) -> None:
+        """
+        Try to write a mark on a cell, raise an error if it's not empty.
+        :param cell_number: The number id of the cell to write into.
+        :param mark: The mark to write in the cell.
+        :return: None
+        """
+        self.make_move(cell_number, mark)
+
+    def make_move(self, cell_number: int, mark: str) -> None:
+        """
+        Write a mark on an empty cell, remembering what is needed to take it
+        back with unmake_move.
+        :param cell_number: The number id of the cell to write into.
+        :param mark: The mark to write in the cell.
+        :return: None
+        :raises ValueError: if the cell is not empty.
+        """
+        if not self.first_cell_id <= cell_number <= self.last_cell_id:
+            raise KeyError(cell_number)
+
+        cell_bit = 1 << (cell_number - 1)
+
+        if self._occupied_mask & cell_bit:
+            raise ValueError("Can't write on cell, it has contents")
+
+        self._move_history.append(
+            (
+                cell_number,
+                mark,
+                self._winning_mark,
+                self._winning_line_mask,
+                self._is_stalemate,
+            )
+        )
+        self._occupied_mask |= cell_bit
+        self._zobrist_hashes = self._zobrist_table.toggle(
+            self._zobrist_hashes, cell_number, mark
+        )
+        self.row_versions[(cell_number - 1) // self.column_count] += 1
+        mark_mask = self._masks_by_mark.get(mark, 0) | cell_bit
+        self._masks_by_mark[mark] = mark_mask
+
+        if self._winning_mark is None:
+            for line_mask in self._line_layout.line_masks_by_cell.get(cell_number, ()):
+                if mark_mask & line_mask == line_mask:
+                    self._winning_mark = mark
+                    self._winning_line_mask = line_mask
+                    break
+
+        self._is_stalemate = (
+            self._winning_mark is None and self._occupied_mask == self._full_mask
+        )
+
+    def unmake_move(self) -> int:
+        """
+        Take back the last move, restoring the masks and the cached status of
+        the board as they were before it, in constant time.
+        :return: the number id of the cell that was emptied.
+        :raises ValueError: if there are no moves to take back.
+        """
+        if not self._move_history:
+            raise ValueError("There are no moves to take back.")
+
+        (
+            cell_number,
+            mark,
+            self._winning_mark,
+            self._winning_line_mask,
+            self._is_stalemate,
+        ) = self._move_history.pop()
+        cell_bit = 1 << (cell_number - 1)
+        self._occupied_mask &= ~cell_bit
+        self._zobrist_hashes = self._zobrist_table.toggle(
+            self._zobrist_hashes, cell_number, mark
+        )
+        self._masks_by_mark[mark] &= ~cell_bit
+        # Versions only grow, so a render cached for another state is never reused
+        self.row_versions[(cell_number - 1) // self.column_count] += 1
+        return cell_number
+
+    @property
+    def there_is_winning_combo(self) -> bool:
+        """
+        Check if any line on the board is a winning combination of cells. The
+        result is worked out once per write, so this is just a lookup.
+        :return: True if there is a winning line of cells, False otherwise.
+        """
+        return self._winning_mark is not None
+
+    def get_winning_mark(self) -> str:
+        """
+        Find out what is the mark present in the winning group of cells.
+        :return: The winning mark.
+        :raises ValueError: if no winning combination is found on the board.
+        """
+        if self._winning_mark is None:
+            raise ValueError("There is no winning line in the board.")
+        return self._winning_mark
+
+    @property
+    def there_is_stalemate(self) -> bool:
+        """
+        Check if the board contains a stalemate situation.
+        :return: True if so, False otherwise.
+        """
+        return self._is_stalemate
+
+    def get_empty_cell_ids(self) -> List[int]:
+        """
+        Find the cells that can still be written on.
+        :return: the number ids of the empty cells, in ascending order.
+        """
+        empty_mask = self._full_mask & ~self._occupied_mask
+        # One byte per cell, lowest bit first, so the loop over the cells runs
+        # in C instead of testing each bit of a large integer in Python
+        empty_flags = (
+            format(empty_mask, "b").encode().translate(BINARY_DIGITS_TO_BYTES)[::-1]
+        )
+        return list(compress(range(1, len(empty_flags) + 1), empty_flags))
+
+    @property
+    def zobrist_hash(self) -> int:
+        """
+        The 64 bit Zobrist hash of the position, kept up to date on every move
+        and undo.
+        :return: the hash.
+        """
+        return self._zobrist_hashes[0]
+
+    @property
+    def symmetric_zobrist_hashes(self) -> ZobristHashes:
+        """
+        The Zobrist hashes of the position and of its rotations and
+        reflections, in the order of BoardSymmetries.transforms, so the first
+        one is zobrist_hash. They are kept up to date along with it.
+        :return: the hashes.
+        """
+        return self._zobrist_hashes
+
+    def get_winning_cells(self) -> CellGroup:
+        """
+        Return the winning group of cells found when the last mark was written.
+        :return: the winning group of cells.
+        :raises ValueError: if no winning combination is found on the board.
+        """
+        if self._winning_mark is None:
+            raise ValueError("There is no winning line in the board.")
+        # Only the cells of the line are built, walking its mask bit by bit
+        cells = []
+        line_mask = self._winning_line_mask
+        while line_mask:
+            cell_index = (line_mask & -line_mask).bit_length() - 1
+            line_mask &= line_mask - 1
+            cell = Cell(
+                x_position=cell_index // self.column_count,
+                y_position=cell_index % self.column_count,
+                number_id=cell_index + 1,
+            )
+            cell.contents = self._winning_mark
+            cells.append(cell)
+
+        return CellGroup(cells)
+
+    @property
+    def cells_by_position(self) -> List[CellGroup]:
+        """
+        Build the grid of cells that represents the current state of the board,
+        in the same layout Board uses.
+        :return: all the cells, correctly placed in a 2D grid.
+        """
+        return [self.get_row(row_index) for row_index in range(0, self.row_count)]
+
+    def get_row(self, row_index: int) -> CellGroup:
+        """
+        Build the cells of one row of the board.
+        :param row_index: the index of the row, from the top.
+        :return: the cells in the row.
+        """
+        row_contents = []
+        for cell_in_row in range(0, self.column_count):
+            number_id = row_index * self.column_count + cell_in_row + 1
+            cell = Cell(
+                x_position=row_index, y_position=cell_in_row, number_id=number_id
+            )
+            cell_bit = 1 << (number_id - 1)
+            for mark, mark_mask in self._masks_by_mark.items():
+                if mark_mask & cell_bit:
+                    cell.contents = mark
+                    break
+            row_contents.append(cell)
+
+        return CellGroup(row_contents)
+
+    def _update_status_after_batch(self, written_moves: List[Tuple[int, str]]) -> None:
+        """
+        Update the hashes, versions, history and cached status of the board
+        after a batch of marks has been written, checking the lines through
+        the written cells in layout order.
+        :param written_moves: the number id of each cell written, with its mark.
+        :return: None
+        """
+        zobrist_hashes = self._zobrist_hashes
+        for cell_number, mark in written_moves:
+            zobrist_hashes = self._zobrist_table.toggle(
+                zobrist_hashes, cell_number, mark
+            )
+            self.row_versions[(cell_number - 1) // self.column_count] += 1
+        self._zobrist_hashes = zobrist_hashes
+        self._move_history.clear()
+
+        if self._winning_mark is None:
+            lines_by_cell = self._line_layout.lines_by_cell
+            line_indexes = {
+                line_index
+                for cell_number, _ in written_moves
+                for line_index in lines_by_cell.get(cell_number, ())
+            }
+            for line_index in sorted(line_indexes):
+                line_mask = self._line_layout.line_masks[line_index]
+                for mark, mark_mask in self._masks_by_mark.items():
+                    if mark_mask & line_mask == line_mask:
+                        self._winning_mark = mark
+                        self._winning_line_mask = line_mask
+                        break
+                if self._winning_mark is not None:
+                    break
+
+        self._is_stalemate = (
+            self._winning_mark is None and self._occupied_mask == self._full_mask
+        )
@@ -2,7 +2,38 @@
 Classes related to the state of the board and the cells contained in it.
 """
 
-from typing import Dict, List, Set
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from solutions.requirements_group_3_solution.lines import get_line_layout
+from solutions.requirements_group_3_solution.symmetry import CELL_CODES
+from solutions.requirements_group_3_solution.zobrist import (
+    ZobristHashes,
+    get_zobrist_table,
+)
+
+MARKS_BY_CELL_CODE = {code: mark for mark, code in CELL_CODES.items() if code}
+
+
+def decode_position(encoded_position: Sequence[int]) -> List[Tuple[int, str]]:
+    """
+    Turn an encoded position into the moves that write its marks.
+    :param encoded_position: the code of the contents of every cell, in cell
+    number order, as in CELL_CODES.
+    :return: the number id of every marked cell, with its mark.
+    :raises ValueError: if a code is not one of CELL_CODES.
+    """
+    moves = []
+    for cell_number, code in enumerate(encoded_position, start=1):
+        if not code:
+            continue
+        try:
+            moves.append((cell_number, MARKS_BY_CELL_CODE[code]))
+        except KeyError:
+            raise ValueError(
+                f"Cell {cell_number} has the code {code}, which is not one of "
+                f"{sorted(CELL_CODES.values())}."
+            ) from None
+    return moves
 
 
 class Cell:
@@ -10,6 +41,8 @@ class Cell:
     The state of a cell within the board.
     """
 
+    __slots__ = ("x_position", "y_position", "number_id", "contents")
+
     def __init__(self, x_position: int, y_position: int, number_id: int):
         """
         Set initial state.
@@ -50,12 +83,15 @@ class CellGroup:
     A group of cells.
     """
 
+    __slots__ = ("_cells", "_cell_ids")
+
     def __init__(self, cells: List[Cell]):
         """
         Receive cells.
         :param cells: The cells that form the group.
         """
         self._cells = cells
+        self._cell_ids: Optional[FrozenSet[int]] = None
 
     @property
     def all_cells_are_empty(self) -> bool:
@@ -113,15 +149,17 @@ class CellGroup:
 
     def __contains__(self, item: Cell) -> bool:
         """
-        Checks whether a cell is in the group.
+        Checks whether a cell is in the group. The number ids of the cells are
+        gathered in a set the first time, so checks take constant time.
         :param item: the cell that may be in the group.
         :return: true if the cell is in the group, false otherwise.
         """
+        if not isinstance(item, Cell):
+            return False
 
-        for cell in self:
-            if cell == item:
-                return True
-        return False
+        if self._cell_ids is None:
+            self._cell_ids = frozenset(cell.number_id for cell in self._cells)
+        return item.number_id in self._cell_ids
 
 
 class Board:
@@ -130,19 +168,145 @@ class Board:
     contents.
     """
 
-    def __init__(self, size: int):
+    # The shape, the cells, the cached status and the history are read on every
+    # move, so they are kept in flat slots rather than grouped behind another
+    # lookup. The public ones are the interface shared by every engine
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "column_count",
+        "row_count",
+        "shape",
+        "first_cell_id",
+        "last_cell_id",
+        "win_length",
+        "_line_layout",
+        "cells_by_position",
+        "_cells_by_number",
+        "_marked_cells_count",
+        "_winning_line",
+        "_is_stalemate",
+        "row_versions",
+        "_move_history",
+        "_zobrist_table",
+        "_zobrist_hashes",
+    )
+
+    def __init__(
+        self,
+        size: int,
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ):
         """
         Generate a blank board with no contents and make an internal data
-        structure to keep the cells by their number id.
-        :param size: indicates the size of the board.
+        structure to keep the cells by their number id. The layout of the lines
+        is shared with every other board of the same shape.
+        :param size: indicates the size of the board, as the number of cells in
+        each row.
+        :param win_length: how many marks in a row are needed to win. Defaults
+        to the size, so a line must span the whole board.
+        :param row_count: the number of rows, for non square boards. Defaults
+        to the size.
         """
         self.column_count = size
-        self.row_count = size
+        self.row_count = size if row_count is None else row_count
         self.shape = (self.column_count, self.row_count)
         self.first_cell_id = 1
         self.last_cell_id = self.column_count * self.row_count
+        self.win_length = size if win_length is None else win_length
+        self._line_layout = get_line_layout(
+            column_count=self.column_count,
+            row_count=self.row_count,
+            win_length=self.win_length,
+        )
         self.cells_by_position = self._generate_empty_board()
         self._cells_by_number = self._structure_cells_by_number(self.cells_by_position)
+        self._marked_cells_count = 0
+        self._winning_line: Optional[CellGroup] = None
+        self._is_stalemate = False
+        self.row_versions = [0] * self.row_count
+        self._zobrist_table = get_zobrist_table(
+            column_count=self.column_count, row_count=self.row_count
+        )
+        self._zobrist_hashes = self._zobrist_table.empty_hashes
+        self._move_history: List[Tuple[Cell, Optional[CellGroup], bool]] = []
+
+    @classmethod
+    def from_moves(
+        cls,
+        size: int,
+        moves: Iterable[Tuple[int, str]],
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ) -> "Board":
+        """
+        Build a board with a list of moves already played on it, working out
+        its status once, after the last move.
+        :param size: the number of cells in each row.
+        :param moves: the number id of each cell played, with its mark.
+        :param win_length: how many marks in a row are needed to win.
+        :param row_count: the number of rows, for non square boards.
+        :return: the board.
+        :raises ValueError: if a cell is played twice.
+        """
+        board = cls(size=size, win_length=win_length, row_count=row_count)
+        board.apply_moves(moves)
+        return board
+
+    @classmethod
+    def from_encoded(
+        cls,
+        size: int,
+        encoded_position: Sequence[int],
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ) -> "Board":
+        """
+        Build a board with an encoded position on it, working out its status
+        once, after every mark is written.
+        :param size: the number of cells in each row.
+        :param encoded_position: the code of the contents of every cell, in
+        cell number order, as in CELL_CODES. A row of an array of encoded
+        positions can be given as is.
+        :param win_length: how many marks in a row are needed to win.
+        :param row_count: the number of rows, for non square boards.
+        :return: the board.
+        :raises ValueError: if the position doesn't have one code per cell, or
+        a code is not one of CELL_CODES.
+        """
+        board = cls(size=size, win_length=win_length, row_count=row_count)
+        if len(encoded_position) != board.last_cell_id:
+            raise ValueError(
+                f"A {board.column_count}x{board.row_count} position needs "
+                f"{board.last_cell_id} cells, not {len(encoded_position)}."
+            )
+        board.apply_moves(decode_position(encoded_position))
+        return board
+
+    def apply_moves(self, moves: Iterable[Tuple[int, str]]) -> None:
+        """
+        Write a batch of marks, working out the status of the board once at
+        the end instead of after every mark. Marks are written even after a
+        line is complete, so a position loaded this way is taken as it is.
+        Moves applied in a batch can't be taken back, so the history of moves
+        is cleared.
+        :param moves: the number id of each cell to write into, with its mark.
+        :return: None
+        :raises ValueError: if a cell is not empty. The marks before it are
+        kept.
+        """
+        cells_by_number = self._cells_by_number
+        written_cells = []
+        try:
+            for cell_number, mark in moves:
+                target_cell = cells_by_number[cell_number]
+                if target_cell.contents is not None:
+                    raise ValueError("Can't write on cell, it has contents")
+                target_cell.contents = mark
+                written_cells.append(target_cell)
+        finally:
+            self._update_status_after_batch(written_cells)
 
     def write_mark_on_cell_if_empty(self, cell_number: int, mark: str) -> None:
         """
@@ -151,24 +315,58 @@ class Board:
         :param mark: The mark to write in the cell.
         :return: None
         """
+        self.make_move(cell_number, mark)
+
+    def make_move(self, cell_number: int, mark: str) -> None:
+        """
+        Write a mark on an empty cell, remembering what is needed to take it
+        back with unmake_move.
+        :param cell_number: The number id of the cell to write into.
+        :param mark: The mark to write in the cell.
+        :return: None
+        :raises ValueError: if the cell is not empty.
+        """
         target_cell = self._cells_by_number[cell_number]
 
         if not target_cell.is_empty:
             raise ValueError("Can't write on cell, it has contents")
 
+        self._move_history.append((target_cell, self._winning_line, self._is_stalemate))
         self._write_mark_on_cell(cell=target_cell, mark=mark)
+        self._zobrist_hashes = self._zobrist_table.toggle(
+            self._zobrist_hashes, cell_number, mark
+        )
+        self.row_versions[target_cell.x_position] += 1
+        self._update_status_after_write(target_cell)
+
+    def unmake_move(self) -> int:
+        """
+        Take back the last move, restoring the cell and the cached status of
+        the board as they were before it, in constant time.
+        :return: the number id of the cell that was emptied.
+        :raises ValueError: if there are no moves to take back.
+        """
+        if not self._move_history:
+            raise ValueError("There are no moves to take back.")
+
+        target_cell, self._winning_line, self._is_stalemate = self._move_history.pop()
+        self._zobrist_hashes = self._zobrist_table.toggle(
+            self._zobrist_hashes, target_cell.number_id, target_cell.contents
+        )
+        target_cell.contents = None
+        self._marked_cells_count -= 1
+        # Versions only grow, so a render cached for another state is never reused
+        self.row_versions[target_cell.x_position] += 1
+        return target_cell.number_id
 
     @property
     def there_is_winning_combo(self) -> bool:
         """
-        Check all the lines on the board to find any winning combination of
-        cells.
+        Check if any line on the board is a winning combination of cells. The
+        result is worked out once per write, so this is just a lookup.
         :return: True if there is a winning line of cells, False otherwise.
         """
-        for line in self._all_possible_lines_in_board:
-            if self._group_of_cells_is_winning_combo(line):
-                return True
-        return False
+        return self._winning_line is not None
 
     def get_winning_mark(self) -> str:
         """
@@ -188,7 +386,45 @@ class Board:
         Check if the board contains a stalemate situation.
         :return: True if so, False otherwise.
         """
-        return not self.there_is_winning_combo and self._all_cells_have_marks
+        return self._is_stalemate
+
+    def get_row(self, row_index: int) -> CellGroup:
+        """
+        Get the cells of one row of the board.
+        :param row_index: the index of the row, from the top.
+        :return: the cells in the row.
+        """
+        return self.cells_by_position[row_index]
+
+    def get_empty_cell_ids(self) -> List[int]:
+        """
+        Find the cells that can still be written on.
+        :return: the number ids of the empty cells, in ascending order.
+        """
+        return [
+            number_id
+            for number_id, cell in self._cells_by_number.items()
+            if cell.is_empty
+        ]
+
+    @property
+    def zobrist_hash(self) -> int:
+        """
+        The 64 bit Zobrist hash of the position, kept up to date on every move
+        and undo.
+        :return: the hash.
+        """
+        return self._zobrist_hashes[0]
+
+    @property
+    def symmetric_zobrist_hashes(self) -> ZobristHashes:
+        """
+        The Zobrist hashes of the position and of its rotations and
+        reflections, in the order of BoardSymmetries.transforms, so the first
+        one is zobrist_hash. They are kept up to date along with it.
+        :return: the hashes.
+        """
+        return self._zobrist_hashes
 
     @property
     def _all_cells_have_marks(self) -> bool:
@@ -196,7 +432,70 @@ class Board:
         Check if all cells in the board have contents.
         :return: True if so, False otherwise.
         """
-        return all((not cell.is_empty for cell in self._cells_by_number.values()))
+        return self._marked_cells_count == len(self._cells_by_number)
+
+    def _update_status_after_write(self, written_cell: Cell) -> None:
+        """
+        Update the cached status of the board after a mark has been written.
+        Only the lines that pass through the written cell can have become
+        winning combinations, so those are the only ones checked.
+        :param written_cell: the cell that was just written.
+        :return: None
+        """
+        self._marked_cells_count += 1
+
+        if self._winning_line is None:
+            for line in self._get_lines_through_cell(written_cell):
+                if self._group_of_cells_is_winning_combo(line):
+                    self._winning_line = line
+                    break
+
+        self._is_stalemate = self._winning_line is None and self._all_cells_have_marks
+
+    def _update_status_after_batch(self, written_cells: List[Cell]) -> None:
+        """
+        Update the hashes, versions, history and cached status of the board
+        after a batch of marks has been written. The lines through the written
+        cells are checked in layout order, so the winning line found doesn't
+        depend on the order of the moves.
+        :param written_cells: the cells that were just written.
+        :return: None
+        """
+        zobrist_hashes = self._zobrist_hashes
+        for cell in written_cells:
+            zobrist_hashes = self._zobrist_table.toggle(
+                zobrist_hashes, cell.number_id, cell.contents
+            )
+            self.row_versions[cell.x_position] += 1
+        self._zobrist_hashes = zobrist_hashes
+        self._marked_cells_count += len(written_cells)
+        self._move_history.clear()
+
+        if self._winning_line is None:
+            lines_by_cell = self._line_layout.lines_by_cell
+            line_indexes = {
+                line_index
+                for cell in written_cells
+                for line_index in lines_by_cell.get(cell.number_id, ())
+            }
+            for line_index in sorted(line_indexes):
+                line = self._get_cells_in_line(line_index)
+                if self._group_of_cells_is_winning_combo(line):
+                    self._winning_line = line
+                    break
+
+        self._is_stalemate = self._winning_line is None and self._all_cells_have_marks
+
+    def _get_lines_through_cell(self, cell: Cell) -> List[CellGroup]:
+        """
+        Get the lines on the board that contain a given cell.
+        :param cell: the cell of interest.
+        :return: the lines that pass through the cell.
+        """
+        return [
+            self._get_cells_in_line(line_index)
+            for line_index in self._line_layout.lines_by_cell.get(cell.number_id, ())
+        ]
 
     @staticmethod
     def _write_mark_on_cell(cell: Cell, mark: str) -> None:
@@ -217,10 +516,10 @@ class Board:
         cells_by_position = []
 
         generated_cells_counter = 1
-        for row in range(0, self.shape[0]):
+        for row in range(0, self.row_count):
             row_contents = self._generate_row_of_cells(generated_cells_counter, row)
             cells_by_position.append(row_contents)
-            generated_cells_counter += self.row_count
+            generated_cells_counter += self.column_count
 
         return cells_by_position
 
@@ -235,7 +534,7 @@ class Board:
         :return: a row of empty cells.
         """
         row_contents = []
-        for cell_in_row in range(0, self.row_count):
+        for cell_in_row in range(0, self.column_count):
             row_contents.append(
                 Cell(
                     x_position=row_index,
@@ -262,135 +561,16 @@ class Board:
 
         return cells_by_number
 
-    def _there_is_vertical_winning_combo(self) -> bool:
-        """
-        Check if there is any vertical winning combination.
-        :return: True if so, False otherwise.
+    def _get_cells_in_line(self, line_index: int) -> CellGroup:
         """
-        for column_index in range(0, self.column_count):
-            if self._column_has_winning_combo(column_index):
-                return True
-        return False
-
-    def _there_is_horizontal_winning_combo(self) -> bool:
-        """
-        Check if there is any horizontal winning combination.
-        :return: True if so, False otherwise.
-        """
-        for row_index in range(0, self.row_count):
-            if self._row_has_winning_combo(row_index):
-                return True
-        return False
-
-    def _there_is_diagonal_winning_combo(self) -> bool:
-        """
-        Check if there is any diagonal winning combination.
-        :return: True if so, False otherwise.
-        """
-        for diagonal_index in (1, 2):  # There are 2 diagonals
-            if self._diagonal_has_winning_combo(diagonal_index):
-                return True
-        return False
-
-    def _column_has_winning_combo(self, column_index: int) -> bool:
-        """
-        Check if a specific column, selected by index, has a winning
-        combination.
-        :param column_index: the index of the column to check.
-        :return: True if so, False otherwise.
-        """
-        cells_to_check = self._get_cells_in_line("vertical", index=column_index)
-        return self._group_of_cells_is_winning_combo(cells_to_check)
-
-    def _row_has_winning_combo(self, row_index: int) -> bool:
-        """
-        Check if a specific row, selected by index, has a winning
-        combination.
-        :param row_index: the index of the row to check.
-        :return: True if so, False otherwise.
-        """
-        cells_to_check = self._get_cells_in_line("horizontal", index=row_index)
-        return self._group_of_cells_is_winning_combo(cells_to_check)
-
-    def _diagonal_has_winning_combo(self, diagonal_index: int):
-        """
-        Check if a specific diagonal, selected by index, has a winning
-        combination.
-        :param diagonal_index: the index of the diagonal to check.
-        :return: True if so, False otherwise.
-        """
-        cells_to_check = self._get_cells_in_line("diagonal", index=diagonal_index)
-        return self._group_of_cells_is_winning_combo(cells_to_check)
-
-    def _get_cells_in_line(self, way: str, index: int) -> CellGroup:
-        """
-        Fetch the group of cells that exist in a line.
-        :param way: str indicating if a column, row or diagonal should be
-        fetched.
-        :param index: the index of the line.
+        Fetch the group of cells that exist in a line of the line layout.
+        :param line_index: the index of the line in the layout.
         :return: the cells in the specified line.
         """
-        ways_to_functions_mapping = {
-            "horizontal": self._get_cells_in_column,
-            "vertical": self._get_cells_in_row,
-            "diagonal": self._get_cells_in_diagonal,
-        }
-
-        cell_getter_function = ways_to_functions_mapping[way]
-
-        return cell_getter_function(index)
-
-    def _get_cells_in_column(self, column_index: int) -> CellGroup:
-        """
-        Get the group of cells that compose a column.
-        :param column_index: the column to get the cells from.
-        :return: the cells in that column.
-        """
-        return CellGroup(
-            cells=[
-                self.cells_by_position[column_index][row_index]
-                for row_index in range(0, self.row_count)
-            ]
-        )
-
-    def _get_cells_in_row(self, row_index: int) -> CellGroup:
-        """
-        Get the group of cells that compose a row.
-        :param row_index: the row to get the cells from.
-        :return: the cells in that row.
-        """
         return CellGroup(
             cells=[
-                self.cells_by_position[column_index][row_index]
-                for column_index in range(0, self.column_count)
-            ]
-        )
-
-    def _get_cells_in_diagonal(self, diagonal_index: int) -> CellGroup:
-        """
-        Get the group of cells that compose a diagonal.
-        :param diagonal_index: the diagonal to get the cells from.
-        :return: the cells in that diagonal.
-        """
-        positions_by_index = {
-            1: {  # Iterate top-bottom, left-right
-                "x_positions": range(0, self.column_count),
-                "y_positions": range(0, self.row_count),
-            },
-            2: {  # Iterate top-bottom, right-left
-                "x_positions": range(self.column_count - 1, -1, -1),
-                "y_positions": range(0, self.row_count),
-            },
-        }
-
-        positions_to_use = positions_by_index[diagonal_index]
-
-        return CellGroup(
-            cells=[
-                self.cells_by_position[column_index][row_index]
-                for column_index, row_index in zip(
-                    positions_to_use["x_positions"], positions_to_use["y_positions"]
-                )
+                self._cells_by_number[cell_id]
+                for cell_id in self._line_layout.lines[line_index]
             ]
         )
 
@@ -408,14 +588,13 @@ class Board:
 
     def get_winning_cells(self) -> CellGroup:
         """
-        Search the board to find the winning group of cells and return it.
+        Return the winning group of cells found when the last mark was written.
         :return: the winning group of cells.
         :raises ValueError: if no winning combination is found on the board.
         """
-        for line in self._all_possible_lines_in_board:
-            if self._group_of_cells_is_winning_combo(line):
-                return line
-        raise ValueError("There is no winning line in the board.")
+        if self._winning_line is None:
+            raise ValueError("There is no winning line in the board.")
+        return self._winning_line
 
     @property
     def _all_possible_lines_in_board(self) -> List[CellGroup]:
@@ -423,22 +602,7 @@ class Board:
         Get all the lines on the board.
         :return: All the lines on the board.
         """
-
-        all_possible_lines = []
-
-        for column_index in range(0, self.column_count):
-            all_possible_lines.append(
-                self._get_cells_in_line(way="vertical", index=column_index)
-            )
-
-        for row_index in range(0, self.row_count):
-            all_possible_lines.append(
-                self._get_cells_in_line(way="horizontal", index=row_index)
-            )
-
-        for diagonal_index in [1, 2]:
-            all_possible_lines.append(
-                self._get_cells_in_line(way="diagonal", index=diagonal_index)
-            )
-
-        return all_possible_lines
+        return [
+            self._get_cells_in_line(line_index)
+            for line_index in range(0, len(self._line_layout.lines))
+        ]
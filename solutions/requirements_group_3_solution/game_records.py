@@ -0,0 +1,230 @@
+"""
+A compact binary format to archive finished matches, with a writer that
+matches append to as they are played and a reader that streams the games
+back one at a time.
+
+File layout:
+- An 8 byte header: the magic bytes, the format version and padding.
+- The games, one after the other. Each game is a 5 byte header, with the
+  column count, the row count, the win length, the first player and result
+  packed in one byte (first player in the high 4 bits) and the move count,
+  followed by the number id of every cell played, one byte per move.
+"""
+
+import struct
+from typing import BinaryIO, Iterator, Optional
+
+FILE_MAGIC = b"TTGR"
+FILE_VERSION = 1
+FILE_HEADER_FORMAT = "<4sB3x"
+FILE_HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
+GAME_HEADER_FORMAT = "<BBBBB"
+GAME_HEADER = struct.Struct(GAME_HEADER_FORMAT)
+MAX_CELL_COUNT = 255
+READ_CHUNK_SIZE = 1 << 20
+
+# Results of a game
+UNFINISHED = 0
+PLAYER_1_WON = 1
+PLAYER_2_WON = 2
+DRAW = 3
+
+
+class GameRecord:
+    """
+    A recorded game: the shape of its board, who moved first, how it ended
+    and every move, as the number ids of the cells played.
+    """
+
+    __slots__ = (
+        "column_count",
+        "row_count",
+        "win_length",
+        "first_player",
+        "result",
+        "moves",
+    )
+
+    # One argument per field of the record
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        column_count: int,
+        row_count: int,
+        win_length: int,
+        first_player: int,
+        result: int,
+        moves: bytes,
+    ):
+        """
+        Receive the contents of the record.
+        :param column_count: the number of cells in each row of the board.
+        :param row_count: the number of rows of the board.
+        :param win_length: how many marks in a row were needed to win.
+        :param first_player: the number of the player who moved first.
+        :param result: how the game ended, one of UNFINISHED, PLAYER_1_WON,
+        PLAYER_2_WON and DRAW.
+        :param moves: the number id of every cell played, in order, one per
+        byte. Iterating over it gives ints.
+        """
+        self.column_count = column_count
+        self.row_count = row_count
+        self.win_length = win_length
+        self.first_player = first_player
+        self.result = result
+        self.moves = moves
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file. A game can be written whole, or built up
+    move by move while it is played: it is then kept in memory and written
+    when it finishes, since its header holds the result.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a record file to append to, writing its header if it is new.
+        :param path: the path of the file.
+        """
+        # Kept open across calls, and closed by close or by leaving a with block
+        self._file: BinaryIO = open(path, "ab")  # pylint: disable=consider-using-with
+        if self._file.tell() == 0:
+            self._file.write(struct.pack(FILE_HEADER_FORMAT, FILE_MAGIC, FILE_VERSION))
+        self._current_game: Optional[GameRecord] = None
+        self._current_moves = bytearray()
+
+    def start_game(
+        self, column_count: int, row_count: int, win_length: int, first_player: int
+    ) -> None:
+        """
+        Start recording a game. A game that was started and not finished is
+        written as unfinished.
+        :param column_count: the number of cells in each row of the board.
+        :param row_count: the number of rows of the board.
+        :param win_length: how many marks in a row are needed to win.
+        :param first_player: the number of the player who moves first.
+        :return: None
+        :raises ValueError: if the board has too many cells for the format.
+        """
+        if column_count * row_count > MAX_CELL_COUNT:
+            raise ValueError(f"Boards over {MAX_CELL_COUNT} cells can't be recorded.")
+        if self._current_game is not None:
+            self.finish_game(UNFINISHED)
+
+        self._current_game = GameRecord(
+            column_count=column_count,
+            row_count=row_count,
+            win_length=win_length,
+            first_player=first_player,
+            result=UNFINISHED,
+            moves=b"",
+        )
+        self._current_moves = bytearray()
+
+    def record_move(self, cell_number: int) -> None:
+        """
+        Add a move to the game being recorded.
+        :param cell_number: the number id of the cell played.
+        :return: None
+        :raises ValueError: if no game is being recorded.
+        """
+        if self._current_game is None:
+            raise ValueError("There is no game being recorded.")
+        self._current_moves.append(cell_number)
+
+    def finish_game(self, result: int) -> None:
+        """
+        Write the game being recorded, now that its result is known.
+        :param result: how the game ended.
+        :return: None
+        :raises ValueError: if no game is being recorded, for example because
+        it was already finished.
+        """
+        game = self._current_game
+        if game is None:
+            raise ValueError("There is no game being recorded.")
+        game.result = result
+        game.moves = bytes(self._current_moves)
+        self.write_game(game)
+        self._current_game = None
+
+    def write_game(self, game: GameRecord) -> None:
+        """
+        Write a whole game.
+        :param game: the game.
+        :return: None
+        """
+        self._file.write(
+            GAME_HEADER.pack(
+                game.column_count,
+                game.row_count,
+                game.win_length,
+                game.first_player << 4 | game.result,
+                len(game.moves),
+            )
+        )
+        self._file.write(game.moves)
+
+    def close(self) -> None:
+        """
+        Write the game being recorded, if any, as unfinished, and close the
+        file.
+        :return: None
+        """
+        if self._current_game is not None:
+            self.finish_game(UNFINISHED)
+        self._file.close()
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *exception_info) -> None:
+        self.close()
+
+
+def read_game_records(path: str) -> Iterator[GameRecord]:
+    """
+    Read the games of a record file one at a time. The file is read in large
+    chunks, so memory use doesn't depend on its size.
+    :param path: the path of the file.
+    :return: an iterator over the games, in the order they were written.
+    :raises ValueError: if the file is not a record file or is truncated.
+    """
+    with open(path, "rb") as file:
+        magic, version = struct.unpack(
+            FILE_HEADER_FORMAT, file.read(FILE_HEADER_SIZE).ljust(FILE_HEADER_SIZE)
+        )
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"{path} is not a game record file.")
+
+        buffer = b""
+        while True:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+            offset = 0
+            while offset + GAME_HEADER.size <= len(buffer):
+                (
+                    column_count,
+                    row_count,
+                    win_length,
+                    first_player_and_result,
+                    move_count,
+                ) = GAME_HEADER.unpack_from(buffer, offset)
+                moves_end = offset + GAME_HEADER.size + move_count
+                if moves_end > len(buffer):
+                    break
+                yield GameRecord(
+                    column_count=column_count,
+                    row_count=row_count,
+                    win_length=win_length,
+                    first_player=first_player_and_result >> 4,
+                    result=first_player_and_result & 0x0F,
+                    moves=buffer[offset + GAME_HEADER.size : moves_end],
+                )
+                offset = moves_end
+            buffer = buffer[offset:]
+
+        if buffer:
+            raise ValueError(f"{path} ends with a truncated game.")
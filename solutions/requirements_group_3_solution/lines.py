@@ -0,0 +1,119 @@
+"""
+The layout of the lines on a board, computed once per board shape and shared
+by every board of that shape.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Each direction is the (row, cell in row) step between consecutive cells of a
+# line. The order sets the order in which lines are checked.
+LINE_DIRECTIONS = (
+    (1, 0),  # Top-bottom, same cell in every row
+    (0, 1),  # Left-right, along a row
+    (1, 1),  # Top-bottom, left-right diagonal
+    (-1, 1),  # Bottom-top, left-right diagonal
+)
+
+
+class LineLayout:
+    """
+    The cells that make up every line where a win can happen on a board
+    shape, identified by cell number id, plus a reverse index from each cell to
+    the lines that pass through it.
+
+    A line is any run of win_length consecutive cells along a row, a column or
+    a diagonal, so on boards larger than win_length lines overlap each other.
+    """
+
+    def __init__(self, column_count: int, row_count: int, win_length: int):
+        """
+        Compute every line of the layout.
+        :param column_count: the number of cells in each row of the board.
+        :param row_count: the number of rows of the board.
+        :param win_length: how many marks in a row are needed to win.
+        :raises ValueError: if no line of win_length cells fits in the board.
+        """
+        if not 1 <= win_length <= max(column_count, row_count):
+            raise ValueError(
+                f"A win length of {win_length} doesn't fit in a "
+                f"{column_count}x{row_count} board."
+            )
+
+        self.column_count = column_count
+        self.row_count = row_count
+        self.win_length = win_length
+        self.lines = self._generate_lines()
+        self.lines_by_cell = self._index_lines_by_cell(self.lines)
+        self.line_masks = tuple(
+            sum(1 << (cell_id - 1) for cell_id in line) for line in self.lines
+        )
+        self.line_masks_by_cell = {
+            cell_id: tuple(self.line_masks[line_index] for line_index in line_indices)
+            for cell_id, line_indices in self.lines_by_cell.items()
+        }
+
+    def _generate_lines(self) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Find every run of win_length cells along every direction, direction by
+        direction, reading the board column by column.
+        :return: the cell number ids of every line.
+        """
+        lines = []
+
+        for row_step, cell_step in LINE_DIRECTIONS:
+            for cell_in_row in range(0, self.column_count):
+                for row_index in range(0, self.row_count):
+                    last_row_index = row_index + row_step * (self.win_length - 1)
+                    last_cell_in_row = cell_in_row + cell_step * (self.win_length - 1)
+                    if not (
+                        0 <= last_row_index < self.row_count
+                        and 0 <= last_cell_in_row < self.column_count
+                    ):
+                        continue
+                    lines.append(
+                        tuple(
+                            (row_index + row_step * step) * self.column_count
+                            + cell_in_row
+                            + cell_step * step
+                            + 1
+                            for step in range(0, self.win_length)
+                        )
+                    )
+
+        return tuple(lines)
+
+    @staticmethod
+    def _index_lines_by_cell(
+        lines: Tuple[Tuple[int, ...], ...]
+    ) -> Dict[int, Tuple[int, ...]]:
+        """
+        Build the reverse index from each cell to the lines that contain it.
+        :param lines: the cell number ids of every line.
+        :return: the indices of the lines that contain each cell, keyed by cell
+        number id.
+        """
+        lines_by_cell: Dict[int, List[int]] = {}
+        for line_index, line in enumerate(lines):
+            for cell_id in line:
+                lines_by_cell.setdefault(cell_id, []).append(line_index)
+
+        return {
+            cell_id: tuple(line_indices)
+            for cell_id, line_indices in lines_by_cell.items()
+        }
+
+
+@lru_cache(maxsize=None)
+def get_line_layout(column_count: int, row_count: int, win_length: int) -> LineLayout:
+    """
+    Get the line layout for a board shape, computing it only the first time
+    that shape is requested.
+    :param column_count: the number of cells in each row of the board.
+    :param row_count: the number of rows of the board.
+    :param win_length: how many marks in a row are needed to win.
+    :return: the shared line layout.
+    """
+    return LineLayout(
+        column_count=column_count, row_count=row_count, win_length=win_length
+    )
@@ -1,12 +1,25 @@
+import argparse
 import sys
 
 from solutions.requirements_group_3_solution.match import Match
+from solutions.requirements_group_3_solution.minimax import MinimaxMoveSource
+from solutions.requirements_group_3_solution.profiling import (
+    DEFAULT_DUMP_INTERVAL,
+    disable_profiling,
+    dump_profiling_snapshot,
+    enable_profiling,
+    start_periodic_dump,
+)
 from solutions.requirements_group_3_solution.utils import input_with_validation
 
+COMPUTER_SECONDS_PER_MOVE = 3.0
 
-def play_game() -> None:
+
+def play_game(display_mode: str = "plain") -> None:
     """
     Set up the game and play until it's done.
+    :param display_mode: how to show the matches, one of the keys in
+    terminal.DISPLAY_MODES.
     :return: None
     """
 
@@ -30,8 +43,24 @@ def play_game() -> None:
             )
         )
 
+        wants_computer_opponent = input_with_validation(
+            "Should player 2 be the computer? (y/n)",
+            validation_func=lambda x: x in ["y", "n"],
+            retry=True,
+        )
+        move_sources = {}
+        if wants_computer_opponent == "y":
+            move_sources[2] = MinimaxMoveSource(
+                time_limit=COMPUTER_SECONDS_PER_MOVE, verbose=True
+            )
+
         # Initiliaze stuff
-        match = Match(first_player=chosen_first_player, board_size=board_size)
+        match = Match(
+            first_player=chosen_first_player,
+            board_size=board_size,
+            move_sources=move_sources,
+            display_mode=display_mode,
+        )
 
         # Enter game loop
         while not match.is_finished:
@@ -50,4 +79,29 @@ def play_game() -> None:
 
 
 if __name__ == "__main__":
-    play_game()
+    parser = argparse.ArgumentParser(description="Play tick-tack-toe.")
+    parser.add_argument(
+        "--ansi",
+        action="store_true",
+        help="Repaint only the changed cells instead of printing the whole "
+        "board every turn. Needs a terminal.",
+    )
+    parser.add_argument(
+        "--profile-dump",
+        help="Count and time the hot operations, appending a JSON snapshot to "
+        "this file every --profile-interval seconds and on exit.",
+    )
+    parser.add_argument("--profile-interval", type=float, default=DEFAULT_DUMP_INTERVAL)
+    arguments = parser.parse_args()
+
+    if arguments.profile_dump is None:
+        play_game(display_mode="ansi" if arguments.ansi else "plain")
+    else:
+        with open(arguments.profile_dump, "a", encoding="utf-8") as profile_stream:
+            enable_profiling()
+            start_periodic_dump(arguments.profile_interval, profile_stream)
+            try:
+                play_game(display_mode="ansi" if arguments.ansi else "plain")
+            finally:
+                disable_profiling()
+                dump_profiling_snapshot(profile_stream)
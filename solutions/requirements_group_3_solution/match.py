@@ -1,9 +1,28 @@
+from typing import Dict, Optional
+
+from solutions.requirements_group_3_solution.bitboard import BitBoard
 from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.game_records import DRAW, GameRecordWriter
+from solutions.requirements_group_3_solution.move_sources import (
+    BaseMoveSource,
+    HumanMoveSource,
+)
+from solutions.requirements_group_3_solution.numpy_board import (
+    NUMPY_IS_AVAILABLE,
+    NumpyBoard,
+)
 from solutions.requirements_group_3_solution.rendering import (
     BoardRenderer,
     SpecificCellsFilter,
 )
-from solutions.requirements_group_3_solution.utils import input_with_validation
+from solutions.requirements_group_3_solution.terminal import create_display
+
+BOARD_ENGINES = {
+    "cells": Board,
+    "bitboard": BitBoard,
+}
+if NUMPY_IS_AVAILABLE:
+    BOARD_ENGINES["numpy"] = NumpyBoard
 
 
 class Match:
@@ -12,53 +31,174 @@ class Match:
     game.
     """
 
-    def __init__(self, first_player: int, board_size: int):
+    # Everything past the board size is an option with a default, passed by
+    # keyword
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        first_player: int,
+        board_size: int,
+        board_engine: str = "cells",
+        win_length: Optional[int] = None,
+        board_row_count: Optional[int] = None,
+        move_sources: Optional[Dict[int, BaseMoveSource]] = None,
+        verbose: bool = True,
+        display_mode: str = "plain",
+        game_recorder: Optional[GameRecordWriter] = None,
+    ):
         """
         Set up initial state.
         :param first_player: the number of the player who moves first.
         :param board_size: indicates the size of the board.
+        :param board_engine: the name of the engine that keeps the board state,
+        one of the keys in BOARD_ENGINES.
+        :param win_length: how many marks in a row are needed to win. Defaults
+        to the board size.
+        :param board_row_count: the number of rows, for non square boards.
+        Defaults to the board size.
+        :param move_sources: where each player's moves come from, keyed by
+        player number. Players without one are asked on the CLI.
+        :param verbose: whether to print the board and messages. Set to False
+        to play without any output.
+        :param display_mode: how to show the match, one of the keys in
+        terminal.DISPLAY_MODES. "ansi" repaints only what changes, and falls
+        back to "plain" when the output is not a terminal.
+        :param game_recorder: an optional writer to record the match to, move
+        by move.
         """
-        self._board = Board(size=board_size)
-        self._board_renderer = BoardRenderer(self._board)
+        move_sources = move_sources if move_sources is not None else {}
+        self._board = BOARD_ENGINES[board_engine](
+            size=board_size, win_length=win_length, row_count=board_row_count
+        )
         self._players_by_number = {
-            1: Player(number_id=1, mark="X"),
-            2: Player(number_id=2, mark="O"),
+            number_id: Player(
+                number_id=number_id,
+                mark=mark,
+                move_source=move_sources.get(number_id, HumanMoveSource()),
+            )
+            for number_id, mark in ((1, "X"), (2, "O"))
         }
         self._players_by_mark = {
             player.mark: player for player in self._players_by_number.values()
         }
         self._current_player = self._players_by_number[first_player]
+        # Headless matches don't build a renderer at all
+        self._display = (
+            create_display(display_mode, BoardRenderer(self._board))
+            if verbose
+            else None
+        )
+        self.move_count = 0
+        self._game_recorder = game_recorder
+        if game_recorder is not None:
+            game_recorder.start_game(
+                column_count=self._board.column_count,
+                row_count=self._board.row_count,
+                win_length=self._board.win_length,
+                first_player=first_player,
+            )
 
     def play_turn(self) -> None:
         """
-        Flow of a turn.
+        Flow of a turn. Only a human is asked again after choosing a cell that
+        can't be written on: any other move source would keep choosing it.
         :return: None
+        :raises ValueError: if the match is finished, or a move source that
+        is not human chooses a cell that can't be written on.
         """
-        print(self._board_renderer.render())
-        print(f"Next move: Player {self._current_player.number_id}")
+        if self.is_finished:
+            raise ValueError("The match is finished.")
 
+        if self._display is not None:
+            self._display.show_board()
+            self._display.show_message(
+                f"Next move: Player {self._current_player.number_id}"
+            )
+
+        move_source = self._current_player.move_source
         while True:
-            chosen_cell = int(
-                input_with_validation(
-                    prompt=f"Which cell to mark?[{self._board.first_cell_id}"
-                    f"-{self._board.last_cell_id}]",
-                    validation_func=lambda x: self._board.first_cell_id
-                    <= int(x)
-                    <= self._board.last_cell_id,
-                    retry=True,
-                )
+            chosen_cell = move_source.choose_cell(
+                self._board, self._current_player.mark
             )
             try:
-                self._board.write_mark_on_cell_if_empty(
-                    cell_number=chosen_cell, mark=self._current_player.mark
-                )
+                self.apply_move(chosen_cell)
                 break
             except ValueError:
-                print("Can't write on that cell, it already has a mark.")
-                print("Try again")
+                if not isinstance(move_source, HumanMoveSource):
+                    raise
+                if self._board.first_cell_id <= chosen_cell <= self._board.last_cell_id:
+                    self._show("Can't write on that cell, it already has a mark.")
+                else:
+                    self._show(f"There is no cell {chosen_cell}.")
+                self._show("Try again")
+
+        move_report = move_source.last_move_report
+        if move_report is not None:
+            self._show(move_report)
+        if self._display is not None:
+            self._display.show_separator()
 
+    def apply_move(self, cell_number: int) -> None:
+        """
+        Write the mark of the player whose turn it is on a cell and pass the
+        turn, without asking any move source. Lets matches be driven from the
+        outside, one move at a time.
+        :param cell_number: the number id of the cell to write into.
+        :return: None
+        :raises ValueError: if the match is finished or the cell is not on the
+        board or not empty.
+        """
+        if self.is_finished:
+            raise ValueError("The match is finished.")
+        if not self._board.first_cell_id <= cell_number <= self._board.last_cell_id:
+            raise ValueError(f"There is no cell {cell_number}.")
+
+        self._board.write_mark_on_cell_if_empty(
+            cell_number=cell_number, mark=self._current_player.mark
+        )
+        self.move_count += 1
         self._switch_current_player()
-        print("/////////////////////////////")
+
+        if self._game_recorder is not None:
+            self._game_recorder.record_move(cell_number)
+            if self.is_finished:
+                winning_player = self.winning_player
+                self._game_recorder.finish_game(
+                    DRAW if winning_player is None else winning_player.number_id
+                )
+
+    def play(self) -> None:
+        """
+        Play turns until the match is finished.
+        :return: None
+        """
+        while not self.is_finished:
+            self.play_turn()
+
+    @property
+    def board(self) -> Board:
+        """
+        The board the match is played on.
+        :return: the board.
+        """
+        return self._board
+
+    @property
+    def current_player(self) -> "Player":
+        """
+        The player whose turn it is.
+        :return: the player.
+        """
+        return self._current_player
+
+    @property
+    def winning_player(self) -> Optional["Player"]:
+        """
+        Find out who won the match.
+        :return: the winning player, or None if nobody has won.
+        """
+        if not self._board.there_is_winning_combo:
+            return None
+        return self._players_by_mark[self._board.get_winning_mark()]
 
     @property
     def is_finished(self) -> bool:
@@ -83,19 +223,29 @@ class Match:
         match.
         :return: None
         """
+        if self._display is None:
+            return
 
         if self._board.there_is_winning_combo:
-            print(
-                self._board_renderer.render(
-                    SpecificCellsFilter(cells_to_keep=self._board.get_winning_cells())
-                )
+            self._display.show_board(
+                SpecificCellsFilter(cells_to_keep=self._board.get_winning_cells())
+            )
+            winning_player = self.winning_player
+            self._display.show_message(
+                f"Player {winning_player.number_id} has won!!!!!!!!!!!!!!!!!!!!!!"
             )
-            winning_mark = self._board.get_winning_mark()
-            winning_player = self._players_by_mark[winning_mark]
-            print(f"Player {winning_player.number_id} has won!!!!!!!!!!!!!!!!!!!!!!")
         if self._board.there_is_stalemate:
-            print(self._board_renderer.render())
-            print("Stalemate. Nobody wins this time!")
+            self._display.show_board()
+            self._display.show_message("Stalemate. Nobody wins this time!")
+
+    def _show(self, text: str) -> None:
+        """
+        Print a message, unless the match is played without output.
+        :param text: the message to print.
+        :return: None
+        """
+        if self._display is not None:
+            self._display.show_message(text)
 
 
 class Player:
@@ -103,12 +253,16 @@ class Player:
     A player in the match.
     """
 
-    def __init__(self, number_id: int, mark: str):
+    __slots__ = ("number_id", "mark", "move_source")
+
+    def __init__(self, number_id: int, mark: str, move_source: BaseMoveSource):
         """
         Identify the player with a number and assign which mark he will use on
         the board.
         :param number_id: the player's number
         :param mark: the mark to use on the board.
+        :param move_source: where the player's moves come from.
         """
         self.number_id = number_id
         self.mark = mark
+        self.move_source = move_source
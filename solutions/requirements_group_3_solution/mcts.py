@@ -0,0 +1,551 @@
+"""
+A computer player that picks its moves with Monte Carlo tree search, for
+boards too large for an exhaustive minimax search.
+"""
+
+import math
+import random
+import time
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional, Tuple, Union
+
+from solutions.requirements_group_3_solution.bitboard import BitBoard
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.minimax import OPPONENT_MARKS
+from solutions.requirements_group_3_solution.move_sources import BaseMoveSource
+from solutions.requirements_group_3_solution.symmetry import (
+    EMPTY_CELL,
+    Position,
+    get_position,
+)
+
+DEFAULT_ITERATIONS = 5000
+DEFAULT_EXPLORATION = math.sqrt(2)
+WIN_REWARD = 1.0
+DRAW_REWARD = 0.5
+
+BoardShape = Tuple[int, int, int]  # column count, row count, win length
+SearchBudget = Tuple[Optional[float], Optional[int]]  # time limit, iterations
+VisitsByCell = Dict[int, int]
+SearchResult = Tuple[VisitsByCell, int, int]  # visits, playouts, reused visits
+
+
+class MctsNode:
+    """
+    A position in the search tree, reached by writing a mark on a cell of its
+    parent's position.
+    """
+
+    __slots__ = (
+        "cell_id",
+        "mark",
+        "parent",
+        "children",
+        "untried_cell_ids",
+        "visits",
+        "reward",
+    )
+
+    def __init__(
+        self,
+        cell_id: Optional[int],
+        mark: str,
+        parent: Optional["MctsNode"],
+        untried_cell_ids: List[int],
+    ):
+        """
+        Create a node that has not been visited yet.
+        :param cell_id: the number id of the cell written to reach the node,
+        None for the root.
+        :param mark: the mark written to reach the node. For the root, the
+        mark of the player that moved last.
+        :param parent: the node this one was reached from, None for the root.
+        :param untried_cell_ids: the cells whose nodes are still to be added.
+        Empty if the match is over in this position.
+        """
+        self.cell_id = cell_id
+        self.mark = mark
+        self.parent = parent
+        self.children: Dict[int, MctsNode] = {}
+        self.untried_cell_ids = untried_cell_ids
+        self.visits = 0
+        self.reward = 0.0
+
+    def select_child(self, exploration: float) -> "MctsNode":
+        """
+        Pick the child to descend into with the UCT formula, which balances
+        the children that did well so far with the ones visited the least.
+        :param exploration: how much weight to give to the less visited
+        children.
+        :return: the child to descend into.
+        """
+        log_visits = math.log(self.visits)
+        return max(
+            self.children.values(),
+            key=lambda child: child.reward / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+
+class MctsStats:
+    """
+    Figures about the search made to pick one move.
+    """
+
+    def __init__(self, iterations: int, elapsed_seconds: float, reused_visits: int):
+        """
+        Receive the figures.
+        :param iterations: how many playouts were run.
+        :param elapsed_seconds: how long the search took.
+        :param reused_visits: how many visits the root already had from the
+        searches of earlier moves.
+        """
+        self.iterations = iterations
+        self.elapsed_seconds = elapsed_seconds
+        self.reused_visits = reused_visits
+
+    def __str__(self) -> str:
+        return (
+            f"Ran {self.iterations} playouts in {self.elapsed_seconds:.3f}s "
+            f"({self.reused_visits} reused from earlier moves)"
+        )
+
+
+class MctsSearch:
+    """
+    A search tree and the playouts that grow it. The tree is kept between
+    searches, and when the next search starts a few moves further into the
+    same match, the subtree of the new position becomes the root.
+    """
+
+    def __init__(self, exploration: float, seed: Optional[Union[int, str]] = None):
+        """
+        Start with no tree.
+        :param exploration: how much weight the selection gives to the less
+        visited moves.
+        :param seed: a seed for the playouts, to make searches reproducible.
+        """
+        self._exploration = exploration
+        self._rng = random.Random(seed)
+        self._root: Optional[MctsNode] = None
+        self._root_position: Optional[Position] = None
+        self._board_shape: Optional[BoardShape] = None
+
+    def search(
+        self,
+        position: Position,
+        mark: str,
+        board_shape: BoardShape,
+        budget: SearchBudget,
+    ) -> SearchResult:
+        """
+        Run playouts from a position until the budget runs out.
+        :param position: the contents of every cell, in cell number order. It
+        must not have a winning line.
+        :param mark: the mark of the player that moves.
+        :param board_shape: the column count, row count and win length.
+        :param budget: how many seconds to search and how many playouts to run
+        at most, either of them None for no limit.
+        :return: the visits of each move of the position, the number of
+        playouts run and the visits the root already had.
+        """
+        time_limit, iterations = budget
+        board = self._board_for(position, board_shape)
+        self._advance_root(position, mark, board_shape, board)
+        reused_visits = self._root.visits
+
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        iterations_run = 0
+        # At least one playout is run, so there is always a move to pick
+        while iterations_run == 0 or (
+            (iterations is None or iterations_run < iterations)
+            and (deadline is None or time.perf_counter() < deadline)
+        ):
+            self._run_playout(board)
+            iterations_run += 1
+
+        visits_by_cell = {
+            cell_id: child.visits for cell_id, child in self._root.children.items()
+        }
+        return visits_by_cell, iterations_run, reused_visits
+
+    def _run_playout(self, board: BitBoard) -> None:
+        """
+        Descend the tree, add a node to it, play random moves from there until
+        the match ends, and credit the result to every node on the way. The
+        board is left as it was.
+        :param board: a board with the position of the root.
+        :return: None
+        """
+        node = self._root
+        moves_made = 0
+
+        # Selection: descend through fully expanded nodes
+        while not node.untried_cell_ids and node.children:
+            node = node.select_child(self._exploration)
+            board.make_move(node.cell_id, node.mark)
+            moves_made += 1
+
+        # Expansion: add one of the moves not tried yet
+        if node.untried_cell_ids:
+            untried_cell_ids = node.untried_cell_ids
+            untried_index = self._rng.randrange(0, len(untried_cell_ids))
+            cell_id = untried_cell_ids[untried_index]
+            untried_cell_ids[untried_index] = untried_cell_ids[-1]
+            untried_cell_ids.pop()
+            mark = OPPONENT_MARKS[node.mark]
+            board.make_move(cell_id, mark)
+            moves_made += 1
+            child = MctsNode(
+                cell_id=cell_id,
+                mark=mark,
+                parent=node,
+                untried_cell_ids=[]
+                if board.there_is_winning_combo
+                else board.get_empty_cell_ids(),
+            )
+            node.children[cell_id] = child
+            node = child
+
+        # Simulation: play the remaining cells in random order
+        empty_cell_ids = board.get_empty_cell_ids()
+        self._rng.shuffle(empty_cell_ids)
+        mark = OPPONENT_MARKS[node.mark]
+        for cell_id in empty_cell_ids:
+            if board.there_is_winning_combo:
+                break
+            board.make_move(cell_id, mark)
+            moves_made += 1
+            mark = OPPONENT_MARKS[mark]
+
+        winning_mark = None
+        if board.there_is_winning_combo:
+            winning_mark = board.get_winning_mark()
+        for _ in range(0, moves_made):
+            board.unmake_move()
+
+        # Backpropagation: each node is scored for the player that moved into it
+        while node is not None:
+            node.visits += 1
+            if winning_mark is None:
+                node.reward += DRAW_REWARD
+            elif winning_mark == node.mark:
+                node.reward += WIN_REWARD
+            node = node.parent
+
+    def _advance_root(
+        self, position: Position, mark: str, board_shape: BoardShape, board: BitBoard
+    ) -> None:
+        """
+        Move the root to the node of a new position, if the tree already has
+        it, or start a new tree otherwise.
+        :param position: the contents of every cell, in cell number order.
+        :param mark: the mark of the player that moves.
+        :param board_shape: the column count, row count and win length.
+        :param board: a board with the position.
+        :return: None
+        """
+        node = self._find_node(position, board_shape)
+        if node is None or node.mark != OPPONENT_MARKS[mark]:
+            node = MctsNode(
+                cell_id=None,
+                mark=OPPONENT_MARKS[mark],
+                parent=None,
+                untried_cell_ids=board.get_empty_cell_ids(),
+            )
+
+        node.parent = None  # Lets the rest of the old tree be freed
+        self._root = node
+        self._root_position = position
+        self._board_shape = board_shape
+
+    def _find_node(
+        self, position: Position, board_shape: BoardShape
+    ) -> Optional[MctsNode]:
+        """
+        Follow the moves made since the last search down the tree.
+        :param position: the contents of every cell, in cell number order.
+        :param board_shape: the column count, row count and win length.
+        :return: the node of the position, or None if it isn't in the tree.
+        """
+        if self._root is None or board_shape != self._board_shape:
+            return None
+
+        new_cell_ids = set()
+        for cell_index, (old_content, content) in enumerate(
+            zip(self._root_position, position)
+        ):
+            if old_content != content:
+                if old_content != EMPTY_CELL:
+                    return None  # Not the same match
+                new_cell_ids.add(cell_index + 1)
+
+        node = self._root
+        while new_cell_ids:
+            for cell_id, child in node.children.items():
+                if cell_id in new_cell_ids and position[cell_id - 1] == child.mark:
+                    node = child
+                    new_cell_ids.remove(cell_id)
+                    break
+            else:
+                return None
+        return node
+
+    @staticmethod
+    def _board_for(position: Position, board_shape: BoardShape) -> BitBoard:
+        """
+        Build the board the playouts are run on.
+        :param position: the contents of every cell, in cell number order.
+        :param board_shape: the column count, row count and win length.
+        :return: a board with the position.
+        """
+        column_count, row_count, win_length = board_shape
+        return BitBoard.from_moves(
+            size=column_count,
+            moves=(
+                (cell_index + 1, content)
+                for cell_index, content in enumerate(position)
+                if content != EMPTY_CELL
+            ),
+            win_length=win_length,
+            row_count=row_count,
+        )
+
+
+class MctsWorkerPool:
+    """
+    Worker processes that each grow their own search tree, kept between moves.
+
+    Every worker is a process of its own, reached through a pipe, so each
+    search is run exactly once by every worker and each tree is only ever
+    grown by the same process. Worker n seeds its playouts from the seed of
+    the pool and n, so workers don't run the same playouts and searches with
+    a playout budget are reproducible. The processes are started by the first
+    search and stopped by close.
+    """
+
+    def __init__(self, workers: int, exploration: float, seed: Optional[int]):
+        """
+        Prepare the pool, without starting any process yet.
+        :param workers: how many processes to search in.
+        :param exploration: how much weight the selection gives to the less
+        visited moves.
+        :param seed: the seed the seeds of the workers are derived from.
+        """
+        self.workers = workers
+        self._search_settings = (exploration, seed)
+        self._connections: List[Connection] = []
+        self._processes: List[Process] = []
+
+    def search(self, search_arguments: tuple) -> List[SearchResult]:
+        """
+        Run the same search in every worker, each with its own tree.
+        :param search_arguments: the arguments of MctsSearch.search.
+        :return: what MctsSearch.search returns in each worker, in worker
+        order.
+        """
+        if not self._processes:
+            self._start_workers()
+
+        for connection in self._connections:
+            connection.send(search_arguments)
+        results = [connection.recv() for connection in self._connections]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def close(self) -> None:
+        """
+        Stop the worker processes, if they were started.
+        :return: None
+        """
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def _start_workers(self) -> None:
+        """
+        Start one process per worker, each with its end of a pipe.
+        :return: None
+        """
+        exploration, seed = self._search_settings
+        for worker_index in range(0, self.workers):
+            connection, worker_connection = Pipe()
+            process = Process(
+                target=_serve_searches,
+                args=(
+                    worker_connection,
+                    exploration,
+                    None if seed is None else f"{seed}:{worker_index}",
+                ),
+                name=f"mcts-worker-{worker_index}",
+                daemon=True,
+            )
+            process.start()
+            # Only the worker uses its end, so it sees the pipe close with us
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+
+class MctsMoveSource(BaseMoveSource):
+    """
+    Picks moves with Monte Carlo tree search: random playouts guided by the
+    results of earlier ones, playing the move that was explored the most.
+
+    The budget of each move is a time limit, a number of playouts or both.
+    The tree of each search is reused by the next one. With several workers,
+    each worker process grows its own tree from the same position, and their
+    visit counts are added up to pick the move. The worker processes are
+    started by the first move and stopped by close, which using the source as
+    a context manager takes care of.
+    """
+
+    # Every setting is an option with a default, passed by keyword
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        time_limit: Optional[float] = None,
+        iterations: Optional[int] = None,
+        workers: int = 1,
+        exploration: float = DEFAULT_EXPLORATION,
+        seed: Optional[int] = None,
+        verbose: bool = False,
+    ):
+        """
+        Set up the search.
+        :param time_limit: how many seconds to search per move at most.
+        :param iterations: how many playouts to run per move at most, in each
+        worker. Defaults to DEFAULT_ITERATIONS when there is no time limit.
+        :param workers: how many processes to search in. With 1, the search
+        runs in the calling process.
+        :param exploration: how much weight the selection gives to the less
+        visited moves.
+        :param seed: a seed for the playouts. Searches are reproducible when
+        their budget is a number of playouts only.
+        :param verbose: whether to report the search figures after each move,
+        for the match to show.
+        :raises ValueError: if there are fewer than one worker.
+        """
+        if workers < 1:
+            raise ValueError("At least one worker is needed.")
+        if time_limit is None and iterations is None:
+            iterations = DEFAULT_ITERATIONS
+        self._budget: SearchBudget = (time_limit, iterations)
+        self._verbose = verbose
+        self._search = (
+            MctsSearch(exploration=exploration, seed=seed) if workers == 1 else None
+        )
+        self._worker_pool = (
+            MctsWorkerPool(workers=workers, exploration=exploration, seed=seed)
+            if workers > 1
+            else None
+        )
+        self.search_history: List[MctsStats] = []
+
+    def __enter__(self) -> "MctsMoveSource":
+        return self
+
+    def __exit__(self, *exception_info) -> None:
+        self.close()
+
+    @property
+    def last_search_stats(self) -> Optional[MctsStats]:
+        """
+        The figures of the search made for the last move.
+        :return: the figures, or None if no move has been chosen yet.
+        """
+        if not self.search_history:
+            return None
+        return self.search_history[-1]
+
+    @property
+    def last_move_report(self) -> Optional[str]:
+        """
+        The figures of the search made for the last move, when verbose.
+        :return: the figures as text, or None if not verbose or no move has
+        been chosen yet.
+        """
+        if not self._verbose or not self.search_history:
+            return None
+        return str(self.search_history[-1])
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Search the position on the board and pick the most explored cell.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        """
+        start_time = time.perf_counter()
+        search_arguments = (
+            get_position(board),
+            mark,
+            (board.column_count, board.row_count, board.win_length),
+            self._budget,
+        )
+
+        if self._worker_pool is None:
+            results = [self._search.search(*search_arguments)]
+        else:
+            results = self._worker_pool.search(search_arguments)
+
+        total_visits_by_cell: VisitsByCell = {}
+        for visits_by_cell, _, _ in results:
+            for cell_id, visits in visits_by_cell.items():
+                total_visits_by_cell[cell_id] = (
+                    total_visits_by_cell.get(cell_id, 0) + visits
+                )
+
+        self.search_history.append(
+            MctsStats(
+                iterations=sum(iterations_run for _, iterations_run, _ in results),
+                elapsed_seconds=time.perf_counter() - start_time,
+                reused_visits=sum(reused_visits for _, _, reused_visits in results),
+            )
+        )
+        return max(total_visits_by_cell, key=total_visits_by_cell.get)
+
+    def close(self) -> None:
+        """
+        Stop the worker processes, if any were started. The source can still
+        be used afterwards: they are started again by the next move.
+        :return: None
+        """
+        if self._worker_pool is not None:
+            self._worker_pool.close()
+
+
+def _serve_searches(
+    connection: Connection, exploration: float, seed: Optional[str]
+) -> None:
+    """
+    Run the searches sent by the pool, with a tree kept between them, until
+    told to stop or the pipe is closed. Runs in a worker process.
+    :param connection: the worker end of the pipe. None sent through it means
+    stop.
+    :param exploration: how much weight the selection gives to the less
+    visited moves.
+    :param seed: the seed of the playouts of the worker.
+    :return: None
+    """
+    search = MctsSearch(exploration=exploration, seed=seed)
+    while True:
+        try:
+            search_arguments = connection.recv()
+        except EOFError:
+            break
+        if search_arguments is None:
+            break
+        try:
+            result = search.search(*search_arguments)
+        except Exception as error:  # pylint: disable=broad-except
+            # Sent back to be raised in the calling process
+            result = error
+        connection.send(result)
+    connection.close()
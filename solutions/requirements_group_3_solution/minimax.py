@@ -0,0 +1,436 @@
+"""
+A computer player that picks its moves with an alpha-beta minimax search,
+backed by a transposition table of already searched positions.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.lines import LineLayout, get_line_layout
+from solutions.requirements_group_3_solution.move_sources import BaseMoveSource
+from solutions.requirements_group_3_solution.symmetry import (
+    EMPTY_CELL,
+    BoardSymmetries,
+    get_board_symmetries,
+    get_position,
+)
+
+WIN_SCORE = 1_000_000
+OPPONENT_MARKS = {"X": "O", "O": "X"}
+
+# Kinds of values stored in the transposition table
+EXACT_VALUE = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+TableEntry = Tuple[int, int, int, Optional[int]]  # depth, value, kind, best cell
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time limit for a move runs out.
+    """
+
+
+class SearchStats:
+    """
+    Figures about the search made to pick one move.
+    """
+
+    def __init__(
+        self,
+        nodes_searched: int,
+        elapsed_seconds: float,
+        depth_reached: int,
+        best_score: int,
+    ):
+        """
+        Receive the figures.
+        :param nodes_searched: how many positions were visited.
+        :param elapsed_seconds: how long the search took.
+        :param depth_reached: the deepest search that was completed.
+        :param best_score: the score of the chosen move, from the point of view
+        of the player that moves.
+        """
+        self.nodes_searched = nodes_searched
+        self.elapsed_seconds = elapsed_seconds
+        self.depth_reached = depth_reached
+        self.best_score = best_score
+
+    def __str__(self) -> str:
+        return (
+            f"Searched {self.nodes_searched} positions in "
+            f"{self.elapsed_seconds:.3f}s (depth {self.depth_reached})"
+        )
+
+
+class MinimaxMoveSource(BaseMoveSource):
+    """
+    Picks moves with a negamax search with alpha-beta pruning. Positions are
+    stored in a transposition table that is kept between moves, so positions
+    reached through different move orders are only searched once. Positions
+    are stored in their canonical form, so rotations and reflections of a
+    position are only searched once too.
+
+    Without limits the search is exhaustive, which is instant on 3x3. On
+    larger boards, a time limit makes it deepen iteratively and play the best
+    move of the deepest search completed in time.
+    """
+
+    # The search settings and state are read at every node, so they are kept
+    # in plain attributes rather than grouped behind another lookup
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        max_depth: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        max_table_size: int = 2_000_000,
+        use_symmetries: bool = True,
+        verbose: bool = False,
+    ):
+        """
+        Set up the search.
+        :param max_depth: how many moves ahead to look at most. Defaults to the
+        end of the match.
+        :param time_limit: how many seconds to search per move at most.
+        :param max_table_size: how many positions to keep in the
+        transposition table before it is cleared.
+        :param use_symmetries: whether to store positions in the transposition
+        table in their canonical form.
+        :param verbose: whether to report the search figures after each move,
+        for the match to show.
+        """
+        self._max_depth = max_depth
+        self._time_limit = time_limit
+        self._max_table_size = max_table_size
+        self._use_symmetries = use_symmetries
+        self._verbose = verbose
+        self._transposition_table: Dict[Tuple, TableEntry] = {}
+        self._layout: Optional[LineLayout] = None
+        self._symmetries: Optional[BoardSymmetries] = None
+        self._move_order: List[int] = []
+        self._nodes_searched = 0
+        self._deadline: Optional[float] = None
+        self.search_history: List[SearchStats] = []
+
+    @property
+    def last_search_stats(self) -> Optional[SearchStats]:
+        """
+        The figures of the search made for the last move.
+        :return: the figures, or None if no move has been chosen yet.
+        """
+        if not self.search_history:
+            return None
+        return self.search_history[-1]
+
+    @property
+    def last_move_report(self) -> Optional[str]:
+        """
+        The figures of the search made for the last move, when verbose.
+        :return: the figures as text, or None if not verbose or no move has
+        been chosen yet.
+        """
+        if not self._verbose or not self.search_history:
+            return None
+        return str(self.search_history[-1])
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Search the position on the board and pick the best cell.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        """
+        start_time = time.perf_counter()
+        self._prepare_for_board(board)
+        self._nodes_searched = 0
+        self._deadline = (
+            start_time + self._time_limit if self._time_limit is not None else None
+        )
+
+        cells = list(get_position(board))
+        empty_cell_count = cells.count(EMPTY_CELL)
+        marks_count = len(cells) - empty_cell_count
+        max_depth = (
+            empty_cell_count
+            if self._max_depth is None
+            else min(self._max_depth, empty_cell_count)
+        )
+
+        best_index = self._move_order_for(cells, None)[0]
+        best_score = 0
+        depth_reached = 0
+        for depth in range(1, max_depth + 1):
+            try:
+                best_score, best_index = self._search_root(
+                    cells, mark, depth, marks_count
+                )
+            except SearchTimeout:
+                break
+            depth_reached = depth
+            if abs(best_score) > WIN_SCORE // 2:
+                break  # The result is known, deeper searches won't change it
+
+        self.search_history.append(
+            SearchStats(
+                nodes_searched=self._nodes_searched,
+                elapsed_seconds=time.perf_counter() - start_time,
+                depth_reached=depth_reached,
+                best_score=best_score,
+            )
+        )
+        return best_index + 1
+
+    def _prepare_for_board(self, board: Board) -> None:
+        """
+        Fetch the line layout of the board, and drop the transposition table if
+        the board shape has changed or the table has grown too much.
+        :param board: the board the match is played on.
+        :return: None
+        """
+        layout = get_line_layout(
+            column_count=board.column_count,
+            row_count=board.row_count,
+            win_length=board.win_length,
+        )
+        if layout is not self._layout:
+            self._layout = layout
+            self._symmetries = (
+                get_board_symmetries(
+                    column_count=board.column_count, row_count=board.row_count
+                )
+                if self._use_symmetries
+                else None
+            )
+            self._transposition_table = {}
+            # Cells in more lines are usually better, so they are tried first
+            self._move_order = sorted(
+                range(0, board.last_cell_id),
+                key=lambda index: -len(layout.lines_by_cell.get(index + 1, ())),
+            )
+        if len(self._transposition_table) > self._max_table_size:
+            self._transposition_table = {}
+
+    def _search_root(
+        self, cells: List[str], mark: str, depth: int, marks_count: int
+    ) -> Tuple[int, int]:
+        """
+        Search every move of the current position to a given depth.
+        :param cells: the contents of every cell, by cell index.
+        :param mark: the mark of the player that moves.
+        :param depth: how many moves ahead to look.
+        :param marks_count: how many marks there are on the board.
+        :return: the score of the best move and the index of its cell.
+        """
+        self._negamax(cells, mark, depth, -WIN_SCORE - 1, WIN_SCORE + 1, marks_count)
+        key, transform_index = self._table_key(cells, mark)
+        _, score, _, table_best_index = self._transposition_table[key]
+        return score, self._from_table_index(table_best_index, transform_index)
+
+    # The window and the mark count are passed down the recursion rather than
+    # kept on the instance, which would cost an attribute write at every node
+    def _negamax(  # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        cells: List[str],
+        mark: str,
+        depth: int,
+        alpha: int,
+        beta: int,
+        marks_count: int,
+    ) -> int:
+        """
+        Score a position from the point of view of the player that moves.
+        :param cells: the contents of every cell, by cell index. It is
+        modified during the search and restored before returning.
+        :param mark: the mark of the player that moves.
+        :param depth: how many moves ahead to look.
+        :param alpha: the score the player that moves is already guaranteed.
+        :param beta: the score the opponent is already guaranteed.
+        :param marks_count: how many marks there are on the board.
+        :return: the score of the position.
+        :raises SearchTimeout: if the time limit runs out.
+        """
+        self._nodes_searched += 1
+        if (
+            self._deadline is not None
+            and self._nodes_searched & 1023 == 0
+            and time.perf_counter() > self._deadline
+        ):
+            raise SearchTimeout()
+
+        key, transform_index = self._table_key(cells, mark)
+        entry = self._transposition_table.get(key)
+        table_best_index = None
+        if entry is not None:
+            table_best_index = self._from_table_index(entry[3], transform_index)
+            alpha, beta = _narrow_window(entry, depth, alpha, beta)
+            if alpha >= beta:
+                return entry[1]
+
+        empty_cell_count = len(cells) - marks_count
+        if empty_cell_count == 0:
+            return 0
+        if depth == 0:
+            return self._evaluate(cells, mark)
+
+        original_alpha = alpha
+        opponent_mark = OPPONENT_MARKS[mark]
+        best_value = -WIN_SCORE - 1
+        best_index = None
+
+        for index in self._move_order_for(cells, table_best_index):
+            cells[index] = mark
+            if self._is_winning_move(cells, index, mark):
+                value = WIN_SCORE - (marks_count + 1)
+            else:
+                value = -self._negamax(
+                    cells, opponent_mark, depth - 1, -beta, -alpha, marks_count + 1
+                )
+            cells[index] = EMPTY_CELL
+
+            if value > best_value:
+                best_value = value
+                best_index = index
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        self._transposition_table[key] = (
+            # A search that reaches the end of the match is valid at any depth
+            len(cells) if depth >= empty_cell_count else depth,
+            best_value,
+            _entry_kind(best_value, original_alpha, beta),
+            self._to_table_index(best_index, transform_index),
+        )
+
+        return best_value
+
+    def _table_key(self, cells: List[str], mark: str) -> Tuple[Tuple, int]:
+        """
+        Build the key of a position in the transposition table.
+        :param cells: the contents of every cell, by cell index.
+        :param mark: the mark of the player that moves.
+        :return: the key, and the index of the transform that turns the
+        position into the one stored in the table.
+        """
+        if self._symmetries is None:
+            return (tuple(cells), mark), 0
+        canonical_position, transform_index = self._symmetries.canonicalize(cells)
+        return (canonical_position, mark), transform_index
+
+    def _to_table_index(self, index: int, transform_index: int) -> int:
+        """
+        Map a cell index of the searched position to the stored position.
+        :param index: the cell index in the searched position.
+        :param transform_index: the transform returned by _table_key.
+        :return: the cell index in the stored position.
+        """
+        if transform_index == 0:
+            return index
+        return self._symmetries.to_canonical_cell(index + 1, transform_index) - 1
+
+    def _from_table_index(
+        self, index: Optional[int], transform_index: int
+    ) -> Optional[int]:
+        """
+        Map a cell index of the stored position back to the searched position.
+        :param index: the cell index in the stored position, if any.
+        :param transform_index: the transform returned by _table_key.
+        :return: the cell index in the searched position.
+        """
+        if index is None or transform_index == 0:
+            return index
+        return self._symmetries.to_original_cell(index + 1, transform_index) - 1
+
+    def _move_order_for(
+        self, cells: List[str], first_index: Optional[int]
+    ) -> List[int]:
+        """
+        Sort the empty cells in the order they should be tried.
+        :param cells: the contents of every cell, by cell index.
+        :param first_index: a cell to try before all others, usually the best
+        one found by an earlier search.
+        :return: the indices of the empty cells.
+        """
+        ordered_indices = [
+            index for index in self._move_order if cells[index] == EMPTY_CELL
+        ]
+        if first_index is not None:
+            ordered_indices.remove(first_index)
+            ordered_indices.insert(0, first_index)
+        return ordered_indices
+
+    def _is_winning_move(self, cells: List[str], index: int, mark: str) -> bool:
+        """
+        Check if the mark just written in a cell completes a line.
+        :param cells: the contents of every cell, by cell index.
+        :param index: the index of the cell just written.
+        :param mark: the mark just written.
+        :return: True if so, False otherwise.
+        """
+        lines = self._layout.lines
+        for line_index in self._layout.lines_by_cell.get(index + 1, ()):
+            if all(cells[cell_id - 1] == mark for cell_id in lines[line_index]):
+                return True
+        return False
+
+    def _evaluate(self, cells: List[str], mark: str) -> int:
+        """
+        Estimate how good an unfinished position is for the player that moves,
+        by counting the lines each player can still complete and how many
+        marks they already have in them.
+        :param cells: the contents of every cell, by cell index.
+        :param mark: the mark of the player that moves.
+        :return: the estimated score, always far from the score of a win.
+        """
+        opponent_mark = OPPONENT_MARKS[mark]
+        score = 0
+        for line in self._layout.lines:
+            line_contents = [cells[cell_id - 1] for cell_id in line]
+            own_count = line_contents.count(mark)
+            opponent_count = line_contents.count(opponent_mark)
+            if opponent_count == 0:
+                score += 4 ** own_count
+            elif own_count == 0:
+                score -= 4 ** opponent_count
+        return score
+
+
+def _narrow_window(
+    entry: TableEntry, depth: int, alpha: int, beta: int
+) -> Tuple[int, int]:
+    """
+    Use what the transposition table knows about a position to narrow the
+    window of scores a search of it has to consider.
+    :param entry: the entry of the position in the table.
+    :param depth: how many moves ahead the search looks.
+    :param alpha: the score the player that moves is already guaranteed.
+    :param beta: the score the opponent is already guaranteed.
+    :return: the narrowed alpha and beta. When alpha reaches beta, the value
+    in the entry can be returned as the score of the position.
+    """
+    entry_depth, entry_value, entry_kind, _ = entry
+    if entry_depth < depth:
+        return alpha, beta
+    if entry_kind == EXACT_VALUE:
+        return entry_value, entry_value
+    if entry_kind == LOWER_BOUND:
+        return max(alpha, entry_value), beta
+    return alpha, min(beta, entry_value)
+
+
+def _entry_kind(value: int, original_alpha: int, beta: int) -> int:
+    """
+    Find what a score found by a search tells about the true score.
+    :param value: the score found.
+    :param original_alpha: the alpha the search started with.
+    :param beta: the beta of the search.
+    :return: EXACT_VALUE, LOWER_BOUND or UPPER_BOUND.
+    """
+    if value <= original_alpha:
+        return UPPER_BOUND
+    if value >= beta:
+        return LOWER_BOUND
+    return EXACT_VALUE
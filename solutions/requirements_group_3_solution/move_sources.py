@@ -0,0 +1,131 @@
+"""
+Sources of moves for the players in a match: a human on the CLI, a fixed
+script, random play or any callable.
+"""
+
+import random
+from typing import Callable, Iterable, Optional
+
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.utils import input_with_validation
+
+
+class BaseMoveSource:
+    """
+    Move sources decide which cell a player marks on each turn.
+    """
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Pick the cell to write on next.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        """
+        raise NotImplementedError()
+
+    @property
+    def last_move_report(self) -> Optional[str]:
+        """
+        A description of how the last cell was chosen, for the match to show
+        along with its other messages.
+        :return: the description, or None if there is nothing to show.
+        """
+        return None
+
+
+class HumanMoveSource(BaseMoveSource):
+    """
+    Asks a human on the CLI which cell to mark.
+    """
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Ask for a cell number until a valid one is given.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        """
+        return int(
+            input_with_validation(
+                prompt=f"Which cell to mark?[{board.first_cell_id}"
+                f"-{board.last_cell_id}]",
+                validation_func=lambda x: board.first_cell_id
+                <= int(x)
+                <= board.last_cell_id,
+                retry=True,
+            )
+        )
+
+
+class ScriptedMoveSource(BaseMoveSource):
+    """
+    Plays a predefined sequence of cells, one per turn.
+    """
+
+    def __init__(self, cell_ids: Iterable[int]):
+        """
+        Receive the cells to play.
+        :param cell_ids: the number ids of the cells, in the order to play them.
+        """
+        self._cell_ids = iter(cell_ids)
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Take the next cell of the script.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        :raises ValueError: if the script has run out of cells.
+        """
+        try:
+            return next(self._cell_ids)
+        except StopIteration:
+            raise ValueError("The script has no more moves.") from None
+
+
+class RandomMoveSource(BaseMoveSource):
+    """
+    Picks any empty cell at random.
+    """
+
+    def __init__(self, seed: Optional[int] = None, rng: Optional[random.Random] = None):
+        """
+        Set up the random number generator.
+        :param seed: a seed to make the choices reproducible.
+        :param rng: a generator to use instead of creating one from the seed.
+        """
+        self._rng = rng if rng is not None else random.Random(seed)
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Pick one of the empty cells.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        """
+        return self._rng.choice(board.get_empty_cell_ids())
+
+
+class CallbackMoveSource(BaseMoveSource):
+    """
+    Delegates the choice to any callable. The match raises if the callable
+    picks a cell that can't be written on, instead of calling it again.
+    """
+
+    def __init__(self, callback: Callable[[Board, str], int]):
+        """
+        Receive the callable.
+        :param callback: a function that takes the board and the mark of the
+        player that moves, and returns the number id of a cell.
+        """
+        self._callback = callback
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Ask the callable for a cell.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        """
+        return self._callback(board, mark)
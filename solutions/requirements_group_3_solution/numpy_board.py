@@ -0,0 +1,540 @@
+"""
+A board engine that keeps the state of the board as a small integer NumPy
+array. Positions loaded in bulk are checked for lines with vectorized sliding
+window sums over the whole grid.
+
+Move by move, vectorized operations cost more than the few cells a write can
+affect, so a single write is checked by walking the cells around it instead.
+That keeps it ahead of Board on large boards, but it is slower than BitBoard
+on every board size: it is meant for loading and evaluating whole positions,
+see apply_moves and batch_evaluation, not for playing move by move.
+
+NumPy is an optional dependency: this engine is only available when it is
+installed.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from solutions.requirements_group_3_solution.board import (
+    Cell,
+    CellGroup,
+    decode_position,
+)
+from solutions.requirements_group_3_solution.lines import LINE_DIRECTIONS
+from solutions.requirements_group_3_solution.zobrist import (
+    ZobristHashes,
+    get_zobrist_table,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+NUMPY_IS_AVAILABLE = np is not None
+EMPTY_CODE = 0
+
+
+class NumpyBoard:
+    """
+    The state of the board, stored as a 2D array of mark codes, 0 meaning
+    empty. Exposes the same public methods as Board, so it can be used in its
+    place, but see the module docstring on why it loses move by move.
+    """
+
+    # The grid, the cached status and the history are read on every move, so
+    # they are kept in flat slots rather than grouped behind another lookup.
+    # The public ones are the interface shared by every engine
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "column_count",
+        "row_count",
+        "shape",
+        "first_cell_id",
+        "last_cell_id",
+        "win_length",
+        "_grid",
+        "_codes_by_mark",
+        "_marks_by_code",
+        "_marked_cells_count",
+        "_winning_mark",
+        "_winning_positions",
+        "_is_stalemate",
+        "row_versions",
+        "_move_history",
+        "_zobrist_table",
+        "_zobrist_hashes",
+    )
+
+    def __init__(
+        self,
+        size: int,
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ):
+        """
+        Generate a blank board with no contents.
+        :param size: indicates the size of the board, as the number of cells in
+        each row.
+        :param win_length: how many marks in a row are needed to win. Defaults
+        to the size, so a line must span the whole board.
+        :param row_count: the number of rows, for non square boards. Defaults
+        to the size.
+        :raises ImportError: if NumPy is not installed.
+        """
+        if not NUMPY_IS_AVAILABLE:
+            raise ImportError("NumpyBoard needs NumPy: pip install numpy")
+
+        self.column_count = size
+        self.row_count = size if row_count is None else row_count
+        self.shape = (self.column_count, self.row_count)
+        self.first_cell_id = 1
+        self.last_cell_id = self.column_count * self.row_count
+        self.win_length = size if win_length is None else win_length
+        if not 1 <= self.win_length <= max(self.column_count, self.row_count):
+            raise ValueError(
+                f"A win length of {self.win_length} doesn't fit in a "
+                f"{self.column_count}x{self.row_count} board."
+            )
+        self._grid = np.zeros((self.row_count, self.column_count), dtype=np.int8)
+        self._codes_by_mark: Dict[str, int] = {}
+        self._marks_by_code: Dict[int, str] = {}
+        self._marked_cells_count = 0
+        self._winning_mark: Optional[str] = None
+        self._winning_positions: List[Tuple[int, int]] = []
+        self._is_stalemate = False
+        self.row_versions = [0] * self.row_count
+        self._zobrist_table = get_zobrist_table(
+            column_count=self.column_count, row_count=self.row_count
+        )
+        self._zobrist_hashes = self._zobrist_table.empty_hashes
+        self._move_history: List[
+            Tuple[int, int, Optional[str], List[Tuple[int, int]], bool]
+        ] = []
+
+    @classmethod
+    def from_moves(
+        cls,
+        size: int,
+        moves: Iterable[Tuple[int, str]],
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ) -> "NumpyBoard":
+        """
+        Build a board with a list of moves already played on it, working out
+        its status once, after the last move.
+        :param size: the number of cells in each row.
+        :param moves: the number id of each cell played, with its mark.
+        :param win_length: how many marks in a row are needed to win.
+        :param row_count: the number of rows, for non square boards.
+        :return: the board.
+        :raises ValueError: if a cell is played twice.
+        """
+        board = cls(size=size, win_length=win_length, row_count=row_count)
+        board.apply_moves(moves)
+        return board
+
+    @classmethod
+    def from_encoded(
+        cls,
+        size: int,
+        encoded_position: Sequence[int],
+        win_length: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ) -> "NumpyBoard":
+        """
+        Build a board with an encoded position on it, working out its status
+        once, after every mark is written.
+        :param size: the number of cells in each row.
+        :param encoded_position: the code of the contents of every cell, in
+        cell number order, as in CELL_CODES.
+        :param win_length: how many marks in a row are needed to win.
+        :param row_count: the number of rows, for non square boards.
+        :return: the board.
+        :raises ValueError: if the position doesn't have one code per cell, or
+        a code is not one of CELL_CODES.
+        """
+        board = cls(size=size, win_length=win_length, row_count=row_count)
+        if len(encoded_position) != board.last_cell_id:
+            raise ValueError(
+                f"A {board.column_count}x{board.row_count} position needs "
+                f"{board.last_cell_id} cells, not {len(encoded_position)}."
+            )
+        board.apply_moves(decode_position(encoded_position))
+        return board
+
+    def apply_moves(self, moves: Iterable[Tuple[int, str]]) -> None:
+        """
+        Write a batch of marks into the grid, working out the status of the
+        board once at the end, with one scan of the whole grid per mark.
+        Marks are written even after a line is complete, and the history of
+        moves is cleared, as in Board.apply_moves.
+        :param moves: the number id of each cell to write into, with its mark.
+        :return: None
+        :raises ValueError: if a cell is not empty. The marks before it are
+        kept.
+        """
+        written_moves = []
+        try:
+            for cell_number, mark in moves:
+                if not self.first_cell_id <= cell_number <= self.last_cell_id:
+                    raise KeyError(cell_number)
+                row_index, cell_in_row = divmod(cell_number - 1, self.column_count)
+                if self._grid.item(row_index, cell_in_row) != EMPTY_CODE:
+                    raise ValueError("Can't write on cell, it has contents")
+                self._grid[row_index, cell_in_row] = self._code_for_mark(mark)
+                written_moves.append((cell_number, mark))
+        finally:
+            self._update_status_after_batch(written_moves)
+
+    def write_mark_on_cell_if_empty(self, cell_number: int, mark: str) -> None:
+        """
+        Try to write a mark on a cell, raise an error if it's not empty.
+        :param cell_number: The number id of the cell to write into.
+        :param mark: The mark to write in the cell.
+        :return: None
+        """
+        self.make_move(cell_number, mark)
+
+    def make_move(self, cell_number: int, mark: str) -> None:
+        """
+        Write a mark on an empty cell, remembering what is needed to take it
+        back with unmake_move.
+        :param cell_number: The number id of the cell to write into.
+        :param mark: The mark to write in the cell.
+        :return: None
+        :raises ValueError: if the cell is not empty.
+        """
+        if not self.first_cell_id <= cell_number <= self.last_cell_id:
+            raise KeyError(cell_number)
+
+        row_index, cell_in_row = divmod(cell_number - 1, self.column_count)
+        if self._grid.item(row_index, cell_in_row) != EMPTY_CODE:
+            raise ValueError("Can't write on cell, it has contents")
+
+        self._move_history.append(
+            (
+                row_index,
+                cell_in_row,
+                self._winning_mark,
+                self._winning_positions,
+                self._is_stalemate,
+            )
+        )
+
+        mark_code = self._code_for_mark(mark)
+        self._grid[row_index, cell_in_row] = mark_code
+        self._zobrist_hashes = self._zobrist_table.toggle(
+            self._zobrist_hashes, cell_number, mark
+        )
+        self._marked_cells_count += 1
+        self.row_versions[row_index] += 1
+
+        if self._winning_mark is None:
+            winning_positions = self._find_winning_run_through(
+                row_index, cell_in_row, mark_code
+            )
+            if winning_positions:
+                self._winning_mark = mark
+                self._winning_positions = winning_positions
+
+        self._is_stalemate = (
+            self._winning_mark is None and self._marked_cells_count == self.last_cell_id
+        )
+
+    def unmake_move(self) -> int:
+        """
+        Take back the last move, restoring the grid and the cached status of
+        the board as they were before it, in constant time.
+        :return: the number id of the cell that was emptied.
+        :raises ValueError: if there are no moves to take back.
+        """
+        if not self._move_history:
+            raise ValueError("There are no moves to take back.")
+
+        (
+            row_index,
+            cell_in_row,
+            self._winning_mark,
+            self._winning_positions,
+            self._is_stalemate,
+        ) = self._move_history.pop()
+        cell_number = row_index * self.column_count + cell_in_row + 1
+        mark = self._marks_by_code[int(self._grid[row_index, cell_in_row])]
+        self._zobrist_hashes = self._zobrist_table.toggle(
+            self._zobrist_hashes, cell_number, mark
+        )
+        self._grid[row_index, cell_in_row] = EMPTY_CODE
+        self._marked_cells_count -= 1
+        # Versions only grow, so a render cached for another state is never reused
+        self.row_versions[row_index] += 1
+        return cell_number
+
+    @property
+    def there_is_winning_combo(self) -> bool:
+        """
+        Check if any line on the board is a winning combination of cells. The
+        result is worked out once per write, so this is just a lookup.
+        :return: True if there is a winning line of cells, False otherwise.
+        """
+        return self._winning_mark is not None
+
+    def get_winning_mark(self) -> str:
+        """
+        Find out what is the mark present in the winning group of cells.
+        :return: The winning mark.
+        :raises ValueError: if no winning combination is found on the board.
+        """
+        if self._winning_mark is None:
+            raise ValueError("There is no winning line in the board.")
+        return self._winning_mark
+
+    @property
+    def there_is_stalemate(self) -> bool:
+        """
+        Check if the board contains a stalemate situation.
+        :return: True if so, False otherwise.
+        """
+        return self._is_stalemate
+
+    def get_empty_cell_ids(self) -> List[int]:
+        """
+        Find the cells that can still be written on.
+        :return: the number ids of the empty cells, in ascending order.
+        """
+        return (np.flatnonzero(self._grid == EMPTY_CODE) + 1).tolist()
+
+    @property
+    def zobrist_hash(self) -> int:
+        """
+        The 64 bit Zobrist hash of the position, kept up to date on every move
+        and undo.
+        :return: the hash.
+        """
+        return self._zobrist_hashes[0]
+
+    @property
+    def symmetric_zobrist_hashes(self) -> ZobristHashes:
+        """
+        The Zobrist hashes of the position and of its rotations and
+        reflections, in the order of BoardSymmetries.transforms, so the first
+        one is zobrist_hash. They are kept up to date along with it.
+        :return: the hashes.
+        """
+        return self._zobrist_hashes
+
+    def get_winning_cells(self) -> CellGroup:
+        """
+        Return the winning group of cells found when the last mark was written.
+        :return: the winning group of cells.
+        :raises ValueError: if no winning combination is found on the board.
+        """
+        if self._winning_mark is None:
+            raise ValueError("There is no winning line in the board.")
+        return CellGroup(
+            [
+                self._build_cell(row_index, cell_in_row)
+                for row_index, cell_in_row in self._winning_positions
+            ]
+        )
+
+    @property
+    def cells_by_position(self) -> List[CellGroup]:
+        """
+        Build the grid of cells that represents the current state of the board,
+        in the same layout Board uses.
+        :return: all the cells, correctly placed in a 2D grid.
+        """
+        return [self.get_row(row_index) for row_index in range(0, self.row_count)]
+
+    def get_row(self, row_index: int) -> CellGroup:
+        """
+        Build the cells of one row of the board.
+        :param row_index: the index of the row, from the top.
+        :return: the cells in the row.
+        """
+        return CellGroup(
+            [
+                self._build_cell(row_index, cell_in_row)
+                for cell_in_row in range(0, self.column_count)
+            ]
+        )
+
+    def _build_cell(self, row_index: int, cell_in_row: int) -> Cell:
+        """
+        Build the cell at a position of the grid, with its contents.
+        :param row_index: the index of the row, from the top.
+        :param cell_in_row: the index of the cell within the row.
+        :return: the cell.
+        """
+        cell = Cell(
+            x_position=row_index,
+            y_position=cell_in_row,
+            number_id=row_index * self.column_count + cell_in_row + 1,
+        )
+        mark_code = int(self._grid[row_index, cell_in_row])
+        cell.contents = self._marks_by_code.get(mark_code)
+        return cell
+
+    def _code_for_mark(self, mark: str) -> int:
+        """
+        Get the code a mark is stored as, assigning a new one to new marks.
+        :param mark: the mark.
+        :return: the code of the mark.
+        """
+        if mark not in self._codes_by_mark:
+            mark_code = len(self._codes_by_mark) + 1
+            self._codes_by_mark[mark] = mark_code
+            self._marks_by_code[mark_code] = mark
+        return self._codes_by_mark[mark]
+
+    def _update_status_after_batch(self, written_moves: List[Tuple[int, str]]) -> None:
+        """
+        Update the hashes, versions, history and cached status of the board
+        after a batch of marks has been written.
+        :param written_moves: the number id of each cell written, with its mark.
+        :return: None
+        """
+        zobrist_hashes = self._zobrist_hashes
+        for cell_number, mark in written_moves:
+            zobrist_hashes = self._zobrist_table.toggle(
+                zobrist_hashes, cell_number, mark
+            )
+            self.row_versions[(cell_number - 1) // self.column_count] += 1
+        self._zobrist_hashes = zobrist_hashes
+        self._marked_cells_count += len(written_moves)
+        self._move_history.clear()
+
+        if self._winning_mark is None:
+            written_codes = {self._codes_by_mark[mark] for _, mark in written_moves}
+            for mark_code in sorted(written_codes):
+                winning_positions = self._find_complete_window(self._grid == mark_code)
+                if winning_positions:
+                    self._winning_mark = self._marks_by_code[mark_code]
+                    self._winning_positions = winning_positions
+                    break
+
+        self._is_stalemate = (
+            self._winning_mark is None and self._marked_cells_count == self.last_cell_id
+        )
+
+    def _find_winning_run_through(
+        self, row_index: int, cell_in_row: int, mark_code: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Look for a complete line of a mark through a cell, by walking the grid
+        from the cell along every direction. A single write only touches a
+        handful of cells, too few for vectorized operations to pay off.
+        :param row_index: the row of the cell.
+        :param cell_in_row: the position of the cell within its row.
+        :param mark_code: the code of the mark to look for.
+        :return: the positions of the cells of the first complete line found,
+        in layout order like Board, empty if there is none.
+        """
+        for row_step, cell_step in LINE_DIRECTIONS:
+            backward = self._count_run(
+                (row_index, cell_in_row), (-row_step, -cell_step), mark_code
+            )
+            forward = self._count_run(
+                (row_index, cell_in_row), (row_step, cell_step), mark_code
+            )
+            if backward + 1 + forward >= self.win_length:
+                # The line that starts furthest back comes first in the layout
+                first_step = -min(backward, self.win_length - 1)
+                return [
+                    (
+                        row_index + step * row_step,
+                        cell_in_row + step * cell_step,
+                    )
+                    for step in range(first_step, first_step + self.win_length)
+                ]
+
+        return []
+
+    def _count_run(
+        self, position: Tuple[int, int], direction: Tuple[int, int], mark_code: int
+    ) -> int:
+        """
+        Count the cells with a mark that follow a cell along a direction, up to
+        the most a line through the cell can use.
+        :param position: the row of the cell and its position within the row.
+        :param direction: the row step and the column step of the direction.
+        :param mark_code: the code of the mark to look for.
+        :return: the number of consecutive cells with the mark.
+        """
+        row_index, cell_in_row = position
+        row_step, cell_step = direction
+        grid_item = self._grid.item
+        count = 0
+        for _ in range(1, self.win_length):
+            row_index += row_step
+            cell_in_row += cell_step
+            if not (
+                0 <= row_index < self.row_count
+                and 0 <= cell_in_row < self.column_count
+                and grid_item(row_index, cell_in_row) == mark_code
+            ):
+                break
+            count += 1
+        return count
+
+    def _find_complete_window(self, mark_grid: "np.ndarray") -> List[Tuple[int, int]]:
+        """
+        Look for a complete line anywhere on the grid, with one vectorized
+        pass over the whole grid per direction.
+        :param mark_grid: whether each cell of the grid holds the mark.
+        :return: the positions of the cells of the first complete line found,
+        in layout order like Board, empty if there is none.
+        """
+        for row_step, cell_step in LINE_DIRECTIONS:
+            window_sums, first_row = sliding_window_sums(
+                mark_grid, self.win_length, row_step, cell_step
+            )
+            if window_sums is None:
+                continue
+            # Transposed to pick the first line column by column, like Board
+            complete_windows = np.argwhere(window_sums.T == self.win_length)
+            if complete_windows.size:
+                start_cell = int(complete_windows[0][0])
+                start_row = first_row + int(complete_windows[0][1])
+                return [
+                    (start_row + step * row_step, start_cell + step * cell_step)
+                    for step in range(0, self.win_length)
+                ]
+
+        return []
+
+
+def sliding_window_sums(
+    grid: "np.ndarray", win_length: int, row_step: int, cell_step: int
+) -> Tuple[Optional["np.ndarray"], int]:
+    """
+    Count, for every run of win_length cells along a direction, how many of its
+    cells are set in a boolean grid. Adds win_length shifted views of the grid,
+    so the work is vectorized over all the runs at once.
+    :param grid: a 2D boolean array.
+    :param win_length: the length of the runs.
+    :param row_step: the row step between consecutive cells of a run.
+    :param cell_step: the column step between consecutive cells of a run.
+    :return: the count of every run, indexed by the position of its first
+    cell, and the row of the grid that index 0 refers to. The counts are None
+    if no run fits in the grid.
+    """
+    height, width = grid.shape
+    row_span = (win_length - 1) * abs(row_step)
+    cell_span = (win_length - 1) * cell_step
+    if row_span >= height or cell_span >= width:
+        return None, 0
+
+    first_row = row_span if row_step < 0 else 0
+    window_sums = np.zeros((height - row_span, width - cell_span), dtype=np.int16)
+    for step in range(0, win_length):
+        shifted_row = first_row + step * row_step
+        shifted_cell = step * cell_step
+        window_sums += grid[
+            shifted_row : shifted_row + height - row_span,
+            shifted_cell : shifted_cell + width - cell_span,
+        ]
+
+    return window_sums, first_row
@@ -0,0 +1,276 @@
+"""
+Opt-in instrumentation of the hot operations of the game: win checks, line
+construction, renders, waits for input and moves per match.
+
+Nothing is instrumented until enable_profiling is called: it replaces the
+methods of interest with wrappers that count and time each call, and
+disable_profiling puts the original methods back. While disabled, the code
+runs exactly as if this module didn't exist.
+
+Only the current process is instrumented, and functions imported by name
+are only replaced in the modules that were already imported when profiling
+was enabled.
+"""
+
+import json
+import sys
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from solutions.requirements_group_3_solution import utils
+from solutions.requirements_group_3_solution.bitboard import BitBoard
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.match import Match
+from solutions.requirements_group_3_solution.numpy_board import NumpyBoard
+from solutions.requirements_group_3_solution.rendering import BoardRenderer
+
+DEFAULT_DUMP_INTERVAL = 10.0
+
+# The methods that are instrumented, with the name their counters are kept by
+INSTRUMENTED_METHODS = (
+    ("win_check.cells", Board, "_update_status_after_write"),
+    ("win_check.cells_batch", Board, "_update_status_after_batch"),
+    # The win check is inlined in the move, so the whole move is timed
+    ("win_check.bitboard_move", BitBoard, "make_move"),
+    ("win_check.bitboard_batch", BitBoard, "_update_status_after_batch"),
+    ("win_check.numpy", NumpyBoard, "_find_winning_run_through"),
+    ("win_check.numpy_batch", NumpyBoard, "_update_status_after_batch"),
+    ("line_construction", Board, "_get_cells_in_line"),
+    ("render", BoardRenderer, "render"),
+    ("match.start", Match, "__init__"),
+    ("match.move", Match, "apply_move"),
+)
+INPUT_WAIT = "input_wait"
+
+
+class OperationStats:
+    """
+    How many times an operation ran, how many of those raised an error and
+    how long it took in total.
+    """
+
+    __slots__ = ("calls", "errors", "total_seconds")
+
+    def __init__(self):
+        """
+        Start with no calls.
+        """
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the stats in a plain dict.
+        :return: the calls, the errors, the total time and the mean time per
+        call.
+        """
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_seconds": self.total_seconds,
+            "mean_microseconds": (
+                self.total_seconds / self.calls * 1e6 if self.calls else 0.0
+            ),
+        }
+
+
+class _ProfilingState:
+    """
+    The stats being gathered and what is needed to undo the instrumentation.
+    """
+
+    def __init__(self):
+        """
+        Start disabled.
+        """
+        self.stats_by_operation: Dict[str, OperationStats] = {}
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.restorers: List[Callable[[], None]] = []
+        self.dump_thread: Optional[threading.Thread] = None
+        self.stop_dumping = threading.Event()
+
+
+_state = _ProfilingState()
+
+
+def is_profiling_enabled() -> bool:
+    """
+    Check whether the hot operations are being instrumented.
+    :return: True if so, False otherwise.
+    """
+    return _state.started_at is not None and _state.stopped_at is None
+
+
+def enable_profiling() -> None:
+    """
+    Start counting and timing the hot operations, from zero. Does nothing if
+    profiling is already enabled.
+    :return: None
+    """
+    if is_profiling_enabled():
+        return
+
+    _state.stats_by_operation = {}
+    _state.started_at = time.perf_counter()
+    _state.stopped_at = None
+
+    for operation, owner, attribute in INSTRUMENTED_METHODS:
+        original = vars(owner)[attribute]
+        setattr(owner, attribute, _timed(operation, original))
+        _state.restorers.append(_restorer(owner, attribute, original))
+
+    # Imported by name, so it is replaced in every module that has it
+    original_input = utils.input_with_validation
+    timed_input = _timed(INPUT_WAIT, original_input)
+    for module in list(sys.modules.values()):
+        if getattr(module, "input_with_validation", None) is original_input:
+            setattr(module, "input_with_validation", timed_input)
+            _state.restorers.append(
+                _restorer(module, "input_with_validation", original_input)
+            )
+
+
+def disable_profiling() -> None:
+    """
+    Stop the periodic dump, if any, and put back every original method. The
+    stats gathered so far are kept until profiling is enabled again.
+    :return: None
+    """
+    stop_periodic_dump()
+    while _state.restorers:
+        _state.restorers.pop()()
+    if is_profiling_enabled():
+        _state.stopped_at = time.perf_counter()
+
+
+def get_profiling_snapshot() -> Dict[str, Any]:
+    """
+    Summarize the stats gathered so far in a plain dict.
+    :return: whether profiling is enabled, for how long it has been or was
+    enabled, the stats of each operation, and the number of moves per match.
+    """
+    stats_by_operation = dict(_state.stats_by_operation)
+    matches = stats_by_operation.get("match.start", OperationStats()).calls
+    move_stats = stats_by_operation.get("match.move", OperationStats())
+    # Moves on cells that already had a mark are rejected with an error
+    moves = move_stats.calls - move_stats.errors
+    return {
+        "enabled": is_profiling_enabled(),
+        "elapsed_seconds": (
+            (_state.stopped_at or time.perf_counter()) - _state.started_at
+            if _state.started_at is not None
+            else 0.0
+        ),
+        "operations": {
+            operation: stats.as_dict()
+            for operation, stats in sorted(stats_by_operation.items())
+        },
+        "matches": {
+            "started": matches,
+            "moves": moves,
+            "moves_per_match": moves / matches if matches else 0.0,
+        },
+    }
+
+
+def dump_profiling_snapshot(stream: Optional[TextIO] = None) -> None:
+    """
+    Write the current snapshot as one line of JSON.
+    :param stream: where to write it. Defaults to whatever sys.stderr is at the
+    time of writing.
+    :return: None
+    """
+    stream = sys.stderr if stream is None else stream
+    stream.write(json.dumps(get_profiling_snapshot()) + "\n")
+    stream.flush()
+
+
+def start_periodic_dump(
+    interval: float = DEFAULT_DUMP_INTERVAL, stream: Optional[TextIO] = None
+) -> None:
+    """
+    Dump the snapshot every so often from a background thread, until the dump
+    is stopped or profiling is disabled.
+    :param interval: the seconds between dumps.
+    :param stream: where to write the snapshots. Defaults to whatever
+    sys.stderr is at the time of each dump.
+    :return: None
+    """
+    stop_periodic_dump()
+    _state.stop_dumping = threading.Event()
+    _state.dump_thread = threading.Thread(
+        target=_dump_until_stopped,
+        args=(interval, stream, _state.stop_dumping),
+        name="profiling-dump",
+        daemon=True,
+    )
+    _state.dump_thread.start()
+
+
+def stop_periodic_dump() -> None:
+    """
+    Stop the periodic dump, if there is one running.
+    :return: None
+    """
+    if _state.dump_thread is not None:
+        _state.stop_dumping.set()
+        _state.dump_thread.join()
+        _state.dump_thread = None
+
+
+def _dump_until_stopped(
+    interval: float, stream: Optional[TextIO], stop_dumping: threading.Event
+) -> None:
+    """
+    Dump the snapshot every interval seconds, until told to stop.
+    :param interval: the seconds between dumps.
+    :param stream: where to write the snapshots, None for sys.stderr.
+    :param stop_dumping: set to stop.
+    :return: None
+    """
+    while not stop_dumping.wait(interval):
+        dump_profiling_snapshot(stream)
+
+
+def _timed(operation: str, function: Callable) -> Callable:
+    """
+    Wrap a function to count and time its calls.
+    :param operation: the name the stats are kept by.
+    :param function: the function to wrap.
+    :return: the wrapper.
+    """
+    stats = _state.stats_by_operation.setdefault(operation, OperationStats())
+    perf_counter = time.perf_counter
+
+    @wraps(function)
+    def timed_function(*args, **kwargs):
+        started_at = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            stats.calls += 1
+            stats.total_seconds += perf_counter() - started_at
+
+    return timed_function
+
+
+def _restorer(owner: Any, attribute: str, original: Any) -> Callable[[], None]:
+    """
+    Build a function that puts an original attribute back in place.
+    :param owner: the class or module the attribute belongs to.
+    :param attribute: the name of the attribute.
+    :param original: the original value.
+    :return: the function.
+    """
+
+    def restore() -> None:
+        setattr(owner, attribute, original)
+
+    return restore
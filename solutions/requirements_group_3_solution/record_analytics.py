@@ -0,0 +1,226 @@
+"""
+Aggregate statistics over game record files of any size. Games are streamed
+from disk and replayed one at a time, so memory use only depends on the
+number of distinct keys being aggregated, never on the number of games.
+"""
+
+import argparse
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from solutions.requirements_group_3_solution.game_records import (
+    DRAW,
+    UNFINISHED,
+    GameRecord,
+    read_game_records,
+)
+from solutions.requirements_group_3_solution.match import BOARD_ENGINES
+
+MARKS_BY_PLAYER = {1: "X", 2: "O"}
+PLAYERS_BY_MARK = {"X": 1, "O": 2}
+
+# Outcomes from the point of view of the player who moved first
+FIRST_PLAYER_WON = "first_player_won"
+SECOND_PLAYER_WON = "second_player_won"
+DRAWN = "draw"
+NOT_FINISHED = "unfinished"
+
+
+def read_all_game_records(paths: Iterable[str]) -> Iterator[GameRecord]:
+    """
+    Chain the games of several record files.
+    :param paths: the paths of the files.
+    :return: an iterator over the games of every file, in order.
+    """
+    for path in paths:
+        yield from read_game_records(path)
+
+
+def replay_game(game: GameRecord, board_engine: str = "bitboard") -> int:
+    """
+    Play the moves of a recorded game on a board, with the same rules as a
+    live match, to find how it ended.
+    :param game: the recorded game.
+    :param board_engine: the board engine to replay on, one of the keys in
+    BOARD_ENGINES.
+    :return: the result, one of the results of game_records.
+    :raises ValueError: if a move is not valid or is made after the end.
+    """
+    board = BOARD_ENGINES[board_engine](
+        size=game.column_count, win_length=game.win_length, row_count=game.row_count
+    )
+    player = game.first_player
+    for cell_number in game.moves:
+        if board.there_is_winning_combo or board.there_is_stalemate:
+            raise ValueError("The game goes on after it is finished.")
+        if not board.first_cell_id <= cell_number <= board.last_cell_id:
+            raise ValueError(f"There is no cell {cell_number}.")
+        board.write_mark_on_cell_if_empty(cell_number, MARKS_BY_PLAYER[player])
+        player = 3 - player
+
+    if board.there_is_winning_combo:
+        return PLAYERS_BY_MARK[board.get_winning_mark()]
+    if board.there_is_stalemate:
+        return DRAW
+    return UNFINISHED
+
+
+def replay_games(
+    games: Iterable[GameRecord], board_engine: str = "bitboard"
+) -> Iterator[Tuple[GameRecord, Optional[int]]]:
+    """
+    Replay every game of a stream.
+    :param games: the recorded games.
+    :param board_engine: the board engine to replay on.
+    :return: an iterator over each game and its replayed result, None if the
+    game can't be replayed.
+    """
+    for game in games:
+        try:
+            yield game, replay_game(game, board_engine)
+        except ValueError:
+            yield game, None
+
+
+class GameStatistics:
+    """
+    Counters of outcomes and lengths, grouped by board shape, by the player
+    who moved first and by opening move.
+    """
+
+    def __init__(self):
+        """
+        Start with no games counted.
+        """
+        self.games_counted = 0
+        self.invalid_games = 0
+        self.mismatched_results = 0
+        self.outcomes_by_shape: Dict[str, Counter] = {}
+        self.outcomes_by_first_player: Dict[int, Counter] = {}
+        self.outcomes_by_opening: Dict[Tuple[str, int], Counter] = {}
+        self.lengths_by_shape: Dict[str, Counter] = {}
+
+    def add(self, game: GameRecord, result: Optional[int]) -> None:
+        """
+        Count a game.
+        :param game: the recorded game.
+        :param result: its result, as found by replaying it, or None if it
+        couldn't be replayed, in which case it is only counted as invalid.
+        :return: None
+        """
+        if result is None:
+            self.invalid_games += 1
+            return
+
+        self.games_counted += 1
+        if result != game.result:
+            self.mismatched_results += 1
+
+        shape = f"{game.column_count}x{game.row_count} k={game.win_length}"
+        outcome = _outcome_for_first_player(game.first_player, result)
+        self.outcomes_by_shape.setdefault(shape, Counter())[outcome] += 1
+        self.outcomes_by_first_player.setdefault(game.first_player, Counter())[
+            outcome
+        ] += 1
+        if game.moves:
+            opening = (shape, game.moves[0])
+            self.outcomes_by_opening.setdefault(opening, Counter())[outcome] += 1
+        self.lengths_by_shape.setdefault(shape, Counter())[len(game.moves)] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the statistics in a plain dict, with the rate of each
+        outcome for every group.
+        :return: the statistics.
+        """
+        return {
+            "games_counted": self.games_counted,
+            "invalid_games": self.invalid_games,
+            "mismatched_results": self.mismatched_results,
+            "by_shape": {
+                shape: _rates(outcomes)
+                for shape, outcomes in sorted(self.outcomes_by_shape.items())
+            },
+            "by_first_player": {
+                first_player: _rates(outcomes)
+                for first_player, outcomes in sorted(
+                    self.outcomes_by_first_player.items()
+                )
+            },
+            "by_opening": {
+                f"{shape} cell {cell_number}": _rates(outcomes)
+                for (shape, cell_number), outcomes in sorted(
+                    self.outcomes_by_opening.items()
+                )
+            },
+            "lengths_by_shape": {
+                shape: dict(sorted(lengths.items()))
+                for shape, lengths in sorted(self.lengths_by_shape.items())
+            },
+        }
+
+
+def compute_statistics(
+    games: Iterable[GameRecord], board_engine: str = "bitboard"
+) -> GameStatistics:
+    """
+    Replay and count every game of a stream.
+    :param games: the recorded games.
+    :param board_engine: the board engine to replay on.
+    :return: the statistics of all the games.
+    """
+    statistics = GameStatistics()
+    for game, result in replay_games(games, board_engine):
+        statistics.add(game, result)
+    return statistics
+
+
+def _outcome_for_first_player(first_player: int, result: int) -> str:
+    """
+    Express a result from the point of view of the player who moved first.
+    :param first_player: the number of the player who moved first.
+    :param result: the result of the game.
+    :return: the outcome.
+    """
+    if result == DRAW:
+        return DRAWN
+    if result == UNFINISHED:
+        return NOT_FINISHED
+    if result == first_player:
+        return FIRST_PLAYER_WON
+    return SECOND_PLAYER_WON
+
+
+def _rates(outcomes: Counter) -> Dict[str, Any]:
+    """
+    Turn counts of outcomes into rates.
+    :param outcomes: how many games ended with each outcome.
+    :return: the number of games and the rate of each outcome.
+    """
+    games = sum(outcomes.values())
+    rates: Dict[str, Any] = {"games": games}
+    for outcome in (FIRST_PLAYER_WON, SECOND_PLAYER_WON, DRAWN, NOT_FINISHED):
+        rates[outcome] = outcomes[outcome] / games
+    return rates
+
+
+def run_from_cli() -> None:
+    """
+    Compute the statistics of the record files given on the command line and
+    print them as JSON.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Analyze game record files.")
+    parser.add_argument("paths", nargs="+", help="Game record files.")
+    parser.add_argument("--engine", choices=sorted(BOARD_ENGINES), default="bitboard")
+    arguments = parser.parse_args()
+
+    statistics = compute_statistics(
+        read_all_game_records(arguments.paths), board_engine=arguments.engine
+    )
+    print(json.dumps(statistics.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    run_from_cli()
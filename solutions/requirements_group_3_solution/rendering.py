@@ -3,9 +3,9 @@ Functions for presenting the state of the game visually.
 """
 
 
-from typing import Any, List, Union
+from typing import Any, Iterable, List, Union
 
-from solutions.requirements_group_2_solution.board import Board, Cell, CellGroup
+from solutions.requirements_group_3_solution.board import Board, Cell, CellGroup
 
 NEW_LINE_IN_STRING = "\n"
 COLUMN_DIVIDER_STRING = "|"
@@ -15,6 +15,9 @@ ROW_DIVIDER_STRING = "-"
 class BaseCellFilter:
     """
     Cell filters are used to filter out cells depending on some condition.
+
+    Filters can be combined with &, | and ~ to keep the cells that pass both
+    filters, either filter, or that don't pass the filter.
     """
 
     def keep(self, cell: Cell) -> bool:
@@ -38,41 +41,158 @@ class BaseCellFilter:
             return cell
         return default_value
 
+    def __and__(self, other: "BaseCellFilter") -> "BaseCellFilter":
+        return AndCellFilter([self, other])
+
+    def __or__(self, other: "BaseCellFilter") -> "BaseCellFilter":
+        return OrCellFilter([self, other])
+
+    def __invert__(self) -> "BaseCellFilter":
+        return NotCellFilter(self)
 
-class SpecificCellsFilter(BaseCellFilter):
+
+class CellIdsFilter(BaseCellFilter):
+    """
+    Filters cells to only keep those whose number id is in a predefined set.
+    """
+
+    def __init__(self, cell_ids: Iterable[int]):
+        """
+        Receive the number ids of the cells to keep.
+        :param cell_ids: the number ids of the cells to keep.
+        """
+        self.cell_ids = frozenset(cell_ids)
+
+    def keep(self, cell: Cell) -> bool:
+        """
+        Check if the cell's number id is in the set and if so, keep it.
+        :param cell: the cell to assess.
+        :return: true if the cell is in the predefined set, false otherwise.
+        """
+        return cell.number_id in self.cell_ids
+
+
+class SpecificCellsFilter(CellIdsFilter):
     """
     Filters cells to only keep those that are in a predefined cell group.
     """
 
     def __init__(self, cells_to_keep: CellGroup):
         """
-        Receive the predefined cells.
+        Receive the predefined cells, and keep their number ids in a set so
+        checking a cell takes constant time.
         :param cells_to_keep: a cell group with the cells to keep.
         """
+        super().__init__(cell.number_id for cell in cells_to_keep)
         self.cells_to_keep = cells_to_keep
 
+
+class CellMaskFilter(BaseCellFilter):
+    """
+    Filters cells to only keep those whose bit is set in a mask, where cell
+    number n is bit n - 1, as in BitBoard.
+    """
+
+    def __init__(self, cell_mask: int):
+        """
+        Receive the mask of the cells to keep.
+        :param cell_mask: the mask of the cells to keep.
+        """
+        self.cell_mask = cell_mask
+
     def keep(self, cell: Cell) -> bool:
         """
-        Check if the cell is in the group and if so, keep it.
+        Check if the cell's bit is set and if so, keep it.
         :param cell: the cell to assess.
-        :return: true if the cell is in the predefined group, false otherwise.
+        :return: true if the cell's bit is set, false otherwise.
         """
-        if cell in self.cells_to_keep:
-            return True
-        return False
+        return bool(self.cell_mask >> (cell.number_id - 1) & 1)
+
+
+class AndCellFilter(BaseCellFilter):
+    """
+    Keeps the cells that every one of a list of filters keeps.
+    """
+
+    def __init__(self, filters: List[BaseCellFilter]):
+        """
+        Receive the filters to combine.
+        :param filters: the filters that must all keep a cell.
+        """
+        self.filters = filters
+
+    def keep(self, cell: Cell) -> bool:
+        """
+        Check the cell against every filter.
+        :param cell: the cell to assess.
+        :return: true if every filter keeps the cell, false otherwise.
+        """
+        return all(cell_filter.keep(cell) for cell_filter in self.filters)
+
+
+class OrCellFilter(BaseCellFilter):
+    """
+    Keeps the cells that at least one of a list of filters keeps.
+    """
+
+    def __init__(self, filters: List[BaseCellFilter]):
+        """
+        Receive the filters to combine.
+        :param filters: the filters of which one must keep a cell.
+        """
+        self.filters = filters
+
+    def keep(self, cell: Cell) -> bool:
+        """
+        Check the cell against the filters until one keeps it.
+        :param cell: the cell to assess.
+        :return: true if any filter keeps the cell, false otherwise.
+        """
+        return any(cell_filter.keep(cell) for cell_filter in self.filters)
+
+
+class NotCellFilter(BaseCellFilter):
+    """
+    Keeps the cells that another filter doesn't keep.
+    """
+
+    def __init__(self, negated_filter: BaseCellFilter):
+        """
+        Receive the filter to negate.
+        :param negated_filter: the filter to negate.
+        """
+        self.negated_filter = negated_filter
+
+    def keep(self, cell: Cell) -> bool:
+        """
+        Check the cell against the negated filter.
+        :param cell: the cell to assess.
+        :return: true if the negated filter doesn't keep the cell, false
+        otherwise.
+        """
+        return not self.negated_filter.keep(cell)
 
 
 class BoardRenderer:
     """
     Renders a board, with some flexibility on how to do so.
+
+    Unfiltered renders are cached row by row: after a move, only the rows
+    whose version on the board has changed are rendered again.
     """
 
     def __init__(self, board: Board):
         """
-        Receive the board to render.
+        Receive the board to render, and prepare the parts of the render that
+        only depend on the shape of the board.
         :param board: the board to render.
         """
         self._board = board
+        self._divider_row = self._render_divider_row()
+        cell_template = " {} " + COLUMN_DIVIDER_STRING
+        self._row_template = COLUMN_DIVIDER_STRING + cell_template * board.column_count
+        self._rendered_rows: List[str] = [""] * self._board.row_count
+        self._rendered_row_versions = [-1] * self._board.row_count
 
     def render(self, active_filter: Union[BaseCellFilter, None] = None) -> str:
         """
@@ -81,17 +201,39 @@ class BoardRenderer:
         certain cells.
         :return: a string visualizing the state of the board.
         """
-        cells_by_position = self._board.cells_by_position
+        if active_filter is None:
+            rendered_rows = self._render_cached_rows()
+        else:
+            rendered_rows = [
+                self._filter_and_render_cell_row(row, active_filter)
+                for row in self._board.cells_by_position
+            ]
 
-        rendered_board = self._render_divider_row()
+        parts = [self._divider_row]
+        for rendered_row in rendered_rows:
+            parts.append(rendered_row)
+            parts.append(self._divider_row)
 
-        for row in cells_by_position:
-            rendered_board += NEW_LINE_IN_STRING + (
-                self._filter_and_render_cell_row(row, active_filter)
-            )
-            rendered_board += NEW_LINE_IN_STRING + (self._render_divider_row())
+        return NEW_LINE_IN_STRING.join(parts)
+
+    def _render_cached_rows(self) -> List[str]:
+        """
+        Render the rows that have changed since they were last rendered, and
+        reuse the rest.
+        :return: the rendered rows, top to bottom.
+        """
+        row_versions = self._board.row_versions
+        for row_index, row_version in enumerate(row_versions):
+            if row_version != self._rendered_row_versions[row_index]:
+                self._rendered_rows[row_index] = self._row_template.format(
+                    *[
+                        self._render_cell(cell)
+                        for cell in self._board.get_row(row_index)
+                    ]
+                )
+                self._rendered_row_versions[row_index] = row_version
 
-        return rendered_board
+        return self._rendered_rows
 
     def _filter_and_render_cell_row(
         self, row: CellGroup, active_filter: BaseCellFilter
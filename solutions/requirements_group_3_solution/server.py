@@ -0,0 +1,507 @@
+"""
+A server that hosts many matches at once over TCP, on a single asyncio event
+loop, and a client to talk to it.
+
+The protocol is line oriented: each request is one line of space separated
+words, and each gets exactly one response line.
+- CREATE [size] [win_length]: host a new match and join it as player 1.
+  Responds "CREATED <match id> 1".
+- JOIN <match id>: join a match as player 2. Responds "JOINED <match id> 2".
+- MOVE <match id> <cell>: mark a cell, as the player of this connection.
+  Responds with the state of the match.
+- STATE <match id>: responds "STATE <match id> <status> <next player>
+  <columns>x<rows> <cells>", where status is one of waiting, playing, won-1,
+  won-2, draw, left-1 and left-2, and cells has one character per cell, "."
+  when empty.
+Errors are responded with "ERROR <message>". A line that is not UTF-8 text
+is an error like any other, but a line longer than the stream limit closes
+the connection after its error, since the rest of it can't be told apart
+from the next request. When a player joins or moves, the other player of the
+match is sent the new state as an unrequested line, starting with UPDATE
+instead of STATE.
+
+A match ends when either of its players disconnects. If it was still being
+played, the other player is sent its state one last time, with the status
+left-<player> naming who left. A client that doesn't read its updates and
+falls MAX_UPDATE_BACKLOG bytes behind is disconnected, so it can't make the
+server buffer without limit.
+"""
+
+import argparse
+import asyncio
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from solutions.requirements_group_3_solution.match import BOARD_ENGINES, Match
+from solutions.requirements_group_3_solution.symmetry import EMPTY_CELL, get_position
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BOARD_SIZE = 3
+MAX_BOARD_SIZE = 19
+EMPTY_CELL_CHARACTER = "."
+MAX_UPDATE_BACKLOG = 64 * 1024
+
+# Which matches a connection has joined, and as which player
+JoinedMatches = Dict[int, int]
+
+
+class ProtocolError(Exception):
+    """
+    Raised when a request can't be served. Its message is sent to the client.
+    """
+
+
+class HostedMatch:
+    """
+    A match on the server, along with the connections of its players.
+    """
+
+    __slots__ = ("match", "writers_by_player", "left_player")
+
+    def __init__(self, match: Match):
+        """
+        Receive the match, with no players connected yet.
+        :param match: the match to host.
+        """
+        self.match = match
+        self.writers_by_player: Dict[int, asyncio.StreamWriter] = {}
+        self.left_player: Optional[int] = None
+
+
+class MatchServer:
+    """
+    Hosts matches and serves the requests of every connection. Matches are
+    driven with Match.apply_move, so no request ever blocks the event loop,
+    and an idle match costs only its board and a few objects.
+    """
+
+    def __init__(self, board_engine: str = "bitboard"):
+        """
+        Start with no matches.
+        :param board_engine: the board engine of the hosted matches, one of
+        the keys in BOARD_ENGINES.
+        """
+        self._board_engine = board_engine
+        self._matches: Dict[int, HostedMatch] = {}
+        self._match_ids = itertools.count(1)
+
+    @property
+    def match_count(self) -> int:
+        """
+        How many matches are being hosted.
+        :return: the number of matches.
+        """
+        return len(self._matches)
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        """
+        Accept connections until cancelled.
+        :param host: the address to listen on.
+        :param port: the port to listen on.
+        :return: None
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Serve the requests of a connection until it is closed, then leave
+        every match it joined.
+        :param reader: the stream of requests.
+        :param writer: the stream of responses.
+        :return: None
+        """
+        joined_matches: JoinedMatches = {}
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Raised for lines over the limit of the stream
+                    writer.write(b"ERROR Request line too long.\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    response = self.handle_request(
+                        _split_request(line), joined_matches, writer
+                    )
+                except ProtocolError as error:
+                    response = f"ERROR {error}"
+                writer.write(f"{response}\n".encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._leave_matches(joined_matches)
+            writer.close()
+
+    def handle_request(
+        self,
+        words: List[str],
+        joined_matches: JoinedMatches,
+        writer: asyncio.StreamWriter,
+    ) -> str:
+        """
+        Serve one request.
+        :param words: the words of the request line.
+        :param joined_matches: the matches the connection has joined.
+        :param writer: the stream of responses of the connection.
+        :return: the response line.
+        :raises ProtocolError: if the request can't be served.
+        """
+        if not words:
+            raise ProtocolError("Empty request.")
+
+        command, arguments = words[0].upper(), words[1:]
+        if command == "CREATE":
+            return self._create(arguments, joined_matches, writer)
+        if command == "JOIN":
+            return self._join(arguments, joined_matches, writer)
+        if command == "MOVE":
+            return self._move(arguments, joined_matches)
+        if command == "STATE":
+            (match_id,) = _parse_integers(arguments, 1)
+            return self._describe(match_id)
+        raise ProtocolError(f"Unknown command {command}.")
+
+    def _create(
+        self,
+        arguments: List[str],
+        joined_matches: JoinedMatches,
+        writer: asyncio.StreamWriter,
+    ) -> str:
+        """
+        Host a new match, joined by the connection as player 1.
+        :param arguments: the optional board size and win length.
+        :param joined_matches: the matches the connection has joined.
+        :param writer: the stream of responses of the connection.
+        :return: the response line.
+        :raises ProtocolError: if the board options are not valid.
+        """
+        if len(arguments) > 2:
+            raise ProtocolError("Expected at most a size and a win length.")
+        options = _parse_integers(arguments, len(arguments))
+        board_size = options[0] if options else DEFAULT_BOARD_SIZE
+        win_length = options[1] if len(options) > 1 else None
+        if not 1 <= board_size <= MAX_BOARD_SIZE:
+            raise ProtocolError(f"The size must be between 1 and {MAX_BOARD_SIZE}.")
+
+        try:
+            match = Match(
+                first_player=1,
+                board_size=board_size,
+                board_engine=self._board_engine,
+                win_length=win_length,
+                verbose=False,
+            )
+        except ValueError as error:
+            raise ProtocolError(str(error)) from error
+
+        match_id = next(self._match_ids)
+        hosted_match = HostedMatch(match)
+        hosted_match.writers_by_player[1] = writer
+        self._matches[match_id] = hosted_match
+        joined_matches[match_id] = 1
+        return f"CREATED {match_id} 1"
+
+    def _join(
+        self,
+        arguments: List[str],
+        joined_matches: JoinedMatches,
+        writer: asyncio.StreamWriter,
+    ) -> str:
+        """
+        Join a match as player 2, and let player 1 know.
+        :param arguments: the id of the match.
+        :param joined_matches: the matches the connection has joined.
+        :param writer: the stream of responses of the connection.
+        :return: the response line.
+        :raises ProtocolError: if the match doesn't exist, is full or was
+        already joined by the connection.
+        """
+        (match_id,) = _parse_integers(arguments, 1)
+        hosted_match = self._get_hosted_match(match_id)
+        if match_id in joined_matches:
+            raise ProtocolError(f"You are already playing match {match_id}.")
+        if 2 in hosted_match.writers_by_player:
+            raise ProtocolError(f"Match {match_id} already has two players.")
+
+        hosted_match.writers_by_player[2] = writer
+        joined_matches[match_id] = 2
+        self._notify(hosted_match, 1, self._describe(match_id))
+        return f"JOINED {match_id} 2"
+
+    def _move(self, arguments: List[str], joined_matches: JoinedMatches) -> str:
+        """
+        Mark a cell for the player of the connection, and let the other
+        player know.
+        :param arguments: the id of the match and the number id of the cell.
+        :param joined_matches: the matches the connection has joined.
+        :return: the response line, with the new state of the match.
+        :raises ProtocolError: if the move is not allowed.
+        """
+        match_id, cell_number = _parse_integers(arguments, 2)
+        hosted_match = self._get_hosted_match(match_id)
+        player_number = joined_matches.get(match_id)
+        if player_number is None:
+            raise ProtocolError(f"You are not playing match {match_id}.")
+        if len(hosted_match.writers_by_player) < 2:
+            raise ProtocolError("Waiting for the other player to join.")
+
+        match = hosted_match.match
+        if match.current_player.number_id != player_number:
+            raise ProtocolError("It's not your turn.")
+        if not match.board.first_cell_id <= cell_number <= match.board.last_cell_id:
+            raise ProtocolError(f"There is no cell {cell_number}.")
+        try:
+            match.apply_move(cell_number)
+        except ValueError as error:
+            raise ProtocolError(str(error)) from error
+
+        state = self._describe(match_id)
+        self._notify(hosted_match, 3 - player_number, state)
+        return state
+
+    def _describe(self, match_id: int) -> str:
+        """
+        Describe the state of a match in one line.
+        :param match_id: the id of the match.
+        :return: the STATE line.
+        :raises ProtocolError: if the match doesn't exist.
+        """
+        hosted_match = self._get_hosted_match(match_id)
+        match = hosted_match.match
+        board = match.board
+
+        if match.winning_player is not None:
+            status = f"won-{match.winning_player.number_id}"
+        elif match.is_finished:
+            status = "draw"
+        elif hosted_match.left_player is not None:
+            status = f"left-{hosted_match.left_player}"
+        elif len(hosted_match.writers_by_player) < 2:
+            status = "waiting"
+        else:
+            status = "playing"
+        cells = "".join(
+            EMPTY_CELL_CHARACTER if content == EMPTY_CELL else content
+            for content in get_position(board)
+        )
+
+        return (
+            f"STATE {match_id} {status} {match.current_player.number_id} "
+            f"{board.column_count}x{board.row_count} {cells}"
+        )
+
+    def _get_hosted_match(self, match_id: int) -> HostedMatch:
+        """
+        Find a hosted match.
+        :param match_id: the id of the match.
+        :return: the hosted match.
+        :raises ProtocolError: if the match doesn't exist.
+        """
+        hosted_match = self._matches.get(match_id)
+        if hosted_match is None:
+            raise ProtocolError(f"There is no match {match_id}.")
+        return hosted_match
+
+    @staticmethod
+    def _notify(hosted_match: HostedMatch, player_number: int, state: str) -> None:
+        """
+        Send the state of a match to one of its players, if connected. A
+        player whose unsent updates go past MAX_UPDATE_BACKLOG is disconnected
+        instead of waited for, which ends its matches.
+        :param hosted_match: the match.
+        :param player_number: the player to send the state to.
+        :param state: the STATE line of the match.
+        :return: None
+        """
+        writer = hosted_match.writers_by_player.get(player_number)
+        if writer is None or writer.is_closing():
+            return
+        writer.write(f"UPDATE{state[len('STATE'):]}\n".encode())
+        if writer.transport.get_write_buffer_size() > MAX_UPDATE_BACKLOG:
+            writer.transport.abort()
+
+    def _leave_matches(self, joined_matches: JoinedMatches) -> None:
+        """
+        End the matches a connection joined, letting the other player of a
+        match that was still being played know who left.
+        :param joined_matches: the matches the connection has joined.
+        :return: None
+        """
+        for match_id, player_number in joined_matches.items():
+            hosted_match = self._matches.get(match_id)
+            if hosted_match is None:
+                continue  # Already ended by the other player
+            if not hosted_match.match.is_finished:
+                hosted_match.left_player = player_number
+                self._notify(hosted_match, 3 - player_number, self._describe(match_id))
+            del self._matches[match_id]
+        joined_matches.clear()
+
+
+class MatchClient:
+    """
+    A client of the match server, for testing and scripting. Responses are
+    matched to requests in order, and UPDATE lines are queued apart.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Receive the streams of an open connection. Use connect to open one.
+        :param reader: the stream of responses.
+        :param writer: the stream of requests.
+        """
+        self._reader = reader
+        self._writer = writer
+        self._responses: "asyncio.Queue[str]" = asyncio.Queue()
+        self.updates: "asyncio.Queue[str]" = asyncio.Queue()
+        self._reading_task = asyncio.ensure_future(self._read_lines())
+
+    @classmethod
+    async def connect(
+        cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT
+    ) -> "MatchClient":
+        """
+        Open a connection to a server.
+        :param host: the address of the server.
+        :param port: the port of the server.
+        :return: the connected client.
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, line: str) -> str:
+        """
+        Send a request and wait for its response.
+        :param line: the request line, without the line break.
+        :return: the response line, without the line break.
+        """
+        self._writer.write(f"{line}\n".encode())
+        await self._writer.drain()
+        return await self._responses.get()
+
+    async def close(self) -> None:
+        """
+        Close the connection.
+        :return: None
+        """
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._reading_task.cancel()
+
+    async def _read_lines(self) -> None:
+        """
+        Read lines from the server until the connection is closed, routing
+        them to the responses or to the updates.
+        :return: None
+        """
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            text = line.decode().rstrip("\n")
+            if text.startswith("UPDATE"):
+                await self.updates.put(text)
+            else:
+                await self._responses.put(text)
+
+
+def _split_request(line: bytes) -> List[str]:
+    """
+    Decode a request line and split it in words.
+    :param line: the line, as received.
+    :return: the words of the line.
+    :raises ProtocolError: if the line is not UTF-8 text.
+    """
+    try:
+        return line.decode().split()
+    except UnicodeDecodeError:
+        raise ProtocolError("Requests must be UTF-8 text.") from None
+
+
+def _parse_integers(arguments: List[str], count: int) -> Tuple[int, ...]:
+    """
+    Parse the arguments of a request as integers.
+    :param arguments: the arguments.
+    :param count: how many arguments are expected.
+    :return: the parsed integers.
+    :raises ProtocolError: if there are not as many arguments as expected or
+    they are not integers.
+    """
+    if len(arguments) != count:
+        raise ProtocolError(f"Expected {count} arguments.")
+    try:
+        return tuple(int(argument) for argument in arguments)
+    except ValueError:
+        raise ProtocolError("Arguments must be integers.") from None
+
+
+async def _run_interactive_client(host: str, port: int) -> None:
+    """
+    Send the lines typed on the CLI to a server and print the responses and
+    updates.
+    :param host: the address of the server.
+    :param port: the port of the server.
+    :return: None
+    """
+    client = await MatchClient.connect(host, port)
+    loop = asyncio.get_running_loop()
+
+    async def print_updates() -> None:
+        while True:
+            print(await client.updates.get())
+
+    printing_task = asyncio.ensure_future(print_updates())
+    try:
+        while True:
+            line: Optional[str] = await loop.run_in_executor(None, _read_input_line)
+            if line is None:
+                break
+            if line.strip():
+                print(await client.request(line.strip()))
+    finally:
+        printing_task.cancel()
+        await client.close()
+
+
+def _read_input_line() -> Optional[str]:
+    """
+    Read a line from the CLI.
+    :return: the line, or None at the end of the input.
+    """
+    try:
+        return input()
+    except EOFError:
+        return None
+
+
+def run_from_cli() -> None:
+    """
+    Run the server, or an interactive client, with the options given on the
+    command line.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Host matches over TCP.")
+    parser.add_argument("mode", choices=["serve", "client"])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--engine", choices=sorted(BOARD_ENGINES), default="bitboard")
+    arguments = parser.parse_args()
+
+    if arguments.mode == "serve":
+        server = MatchServer(board_engine=arguments.engine)
+        asyncio.run(server.serve(host=arguments.host, port=arguments.port))
+    else:
+        asyncio.run(_run_interactive_client(host=arguments.host, port=arguments.port))
+
+
+if __name__ == "__main__":
+    run_from_cli()
@@ -0,0 +1,317 @@
+"""
+Play whole matches without any human or output, and report how they went.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, List, Optional
+
+from solutions.requirements_group_3_solution.game_records import GameRecordWriter
+from solutions.requirements_group_3_solution.match import BOARD_ENGINES, Match
+from solutions.requirements_group_3_solution.move_sources import (
+    BaseMoveSource,
+    RandomMoveSource,
+)
+from solutions.requirements_group_3_solution.profiling import (
+    disable_profiling,
+    enable_profiling,
+    get_profiling_snapshot,
+)
+
+
+class SimulationReport:
+    """
+    Aggregated results of a batch of simulated matches.
+    """
+
+    def __init__(self):
+        """
+        Start with no matches recorded.
+        """
+        self.games_played = 0
+        self.wins_by_player = {1: 0, 2: 0}
+        self.stalemates = 0
+        self.moves_played = 0
+        self.match_lengths = Counter()
+        self.elapsed_seconds = 0.0
+
+    def record_match(self, match: Match) -> None:
+        """
+        Add the result of a finished match.
+        :param match: the finished match.
+        :return: None
+        """
+        self.games_played += 1
+        self.moves_played += match.move_count
+        self.match_lengths[match.move_count] += 1
+
+        winning_player = match.winning_player
+        if winning_player is None:
+            self.stalemates += 1
+        else:
+            self.wins_by_player[winning_player.number_id] += 1
+
+    def merge(self, other: "SimulationReport") -> None:
+        """
+        Add the results of another report to this one. Elapsed time is not
+        added, since reports merged from parallel batches overlap in time.
+        :param other: the report to merge in.
+        :return: None
+        """
+        self.games_played += other.games_played
+        for number_id, wins in other.wins_by_player.items():
+            self.wins_by_player[number_id] += wins
+        self.stalemates += other.stalemates
+        self.moves_played += other.moves_played
+        self.match_lengths.update(other.match_lengths)
+
+    @property
+    def games_per_second(self) -> float:
+        """
+        Throughput of the simulation.
+        :return: the number of games played per second.
+        """
+        if self.elapsed_seconds == 0:
+            return 0.0
+        return self.games_played / self.elapsed_seconds
+
+    @property
+    def average_match_length(self) -> float:
+        """
+        Average number of moves per match.
+        :return: the average number of moves.
+        """
+        if self.games_played == 0:
+            return 0.0
+        return self.moves_played / self.games_played
+
+    def as_dict(self) -> Dict:
+        """
+        Summarize the report in a plain dict.
+        :return: the figures of the report.
+        """
+        return {
+            "games_played": self.games_played,
+            "wins_by_player": dict(self.wins_by_player),
+            "stalemates": self.stalemates,
+            "moves_played": self.moves_played,
+            "average_match_length": self.average_match_length,
+            "match_lengths": dict(sorted(self.match_lengths.items())),
+            "elapsed_seconds": self.elapsed_seconds,
+            "games_per_second": self.games_per_second,
+        }
+
+
+# Everything past the number of games is an option with a default, passed by
+# keyword
+def simulate(  # pylint: disable=too-many-arguments
+    n_games: int,
+    board_size: int = 3,
+    board_engine: str = "bitboard",
+    win_length: Optional[int] = None,
+    board_row_count: Optional[int] = None,
+    first_player: int = 1,
+    move_sources: Optional[Dict[int, BaseMoveSource]] = None,
+    seed: Optional[int] = None,
+    game_recorder: Optional[GameRecordWriter] = None,
+) -> SimulationReport:
+    """
+    Play a number of matches from start to finish, with no input or output.
+    :param n_games: how many matches to play.
+    :param board_size: indicates the size of the board.
+    :param board_engine: the name of the engine that keeps the board state,
+    one of the keys in BOARD_ENGINES.
+    :param win_length: how many marks in a row are needed to win. Defaults to
+    the board size.
+    :param board_row_count: the number of rows, for non square boards. Defaults
+    to the board size.
+    :param first_player: the number of the player who moves first.
+    :param move_sources: where each player's moves come from, keyed by player
+    number. Defaults to random play for both players.
+    :param seed: a seed for the default random play, to make runs reproducible.
+    :param game_recorder: an optional writer to record every match to.
+    :return: the aggregated results of all the matches.
+    """
+    if move_sources is None:
+        rng = random.Random(seed)
+        move_sources = {1: RandomMoveSource(rng=rng), 2: RandomMoveSource(rng=rng)}
+
+    report = SimulationReport()
+    start_time = time.perf_counter()
+
+    for _ in range(0, n_games):
+        match = Match(
+            first_player=first_player,
+            board_size=board_size,
+            board_engine=board_engine,
+            win_length=win_length,
+            board_row_count=board_row_count,
+            move_sources=move_sources,
+            verbose=False,
+            game_recorder=game_recorder,
+        )
+        match.play()
+        report.record_match(match)
+
+    report.elapsed_seconds = time.perf_counter() - start_time
+
+    return report
+
+
+def simulate_in_parallel(
+    n_games: int,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    **simulation_options,
+) -> SimulationReport:
+    """
+    Spread the matches across a pool of processes, each playing its own batch
+    with its own seed, and merge the reports of every batch.
+    :param n_games: how many matches to play in total.
+    :param workers: how many processes to use. Defaults to the number of CPUs.
+    :param seed: the seed that all the batch seeds are derived from. The same
+    seed and number of workers always give the same results.
+    :param simulation_options: any other option accepted by simulate, except
+    move_sources and game_recorder, which can't be shared across processes.
+    :return: the merged results of all the matches.
+    :raises ValueError: if there are fewer than one worker.
+    """
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"At least one worker is needed, not {workers}.")
+    batch_sizes = _split_into_batches(n_games, workers)
+    seed_generator = random.Random(seed)
+    batch_arguments = [
+        (batch_size, seed_generator.getrandbits(64), simulation_options)
+        for batch_size in batch_sizes
+    ]
+
+    start_time = time.perf_counter()
+
+    if workers == 1:
+        batch_reports = [_simulate_batch(arguments) for arguments in batch_arguments]
+    else:
+        with Pool(processes=workers) as pool:
+            batch_reports = pool.map(_simulate_batch, batch_arguments)
+
+    report = SimulationReport()
+    for batch_report in batch_reports:
+        report.merge(batch_report)
+    report.elapsed_seconds = time.perf_counter() - start_time
+
+    return report
+
+
+def _simulate_batch(arguments: tuple) -> SimulationReport:
+    """
+    Play one batch of matches. Takes a single tuple so it can be mapped over
+    a process pool.
+    :param arguments: the number of matches, the seed and the options to pass
+    to simulate.
+    :return: the results of the batch.
+    """
+    n_games, seed, simulation_options = arguments
+    return simulate(n_games=n_games, seed=seed, **simulation_options)
+
+
+def _split_into_batches(n_games: int, batch_count: int) -> List[int]:
+    """
+    Split a number of matches into batches that differ in size by one at most.
+    :param n_games: how many matches to play in total.
+    :param batch_count: how many batches to make.
+    :return: the size of each batch.
+    """
+    batch_size, remainder = divmod(n_games, batch_count)
+    return [
+        batch_size + 1 if batch_index < remainder else batch_size
+        for batch_index in range(0, batch_count)
+    ]
+
+
+def _positive_int(text: str) -> int:
+    """
+    Parse a command line value that must be a whole number of at least one.
+    :param text: the value as given.
+    :return: the number.
+    :raises argparse.ArgumentTypeError: if the value is not valid.
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text} is not a whole number.") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{text} is not at least 1.")
+    return value
+
+
+def run_from_cli() -> None:
+    """
+    Run a simulation with the options given on the command line and print the
+    report.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Simulate random matches.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--win-length", type=int, default=None)
+    parser.add_argument("--engine", choices=sorted(BOARD_ENGINES), default="bitboard")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workers",
+        type=_positive_int,
+        default=1,
+        help="Number of processes to spread the matches across.",
+    )
+    parser.add_argument(
+        "--record",
+        help="Append every match to this game record file. Needs a single worker.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Count and time the hot operations and print the snapshot as "
+        "JSON. Needs a single worker.",
+    )
+    arguments = parser.parse_args()
+    if arguments.profile:
+        if arguments.workers != 1:
+            parser.error("--profile needs a single worker.")
+        enable_profiling()
+
+    simulation_options = {
+        "board_size": arguments.size,
+        "board_engine": arguments.engine,
+        "win_length": arguments.win_length,
+    }
+    if arguments.record:
+        if arguments.workers != 1:
+            parser.error("--record needs a single worker.")
+        with GameRecordWriter(arguments.record) as game_recorder:
+            report = simulate(
+                n_games=arguments.games,
+                seed=arguments.seed,
+                game_recorder=game_recorder,
+                **simulation_options,
+            )
+    else:
+        report = simulate_in_parallel(
+            n_games=arguments.games,
+            workers=arguments.workers,
+            seed=arguments.seed,
+            **simulation_options,
+        )
+
+    for name, value in report.as_dict().items():
+        print(f"{name}: {value}")
+    if arguments.profile:
+        disable_profiling()
+        print(json.dumps(get_profiling_snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    run_from_cli()
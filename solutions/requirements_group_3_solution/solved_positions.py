@@ -0,0 +1,394 @@
+"""
+A database of solved positions: the game value and best move of every
+position of a board shape, worked out ahead of time and stored in a binary
+file that is memory-mapped for lookups.
+
+File layout, all integers little-endian:
+- A 16 byte header: the magic bytes, the format version, the column count,
+  the row count, the win length and padding.
+- One byte per position, at the position's index. The index reads the board
+  as a base 3 number, one digit per cell: 0 for empty, 1 for X, 2 for O, cell
+  1 being the least significant digit.
+
+Each entry byte holds the game value for the player that moves in its two
+lowest bits and the number id of the best cell in the rest, 0 when there is
+none. Positions are stored as if X had moved first: a position where O moved
+first is looked up with the marks swapped.
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+import time
+from itertools import combinations
+from typing import Dict, List, Sequence, Tuple
+
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.lines import LineLayout, get_line_layout
+from solutions.requirements_group_3_solution.move_sources import BaseMoveSource
+from solutions.requirements_group_3_solution.symmetry import (
+    CELL_CODES,
+    EMPTY_CELL,
+    get_position,
+)
+
+FILE_MAGIC = b"TTSP"
+FILE_VERSION = 1
+HEADER_FORMAT = "<4sBBBB8x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Game values, from the point of view of the player that moves
+UNKNOWN = 0
+WIN = 1
+LOSS = 2
+DRAW = 3
+
+VALUE_BITS = 2
+VALUE_MASK = (1 << VALUE_BITS) - 1
+MAX_CELL_COUNT = (1 << (8 - VALUE_BITS)) - 1
+
+SWAPPED_CELL_CODES = {EMPTY_CELL: 0, "X": 2, "O": 1}
+OPPOSITE_VALUES = {WIN: LOSS, LOSS: WIN, DRAW: DRAW}
+VALUE_PREFERENCE = {LOSS: 0, DRAW: 1, WIN: 2}
+
+
+class SolvedPositions:
+    """
+    Read-only access to a solved positions file. The file is memory-mapped,
+    so opening it costs nothing and each lookup reads a single byte.
+    """
+
+    def __init__(self, path: str):
+        """
+        Map the file and check its header.
+        :param path: the path of the solved positions file.
+        :raises ValueError: if the file is not a solved positions file, or
+        doesn't have one entry per position of its board shape.
+        """
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._data) < HEADER_SIZE:
+            self._data.close()
+            raise ValueError(f"{path} is not a solved positions file.")
+        magic, version, column_count, row_count, win_length = struct.unpack_from(
+            HEADER_FORMAT, self._data
+        )
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            self._data.close()
+            raise ValueError(f"{path} is not a solved positions file.")
+        if len(self._data) != HEADER_SIZE + 3 ** (column_count * row_count):
+            self._data.close()
+            raise ValueError(
+                f"{path} doesn't have one entry per position of a "
+                f"{column_count}x{row_count} board."
+            )
+
+        self.column_count = column_count
+        self.row_count = row_count
+        self.win_length = win_length
+        self.cell_count = column_count * row_count
+        # What each content of each cell adds to the index, so a lookup sums
+        # them in a single map instead of multiplying codes by powers of 3
+        self._weights_by_cell = _weights_by_cell(self.cell_count, CELL_CODES)
+        self._swapped_weights_by_cell = _weights_by_cell(
+            self.cell_count, SWAPPED_CELL_CODES
+        )
+
+    def covers(self, board: Board) -> bool:
+        """
+        Check if the file solves the positions of a board.
+        :param board: the board.
+        :return: True if the board has the shape and win length of the file,
+        False otherwise.
+        """
+        return (board.column_count, board.row_count, board.win_length) == (
+            self.column_count,
+            self.row_count,
+            self.win_length,
+        )
+
+    def lookup(self, board: Board, mark: str) -> Tuple[int, int]:
+        """
+        Find the game value and best move of the position on a board.
+        :param board: the board to look up. It must have the shape of the file.
+        :param mark: the mark of the player that moves.
+        :return: the game value for that player and the number id of the best
+        cell, 0 if there is none.
+        :raises ValueError: if the board doesn't have the shape and win length
+        of the file.
+        """
+        if not self.covers(board):
+            raise ValueError(
+                f"The file solves {self.column_count}x{self.row_count} boards "
+                f"with a win length of {self.win_length}."
+            )
+        return self.lookup_position(get_position(board), mark)
+
+    def lookup_position(self, position: Sequence[str], mark: str) -> Tuple[int, int]:
+        """
+        Find the game value and best move of a position.
+        :param position: the contents of every cell, in cell number order.
+        :param mark: the mark of the player that moves.
+        :return: the game value for that player and the number id of the best
+        cell, 0 if there is none.
+        :raises ValueError: if the position doesn't have one cell per cell of
+        the board shape of the file.
+        """
+        if len(position) != self.cell_count:
+            raise ValueError(
+                f"The file solves positions of {self.cell_count} cells, "
+                f"not {len(position)}."
+            )
+        # Positions are stored with X to move when the mark counts are equal
+        x_count = position.count("X")
+        o_count = position.count("O")
+        x_moved_first = x_count > o_count or (x_count == o_count and mark == "X")
+        weights_by_cell = (
+            self._weights_by_cell if x_moved_first else self._swapped_weights_by_cell
+        )
+
+        index = sum(map(dict.__getitem__, weights_by_cell, position))
+        entry = self._data[HEADER_SIZE + index]
+
+        return entry & VALUE_MASK, entry >> VALUE_BITS
+
+    def close(self) -> None:
+        """
+        Unmap the file.
+        :return: None
+        """
+        self._data.close()
+
+
+class SolvedPositionsMoveSource(BaseMoveSource):
+    """
+    Plays the best move stored in a solved positions file, and asks another
+    move source for positions the file doesn't cover.
+    """
+
+    def __init__(self, solved_positions: SolvedPositions, fallback: BaseMoveSource):
+        """
+        Receive the solved positions and the fallback.
+        :param solved_positions: the solved positions to look moves up in.
+        :param fallback: the move source for positions that are not solved.
+        """
+        self._solved_positions = solved_positions
+        self._fallback = fallback
+
+    def choose_cell(self, board: Board, mark: str) -> int:
+        """
+        Look the position up and play its best move.
+        :param board: the board the match is played on.
+        :param mark: the mark of the player that moves.
+        :return: the number id of the chosen cell.
+        """
+        if not self._solved_positions.covers(board):
+            return self._fallback.choose_cell(board, mark)
+        value, best_cell = self._solved_positions.lookup(board, mark)
+        if value == UNKNOWN or best_cell == 0:
+            return self._fallback.choose_cell(board, mark)
+        return best_cell
+
+
+class PositionSolver:
+    """
+    Solves positions by exhaustive search, using the table of entries that
+    will be written to the file as the memory of already solved positions.
+    """
+
+    def __init__(self, column_count: int, row_count: int, win_length: int):
+        """
+        Set up an empty table for the board shape.
+        :param column_count: the number of cells in each row of the board.
+        :param row_count: the number of rows of the board.
+        :param win_length: how many marks in a row are needed to win.
+        :raises ValueError: if the board has too many cells for the format.
+        """
+        self.cell_count = column_count * row_count
+        if self.cell_count > MAX_CELL_COUNT:
+            raise ValueError(f"Boards over {MAX_CELL_COUNT} cells can't be stored.")
+
+        self._layout: LineLayout = get_line_layout(
+            column_count=column_count, row_count=row_count, win_length=win_length
+        )
+        self._powers = [3 ** index for index in range(0, self.cell_count)]
+        self.header = struct.pack(
+            HEADER_FORMAT, FILE_MAGIC, FILE_VERSION, column_count, row_count, win_length
+        )
+        self.entries = bytearray(3 ** self.cell_count)
+
+    def solve_all(self, min_marks: int = 0) -> None:
+        """
+        Solve every legal position with at least a number of marks, along with
+        every position reachable from them.
+        :param min_marks: the number of marks of the shallowest positions to
+        solve. 0 solves the whole game.
+        :return: None
+        """
+        x_count = (min_marks + 1) // 2
+        o_count = min_marks // 2
+        all_indices = range(0, self.cell_count)
+
+        for x_indices in combinations(all_indices, x_count):
+            free_indices = [index for index in all_indices if index not in x_indices]
+            for o_indices in combinations(free_indices, o_count):
+                cells = [EMPTY_CELL] * self.cell_count
+                for index in x_indices:
+                    cells[index] = "X"
+                for index in o_indices:
+                    cells[index] = "O"
+                if self._has_winning_line(cells):
+                    continue  # Play would have stopped before this position
+                self.solve(cells)
+
+    def solve(self, cells: List[str]) -> int:
+        """
+        Solve a position that has no winning line yet.
+        :param cells: the contents of every cell, by cell index, with X having
+        moved first. It is modified during the search and restored before
+        returning.
+        :return: the game value for the player that moves.
+        """
+        index = sum(
+            CELL_CODES[content] * power for content, power in zip(cells, self._powers)
+        )
+        mark = "X" if cells.count("X") == cells.count("O") else "O"
+        return self._solve(cells, index, mark)
+
+    def write(self, path: str) -> None:
+        """
+        Write the header and all the entries to a file.
+        :param path: the path of the file to write.
+        :return: None
+        """
+        with open(path, "wb") as file:
+            file.write(self.header)
+            file.write(self.entries)
+
+    def _solve(self, cells: List[str], index: int, mark: str) -> int:
+        """
+        Solve a position and store its entry, along with the entries of every
+        position reachable from it. Every move is searched, even after a
+        winning one is found, so that every reachable position gets an entry.
+        :param cells: the contents of every cell, by cell index.
+        :param index: the index of the position.
+        :param mark: the mark of the player that moves.
+        :return: the game value for the player that moves.
+        """
+        known_entry = self.entries[index]
+        if known_entry:
+            return known_entry & VALUE_MASK
+
+        opponent_mark = "O" if mark == "X" else "X"
+        mark_code = CELL_CODES[mark]
+        best_value = DRAW  # Kept if the board is full
+        best_preference = -1
+        best_cell_id = 0
+
+        for cell_index, content in enumerate(cells):
+            if content != EMPTY_CELL:
+                continue
+
+            cells[cell_index] = mark
+            child_index = index + mark_code * self._powers[cell_index]
+            if self._is_winning_move(cells, cell_index, mark):
+                self.entries[child_index] = LOSS
+                value = WIN
+            else:
+                value = OPPOSITE_VALUES[self._solve(cells, child_index, opponent_mark)]
+            cells[cell_index] = EMPTY_CELL
+
+            if VALUE_PREFERENCE[value] > best_preference:
+                best_value = value
+                best_preference = VALUE_PREFERENCE[value]
+                best_cell_id = cell_index + 1
+
+        self.entries[index] = best_cell_id << VALUE_BITS | best_value
+        return best_value
+
+    def _is_winning_move(self, cells: List[str], cell_index: int, mark: str) -> bool:
+        """
+        Check if the mark just written in a cell completes a line.
+        :param cells: the contents of every cell, by cell index.
+        :param cell_index: the index of the cell just written.
+        :param mark: the mark just written.
+        :return: True if so, False otherwise.
+        """
+        lines = self._layout.lines
+        for line_index in self._layout.lines_by_cell.get(cell_index + 1, ()):
+            if all(cells[cell_id - 1] == mark for cell_id in lines[line_index]):
+                return True
+        return False
+
+    def _has_winning_line(self, cells: List[str]) -> bool:
+        """
+        Check if any line of the position is complete.
+        :param cells: the contents of every cell, by cell index.
+        :return: True if so, False otherwise.
+        """
+        for line in self._layout.lines:
+            first_content = cells[line[0] - 1]
+            if first_content != EMPTY_CELL and all(
+                cells[cell_id - 1] == first_content for cell_id in line
+            ):
+                return True
+        return False
+
+
+def _weights_by_cell(
+    cell_count: int, cell_codes: Dict[str, int]
+) -> List[Dict[str, int]]:
+    """
+    Work out what each content of each cell adds to the index of a position.
+    :param cell_count: the number of cells of the board shape.
+    :param cell_codes: the base 3 digit of each content.
+    :return: the amount each content adds, for every cell in cell number
+    order.
+    """
+    return [
+        {content: code * 3 ** cell_index for content, code in cell_codes.items()}
+        for cell_index in range(0, cell_count)
+    ]
+
+
+def build_from_cli() -> None:
+    """
+    Solve a board shape with the options given on the command line and write
+    the solved positions file.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Build a solved positions file.")
+    parser.add_argument("output", help="Path of the file to write.")
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--win-length", type=int, default=None)
+    parser.add_argument(
+        "--min-marks",
+        type=int,
+        default=0,
+        help="Only solve positions with at least this many marks. 0 solves "
+        "the whole game; larger values make bigger boards feasible.",
+    )
+    arguments = parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), arguments.size ** 2 + 100))
+    solver = PositionSolver(
+        column_count=arguments.size,
+        row_count=arguments.size,
+        win_length=arguments.win_length or arguments.size,
+    )
+
+    start_time = time.perf_counter()
+    solver.solve_all(min_marks=arguments.min_marks)
+    solved_count = sum(1 for entry in solver.entries if entry)
+    solver.write(arguments.output)
+
+    print(
+        f"Solved {solved_count} positions in "
+        f"{time.perf_counter() - start_time:.1f}s, written to {arguments.output}"
+    )
+
+
+if __name__ == "__main__":
+    build_from_cli()
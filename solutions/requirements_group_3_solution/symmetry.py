@@ -0,0 +1,135 @@
+"""
+Symmetries of the board, used to treat positions that are rotations or
+reflections of each other as the same position.
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Sequence, Tuple
+
+if TYPE_CHECKING:
+    # Only for annotations: boards use this module to hash symmetric positions
+    from solutions.requirements_group_3_solution.board import Board
+
+EMPTY_CELL = ""
+# How positions are encoded as integers, one per cell
+CELL_CODES = {EMPTY_CELL: 0, "X": 1, "O": 2}
+
+Position = Tuple[str, ...]
+
+
+def get_position(board: "Board") -> Position:
+    """
+    Read the contents of every cell of a board, in cell number order.
+    :param board: the board to read.
+    :return: the mark in each cell, or EMPTY_CELL if it has none.
+    """
+    return tuple(
+        EMPTY_CELL if cell.is_empty else cell.contents
+        for row in board.cells_by_position
+        for cell in row
+    )
+
+
+class BoardSymmetries:
+    """
+    The rotations and reflections that map a board shape onto itself. Square
+    boards have 8 of them, other rectangles have 4.
+
+    Each transform is a tuple of cell indices: the transformed position takes,
+    in its cell i, the contents of cell transform[i] of the original position.
+    The identity is always the first transform.
+    """
+
+    def __init__(self, column_count: int, row_count: int):
+        """
+        Compute every transform of the board shape.
+        :param column_count: the number of cells in each row of the board.
+        :param row_count: the number of rows of the board.
+        """
+        self.column_count = column_count
+        self.row_count = row_count
+        self.transforms = self._generate_transforms()
+        self.inverse_transforms = tuple(
+            tuple(transform.index(index) for index in range(0, len(transform)))
+            for transform in self.transforms
+        )
+
+    def canonicalize(self, position: Sequence[str]) -> Tuple[Position, int]:
+        """
+        Find the canonical form of a position: the smallest of all its
+        symmetric variants. All symmetric positions share the same canonical
+        form.
+        :param position: the contents of every cell, in cell number order.
+        :return: the canonical position and the index of the transform that
+        turns the position into it.
+        """
+        variants = [
+            tuple(map(position.__getitem__, transform)) for transform in self.transforms
+        ]
+        canonical_position = min(variants)
+
+        return canonical_position, variants.index(canonical_position)
+
+    def to_canonical_cell(self, cell_id: int, transform_index: int) -> int:
+        """
+        Find where a cell of the original position ends up in the canonical
+        one.
+        :param cell_id: the number id of the cell in the original position.
+        :param transform_index: the transform returned by canonicalize.
+        :return: the number id of the cell in the canonical position.
+        """
+        return self.inverse_transforms[transform_index][cell_id - 1] + 1
+
+    def to_original_cell(self, cell_id: int, transform_index: int) -> int:
+        """
+        Find where a cell of the canonical position comes from in the original
+        one, for instance to play a move found on the canonical position.
+        :param cell_id: the number id of the cell in the canonical position.
+        :param transform_index: the transform returned by canonicalize.
+        :return: the number id of the cell in the original position.
+        """
+        return self.transforms[transform_index][cell_id - 1] + 1
+
+    def _generate_transforms(self) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Build the transforms by mapping every cell through each rotation and
+        reflection that keeps the shape of the board.
+        :return: the transforms, without duplicates, identity first.
+        """
+        last_row, last_cell = self.row_count - 1, self.column_count - 1
+        coordinate_mappings = [
+            lambda row, cell: (row, cell),
+            lambda row, cell: (row, last_cell - cell),  # Mirror left-right
+            lambda row, cell: (last_row - row, cell),  # Mirror top-bottom
+            lambda row, cell: (last_row - row, last_cell - cell),  # Half turn
+        ]
+        if self.column_count == self.row_count:
+            coordinate_mappings += [
+                lambda row, cell: (cell, row),  # Mirror along main diagonal
+                lambda row, cell: (cell, last_row - row),  # Quarter turn
+                lambda row, cell: (last_cell - cell, row),  # Three quarter turn
+                lambda row, cell: (last_cell - cell, last_row - row),  # Anti diagonal
+            ]
+
+        transforms = []
+        for mapping in coordinate_mappings:
+            transform = []
+            for index in range(0, self.column_count * self.row_count):
+                source_row, source_cell = mapping(*divmod(index, self.column_count))
+                transform.append(source_row * self.column_count + source_cell)
+            if tuple(transform) not in transforms:
+                transforms.append(tuple(transform))
+
+        return tuple(transforms)
+
+
+@lru_cache(maxsize=None)
+def get_board_symmetries(column_count: int, row_count: int) -> BoardSymmetries:
+    """
+    Get the symmetries of a board shape, computing them only the first time
+    that shape is requested.
+    :param column_count: the number of cells in each row of the board.
+    :param row_count: the number of rows of the board.
+    :return: the shared symmetries.
+    """
+    return BoardSymmetries(column_count=column_count, row_count=row_count)
@@ -0,0 +1,175 @@
+"""
+Ways of showing the match on a terminal: plain text, or an ANSI mode that
+draws the board once and then repaints only what changes.
+"""
+
+import sys
+from typing import List, Optional, TextIO
+
+from solutions.requirements_group_3_solution.rendering import (
+    NEW_LINE_IN_STRING,
+    BaseCellFilter,
+    BoardRenderer,
+)
+
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+CLEAR_TO_END_OF_LINE = "\x1b[K"
+CLEAR_TO_END_OF_SCREEN = "\x1b[J"
+SEPARATOR_LINE = "/////////////////////////////"
+
+
+def move_cursor(line: int, column: int) -> str:
+    """
+    Build the escape code that moves the cursor to a position of the screen.
+    :param line: the line, starting at 1.
+    :param column: the column, starting at 1.
+    :return: the escape code.
+    """
+    return f"\x1b[{line};{column}H"
+
+
+class PlainTextDisplay:
+    """
+    Prints the whole board every time, followed by any messages.
+    """
+
+    def __init__(self, board_renderer: BoardRenderer, stream: Optional[TextIO] = None):
+        """
+        Receive the renderer and where to write.
+        :param board_renderer: the renderer of the board to show.
+        :param stream: where to write the output. Defaults to whatever
+        sys.stdout is at the time of writing.
+        """
+        self._board_renderer = board_renderer
+        self._output_stream = stream
+
+    @property
+    def _stream(self) -> TextIO:
+        """
+        Where to write the output, looked up on every write so that redirecting
+        sys.stdout after building the display is honored.
+        :return: the stream.
+        """
+        return sys.stdout if self._output_stream is None else self._output_stream
+
+    def show_board(self, active_filter: Optional[BaseCellFilter] = None) -> None:
+        """
+        Print the board.
+        :param active_filter: an optional filter to only show the contents of
+        certain cells.
+        :return: None
+        """
+        print(self._board_renderer.render(active_filter), file=self._stream)
+
+    def show_message(self, text: str) -> None:
+        """
+        Print a message.
+        :param text: the message to print.
+        :return: None
+        """
+        print(text, file=self._stream)
+
+    def show_separator(self) -> None:
+        """
+        Print the line that separates turns.
+        :return: None
+        """
+        self.show_message(SEPARATOR_LINE)
+
+
+class AnsiDiffDisplay(PlainTextDisplay):
+    """
+    Draws the board at the top of a cleared screen the first time, and from
+    then on only repaints the parts of each line that changed, using cursor
+    positioning escape codes. Messages go below the board, in an area that is
+    cleared every time the board is shown, so the output doesn't scroll.
+    """
+
+    def __init__(self, board_renderer: BoardRenderer, stream: Optional[TextIO] = None):
+        """
+        Receive the renderer and where to write.
+        :param board_renderer: the renderer of the board to show.
+        :param stream: where to write the output. It must be a terminal.
+        Defaults to whatever sys.stdout is at the time of writing.
+        """
+        super().__init__(board_renderer, stream)
+        self._drawn_lines: Optional[List[str]] = None
+
+    def show_board(self, active_filter: Optional[BaseCellFilter] = None) -> None:
+        """
+        Draw or repaint the board, and clear the message area below it.
+        :param active_filter: an optional filter to only show the contents of
+        certain cells.
+        :return: None
+        """
+        lines = self._board_renderer.render(active_filter).split(NEW_LINE_IN_STRING)
+
+        if self._drawn_lines is None or len(lines) != len(self._drawn_lines):
+            output = [CLEAR_SCREEN, NEW_LINE_IN_STRING.join(lines)]
+        else:
+            output = [
+                self._repaint_line(line_number, old_line, new_line)
+                for line_number, (old_line, new_line) in enumerate(
+                    zip(self._drawn_lines, lines), start=1
+                )
+                if old_line != new_line
+            ]
+
+        output.append(move_cursor(len(lines) + 1, 1) + CLEAR_TO_END_OF_SCREEN)
+        self._stream.write("".join(output))
+        self._stream.flush()
+        self._drawn_lines = lines
+
+    def show_separator(self) -> None:
+        """
+        Turns are not separated, since the board is repainted in place.
+        :return: None
+        """
+
+    @staticmethod
+    def _repaint_line(line_number: int, old_line: str, new_line: str) -> str:
+        """
+        Build the output that turns a line on the screen into a new one,
+        writing only from the first character that differs.
+        :param line_number: the line on the screen, starting at 1.
+        :param old_line: what the line shows now.
+        :param new_line: what the line should show.
+        :return: the escape codes and text to write.
+        """
+        common_length = 0
+        for old_character, new_character in zip(old_line, new_line):
+            if old_character != new_character:
+                break
+            common_length += 1
+
+        repaint = move_cursor(line_number, common_length + 1) + new_line[common_length:]
+        if len(new_line) < len(old_line):
+            repaint += CLEAR_TO_END_OF_LINE
+        return repaint
+
+
+DISPLAY_MODES = {
+    "plain": PlainTextDisplay,
+    "ansi": AnsiDiffDisplay,
+}
+
+
+def create_display(
+    display_mode: str,
+    board_renderer: BoardRenderer,
+    stream: Optional[TextIO] = None,
+) -> PlainTextDisplay:
+    """
+    Build the display for a mode, falling back to plain text when the output
+    is not a terminal.
+    :param display_mode: one of the keys in DISPLAY_MODES.
+    :param board_renderer: the renderer of the board to show.
+    :param stream: where to write the output. Defaults to whatever sys.stdout
+    is at the time of writing.
+    :return: the display.
+    """
+    display_class = DISPLAY_MODES[display_mode]
+    output_stream = sys.stdout if stream is None else stream
+    if display_class is not PlainTextDisplay and not output_stream.isatty():
+        display_class = PlainTextDisplay
+    return display_class(board_renderer, stream)
@@ -0,0 +1,179 @@
+"""
+Checks of every board engine against a brute force search for k marks in a
+row, over random games on square and non square boards.
+"""
+
+import random
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+import pytest
+
+from solutions.requirements_group_3_solution.match import BOARD_ENGINES
+
+# Column count, row count and win length
+BOARD_SHAPES = (
+    (3, 3, 3),
+    (4, 4, 3),
+    (4, 4, 4),
+    (5, 3, 3),
+    (3, 5, 3),
+    (6, 4, 4),
+    (7, 7, 4),
+    (9, 9, 5),
+)
+GAMES_PER_SHAPE = 25
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def find_lines_by_brute_force(
+    contents_by_cell: Dict[int, str], column_count: int, row_count: int, win_length: int
+) -> Set[Tuple[str, FrozenSet[int]]]:
+    """
+    Find every run of win_length cells with the same mark, by walking from
+    every cell along every direction.
+    :param contents_by_cell: the mark on every marked cell, by number id.
+    :param column_count: the number of cells in each row.
+    :param row_count: the number of rows.
+    :param win_length: how many marks in a row are needed to win.
+    :return: the mark and the number ids of the cells of each run.
+    """
+    lines = set()
+    for row in range(0, row_count):
+        for column in range(0, column_count):
+            for row_step, column_step in DIRECTIONS:
+                positions = [
+                    (row + step * row_step, column + step * column_step)
+                    for step in range(0, win_length)
+                ]
+                if not all(
+                    0 <= line_row < row_count and 0 <= line_column < column_count
+                    for line_row, line_column in positions
+                ):
+                    continue
+                cell_ids = [
+                    line_row * column_count + line_column + 1
+                    for line_row, line_column in positions
+                ]
+                marks = {contents_by_cell.get(cell_id) for cell_id in cell_ids}
+                if len(marks) == 1 and None not in marks:
+                    lines.add((marks.pop(), frozenset(cell_ids)))
+    return lines
+
+
+def play_random_game(
+    column_count: int, row_count: int, rng: random.Random
+) -> Tuple[Tuple[int, str], ...]:
+    """
+    Pick a random order to play every cell in, alternating marks. The game is
+    not stopped at a win: callers stop where they need to.
+    :param column_count: the number of cells in each row.
+    :param row_count: the number of rows.
+    :param rng: the source of randomness.
+    :return: the number id of every cell played, with its mark.
+    """
+    cell_ids = list(range(1, column_count * row_count + 1))
+    rng.shuffle(cell_ids)
+    return tuple(
+        (cell_id, "XO"[move_index % 2]) for move_index, cell_id in enumerate(cell_ids)
+    )
+
+
+def check_status(
+    board, contents_by_cell: Dict[int, str], last_mark: Optional[str]
+) -> bool:
+    """
+    Check the status a board reports against the brute force search.
+    :param board: the board, of any engine.
+    :param contents_by_cell: the mark on every marked cell, by number id.
+    :param last_mark: the mark of the last move, None if there was none.
+    :return: whether the game is over.
+    """
+    lines = find_lines_by_brute_force(
+        contents_by_cell, board.column_count, board.row_count, board.win_length
+    )
+    assert board.there_is_winning_combo == bool(lines)
+    if lines:
+        winning_cells = frozenset(cell.number_id for cell in board.get_winning_cells())
+        assert (board.get_winning_mark(), winning_cells) in lines
+        assert board.get_winning_mark() == last_mark
+        assert not board.there_is_stalemate
+    else:
+        assert board.there_is_stalemate == (
+            len(contents_by_cell) == board.column_count * board.row_count
+        )
+    return board.there_is_winning_combo or board.there_is_stalemate
+
+
+@pytest.mark.parametrize("engine", sorted(BOARD_ENGINES))
+@pytest.mark.parametrize("column_count, row_count, win_length", BOARD_SHAPES)
+def test_status_after_every_move_matches_brute_force(
+    engine: str, column_count: int, row_count: int, win_length: int
+):
+    """
+    Play random games move by move and check the status after every move.
+    """
+    rng = random.Random(f"{engine}:{column_count}x{row_count}:{win_length}")
+    for _ in range(0, GAMES_PER_SHAPE):
+        board = BOARD_ENGINES[engine](
+            size=column_count, win_length=win_length, row_count=row_count
+        )
+        contents_by_cell: Dict[int, str] = {}
+        assert not check_status(board, contents_by_cell, None)
+        for cell_id, mark in play_random_game(column_count, row_count, rng):
+            board.write_mark_on_cell_if_empty(cell_id, mark)
+            contents_by_cell[cell_id] = mark
+            if check_status(board, contents_by_cell, mark):
+                break
+
+
+@pytest.mark.parametrize("engine", sorted(BOARD_ENGINES))
+@pytest.mark.parametrize("column_count, row_count, win_length", BOARD_SHAPES)
+def test_status_of_boards_built_from_moves_matches_brute_force(
+    engine: str, column_count: int, row_count: int, win_length: int
+):
+    """
+    Build boards from the moves of random games stopped at their first win,
+    so their status is worked out in one pass, and check it.
+    """
+    board_class = BOARD_ENGINES[engine]
+    rng = random.Random(f"batch:{engine}:{column_count}x{row_count}:{win_length}")
+    for _ in range(0, GAMES_PER_SHAPE):
+        moves = []
+        contents_by_cell: Dict[int, str] = {}
+        for cell_id, mark in play_random_game(column_count, row_count, rng):
+            moves.append((cell_id, mark))
+            contents_by_cell[cell_id] = mark
+            if find_lines_by_brute_force(
+                contents_by_cell, column_count, row_count, win_length
+            ):
+                break
+        # Stop at a random point too, so ongoing games are checked as well
+        moves = moves[: rng.randint(0, len(moves))]
+        board = board_class.from_moves(
+            size=column_count, moves=moves, win_length=win_length, row_count=row_count
+        )
+        check_status(board, dict(moves), moves[-1][1] if moves else None)
+
+
+def test_writing_on_a_marked_cell_is_rejected():
+    """
+    Every engine refuses to write over a mark, and keeps the first one.
+    """
+    for board_class in BOARD_ENGINES.values():
+        board = board_class(size=3)
+        board.write_mark_on_cell_if_empty(5, "X")
+        with pytest.raises(ValueError):
+            board.write_mark_on_cell_if_empty(5, "O")
+        assert board.get_empty_cell_ids() == [1, 2, 3, 4, 6, 7, 8, 9]
+
+
+def test_encoded_positions_with_unknown_codes_are_rejected():
+    """
+    Every engine refuses an encoded position with a code that is not a cell
+    code, naming the code.
+    """
+    for board_class in BOARD_ENGINES.values():
+        board = board_class.from_encoded(size=3, encoded_position=[1, 2, 0] * 3)
+        assert board.get_empty_cell_ids() == [3, 6, 9]
+        with pytest.raises(ValueError, match="code 7"):
+            board_class.from_encoded(size=3, encoded_position=[1, 2, 0, 7] + [0] * 5)
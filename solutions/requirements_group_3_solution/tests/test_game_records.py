@@ -0,0 +1,163 @@
+"""
+Round trips of games through record files: written whole or move by move by
+matches, and read back with the streaming reader.
+"""
+
+import random
+
+import pytest
+
+from solutions.requirements_group_3_solution import game_records
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.game_records import (
+    DRAW,
+    PLAYER_1_WON,
+    PLAYER_2_WON,
+    UNFINISHED,
+    GameRecord,
+    GameRecordWriter,
+    read_game_records,
+)
+from solutions.requirements_group_3_solution.simulation import simulate
+
+
+def fields_of(game: GameRecord) -> tuple:
+    """
+    Gather the contents of a record, to compare records.
+    :param game: the record.
+    :return: every field of the record.
+    """
+    return (
+        game.column_count,
+        game.row_count,
+        game.win_length,
+        game.first_player,
+        game.result,
+        bytes(game.moves),
+    )
+
+
+def random_game(rng: random.Random) -> GameRecord:
+    """
+    Make up a record, not necessarily of a game that could be played.
+    :param rng: the source of randomness.
+    :return: the record.
+    """
+    column_count = rng.randint(1, 15)
+    row_count = rng.randint(1, 255 // column_count)
+    cell_ids = list(range(1, column_count * row_count + 1))
+    rng.shuffle(cell_ids)
+    return GameRecord(
+        column_count=column_count,
+        row_count=row_count,
+        win_length=rng.randint(1, max(column_count, row_count)),
+        first_player=rng.choice((1, 2)),
+        result=rng.choice((UNFINISHED, PLAYER_1_WON, PLAYER_2_WON, DRAW)),
+        moves=bytes(cell_ids[: rng.randint(0, len(cell_ids))]),
+    )
+
+
+def test_written_games_are_read_back_unchanged(tmp_path, monkeypatch):
+    """
+    Games written over two sessions are read back in order, including games
+    that straddle the chunks the reader reads the file in.
+    """
+    monkeypatch.setattr(game_records, "READ_CHUNK_SIZE", 7)
+    path = str(tmp_path / "games.ttgr")
+    rng = random.Random(0)
+    games = [random_game(rng) for _ in range(0, 200)]
+
+    with GameRecordWriter(path) as writer:
+        for game in games[:100]:
+            writer.write_game(game)
+    # Appending to an existing file doesn't write its header again
+    with GameRecordWriter(path) as writer:
+        for game in games[100:]:
+            writer.write_game(game)
+
+    assert [fields_of(game) for game in read_game_records(path)] == [
+        fields_of(game) for game in games
+    ]
+
+
+def test_recorded_matches_replay_to_their_result(tmp_path):
+    """
+    Matches recorded move by move replay on a fresh board to the result they
+    were recorded with.
+    """
+    path = str(tmp_path / "matches.ttgr")
+    with GameRecordWriter(path) as writer:
+        report = simulate(
+            50, board_size=4, win_length=3, first_player=2, seed=0, game_recorder=writer
+        )
+
+    games = list(read_game_records(path))
+    assert len(games) == report.games_played == 50
+    for game in games:
+        assert (game.column_count, game.row_count, game.win_length) == (4, 4, 3)
+        board = Board(size=game.column_count, win_length=game.win_length)
+        marks = "OX" if game.first_player == 2 else "XO"
+        for move_index, cell_id in enumerate(game.moves):
+            assert not board.there_is_winning_combo
+            board.write_mark_on_cell_if_empty(cell_id, marks[move_index % 2])
+
+        if board.there_is_winning_combo:
+            expected_result = {"X": PLAYER_1_WON, "O": PLAYER_2_WON}[
+                board.get_winning_mark()
+            ]
+        else:
+            assert board.there_is_stalemate
+            expected_result = DRAW
+        assert game.result == expected_result
+
+
+def test_a_game_left_unfinished_is_written_on_close(tmp_path):
+    """
+    Closing the writer in the middle of a game keeps its moves.
+    """
+    path = str(tmp_path / "unfinished.ttgr")
+    with GameRecordWriter(path) as writer:
+        writer.start_game(column_count=3, row_count=3, win_length=3, first_player=1)
+        writer.record_move(5)
+        writer.record_move(1)
+
+    (game,) = read_game_records(path)
+    assert fields_of(game) == (3, 3, 3, 1, UNFINISHED, bytes([5, 1]))
+
+
+def test_truncated_and_foreign_files_are_rejected(tmp_path):
+    """
+    The reader refuses files that end in the middle of a game or that are
+    not record files.
+    """
+    path = tmp_path / "truncated.ttgr"
+    with GameRecordWriter(str(path)) as writer:
+        writer.write_game(GameRecord(3, 3, 3, 1, DRAW, bytes(range(1, 10))))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        list(read_game_records(str(path)))
+
+    foreign_path = tmp_path / "foreign.ttgr"
+    foreign_path.write_bytes(b"not a record file")
+    with pytest.raises(ValueError):
+        list(read_game_records(str(foreign_path)))
+
+
+def test_moves_and_results_without_a_game_are_rejected(tmp_path):
+    """
+    Recording a move or a result with no game started, or after the game was
+    finished, is refused instead of being written.
+    """
+    path = str(tmp_path / "games.ttgr")
+    with GameRecordWriter(path) as writer:
+        with pytest.raises(ValueError):
+            writer.record_move(5)
+        with pytest.raises(ValueError):
+            writer.finish_game(DRAW)
+        writer.start_game(column_count=3, row_count=3, win_length=3, first_player=1)
+        writer.finish_game(UNFINISHED)
+        with pytest.raises(ValueError):
+            writer.finish_game(DRAW)
+
+    (game,) = read_game_records(path)
+    assert fields_of(game) == (3, 3, 3, 1, UNFINISHED, b"")
@@ -0,0 +1,76 @@
+"""
+Checks that taking moves back with unmake_move leaves every engine in the
+state of a board that only ever had the remaining moves played on it.
+"""
+
+import random
+
+import pytest
+
+from solutions.requirements_group_3_solution.match import BOARD_ENGINES
+from solutions.requirements_group_3_solution.symmetry import get_position
+
+# Column count, row count and win length
+BOARD_SHAPES = ((3, 3, 3), (4, 4, 3), (5, 3, 3), (7, 7, 4))
+SEQUENCES_PER_SHAPE = 40
+
+
+def describe(board) -> tuple:
+    """
+    Gather everything a board exposes about its state.
+    :param board: the board, of any engine.
+    :return: the contents, the status, the winning cells and the empty cells.
+    """
+    winning_cells = (
+        sorted(cell.number_id for cell in board.get_winning_cells())
+        if board.there_is_winning_combo
+        else None
+    )
+    return (
+        get_position(board),
+        board.there_is_winning_combo,
+        board.there_is_stalemate,
+        winning_cells,
+        board.get_empty_cell_ids(),
+    )
+
+
+@pytest.mark.parametrize("engine", sorted(BOARD_ENGINES))
+@pytest.mark.parametrize("column_count, row_count, win_length", BOARD_SHAPES)
+def test_unmake_move_restores_the_state_of_a_fresh_board(
+    engine: str, column_count: int, row_count: int, win_length: int
+):
+    """
+    Make and take back moves at random, and after every step compare the
+    board with a fresh one that has the moves still on the board.
+    """
+    board_class = BOARD_ENGINES[engine]
+    rng = random.Random(f"{engine}:{column_count}x{row_count}:{win_length}")
+
+    def fresh_board(moves):
+        return board_class.from_moves(
+            size=column_count, moves=moves, win_length=win_length, row_count=row_count
+        )
+
+    for _ in range(0, SEQUENCES_PER_SHAPE):
+        board = fresh_board([])
+        moves = []
+        for _ in range(0, 3 * column_count * row_count):
+            game_is_over = board.there_is_winning_combo or board.there_is_stalemate
+            if moves and (game_is_over or rng.random() < 0.3):
+                assert board.unmake_move() == moves.pop()[0]
+            elif not game_is_over:
+                cell_id = rng.choice(board.get_empty_cell_ids())
+                mark = "XO"[len(moves) % 2]
+                board.make_move(cell_id, mark)
+                moves.append((cell_id, mark))
+            assert describe(board) == describe(fresh_board(moves))
+
+
+def test_unmake_move_without_moves_is_rejected():
+    """
+    Every engine refuses to take back a move that was never made.
+    """
+    for board_class in BOARD_ENGINES.values():
+        with pytest.raises(ValueError):
+            board_class(size=3).unmake_move()
@@ -0,0 +1,95 @@
+"""
+Checks of the turn flow of a match: which move sources are asked again after
+choosing a cell that can't be written on, turns after the end, and the reports
+of how moves were chosen.
+"""
+
+import pytest
+
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.match import Match
+from solutions.requirements_group_3_solution.mcts import MctsMoveSource
+from solutions.requirements_group_3_solution.minimax import MinimaxMoveSource
+from solutions.requirements_group_3_solution.move_sources import (
+    CallbackMoveSource,
+    HumanMoveSource,
+    ScriptedMoveSource,
+)
+
+
+def test_a_headless_source_choosing_a_marked_cell_is_not_asked_again():
+    """
+    Two callbacks that always choose the same cell make the second turn
+    raise, instead of asking the callback forever.
+    """
+    match = Match(
+        first_player=1,
+        board_size=3,
+        move_sources={
+            1: CallbackMoveSource(lambda board, mark: 1),
+            2: CallbackMoveSource(lambda board, mark: 1),
+        },
+        verbose=False,
+    )
+    match.play_turn()
+    with pytest.raises(ValueError):
+        match.play_turn()
+    assert match.move_count == 1
+
+
+def test_a_human_choosing_a_marked_cell_is_asked_again(monkeypatch):
+    """
+    A human who picks a marked cell or one off the board gets to pick again.
+    """
+    answers = iter(["5", "10", "1"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    match = Match(
+        first_player=1,
+        board_size=3,
+        move_sources={1: ScriptedMoveSource([5]), 2: HumanMoveSource()},
+        verbose=False,
+    )
+    match.play_turn()
+    match.play_turn()
+    assert match.move_count == 2
+
+
+def test_a_turn_after_the_end_is_rejected():
+    """
+    Once a match is finished, play_turn raises instead of asking for moves.
+    """
+    match = Match(
+        first_player=1,
+        board_size=3,
+        move_sources={
+            1: ScriptedMoveSource([1, 2, 3, 9]),
+            2: ScriptedMoveSource([4, 5]),
+        },
+        verbose=False,
+    )
+    match.play()
+    assert match.is_finished
+    with pytest.raises(ValueError, match="finished"):
+        match.play_turn()
+
+
+@pytest.mark.parametrize(
+    "source_class, search_options",
+    ((MinimaxMoveSource, {}), (MctsMoveSource, {"iterations": 50, "seed": 0})),
+)
+def test_search_figures_are_shown_by_the_match_only(
+    capsys, source_class: type, search_options: dict
+):
+    """
+    A verbose search leaves its figures for the match to show, instead of
+    printing them past the display.
+    """
+    move_source = source_class(verbose=True, **search_options)
+    move_source.choose_cell(Board(size=3), "X")
+    assert capsys.readouterr().out == ""
+    assert move_source.last_move_report == str(move_source.last_search_stats)
+    assert source_class(**search_options).last_move_report is None
+
+    match = Match(first_player=1, board_size=3, move_sources={1: move_source})
+    match.play_turn()
+    assert str(move_source.last_search_stats) in capsys.readouterr().out
@@ -0,0 +1,93 @@
+"""
+Checks of the position ranking against the positions found by walking the
+game tree, on board shapes small enough to walk whole.
+"""
+
+from typing import Set
+
+import pytest
+
+from solutions.requirements_group_3_solution.bitboard import BitBoard
+from solutions.requirements_group_3_solution.position_ranking import PositionRanking
+from solutions.requirements_group_3_solution.symmetry import (
+    EMPTY_CELL,
+    Position,
+    get_position,
+)
+
+# Column count, row count and win length
+BOARD_SHAPES = ((3, 3, 3), (5, 2, 3), (2, 5, 2))
+
+
+def find_positions_by_playing(
+    column_count: int, row_count: int, win_length: int
+) -> Set[Position]:
+    """
+    Walk the game tree, X first and stopping at the first win, and gather
+    every position on the way.
+    :param column_count: the number of cells in each row.
+    :param row_count: the number of rows.
+    :param win_length: how many marks in a row are needed to win.
+    :return: the positions.
+    """
+    board = BitBoard(size=column_count, win_length=win_length, row_count=row_count)
+    positions = set()
+
+    def visit(mark: str) -> None:
+        position = get_position(board)
+        if position in positions:
+            return
+        positions.add(position)
+        if board.there_is_winning_combo or board.there_is_stalemate:
+            return
+        for cell_id in board.get_empty_cell_ids():
+            board.make_move(cell_id, mark)
+            visit("O" if mark == "X" else "X")
+            board.unmake_move()
+
+    visit("X")
+    return positions
+
+
+@pytest.mark.parametrize("column_count, row_count, win_length", BOARD_SHAPES)
+def test_ranks_are_a_bijection_onto_the_playable_positions(
+    column_count: int, row_count: int, win_length: int
+):
+    """
+    Every position of the game tree gets its own index, unranking gives it
+    back, and no index is left over.
+    """
+    positions = find_positions_by_playing(column_count, row_count, win_length)
+    ranking = PositionRanking(column_count, row_count, win_length)
+
+    assert ranking.position_count == len(positions)
+    for position in positions:
+        assert ranking.unrank(ranking.rank_position(position)) == position
+    assert {
+        ranking.unrank(position_index)
+        for position_index in range(0, ranking.position_count)
+    } == positions
+    with pytest.raises(IndexError):
+        ranking.unrank(ranking.position_count)
+
+
+def test_the_tic_tac_toe_ranking_has_every_legal_position():
+    """
+    The 3x3 board has the well known 5478 legal positions, and positions that
+    can't be played to are refused.
+    """
+    ranking = PositionRanking(3, 3, 3)
+    assert ranking.position_count == 5478
+
+    for unplayable_position in (
+        "XX.......",  # X moved twice in a row
+        "XXXOOO...",  # Both players have a line
+        "XXXOO.O..",  # O kept playing after the line of X
+    ):
+        with pytest.raises(ValueError):
+            ranking.rank_position(
+                tuple(
+                    EMPTY_CELL if content == "." else content
+                    for content in unplayable_position
+                )
+            )
@@ -0,0 +1,129 @@
+"""
+Checks of the statistics computed from record files, against the results the
+simulations that wrote the records reported.
+"""
+
+from collections import Counter
+
+import pytest
+
+from solutions.requirements_group_3_solution.game_records import (
+    DRAW,
+    PLAYER_1_WON,
+    PLAYER_2_WON,
+    UNFINISHED,
+    GameRecord,
+    GameRecordWriter,
+)
+from solutions.requirements_group_3_solution.record_analytics import (
+    DRAWN,
+    FIRST_PLAYER_WON,
+    NOT_FINISHED,
+    SECOND_PLAYER_WON,
+    compute_statistics,
+    read_all_game_records,
+    replay_game,
+)
+from solutions.requirements_group_3_solution.simulation import simulate
+
+# Games that can't be replayed: a cell played twice, a cell off the board and
+# a move after X completed the top row
+INVALID_GAMES = (
+    GameRecord(3, 3, 3, 1, DRAW, bytes([1, 1])),
+    GameRecord(3, 3, 3, 1, DRAW, bytes([10])),
+    GameRecord(3, 3, 3, 1, PLAYER_1_WON, bytes([1, 4, 2, 5, 3, 9])),
+)
+# X completes the top row, but the record says O won
+MISMATCHED_GAME = GameRecord(3, 3, 3, 1, PLAYER_2_WON, bytes([1, 4, 2, 5, 3]))
+UNFINISHED_GAME = GameRecord(3, 3, 3, 2, UNFINISHED, bytes([5]))
+
+
+def test_statistics_of_simulated_games(tmp_path):
+    """
+    Record simulated games over two files, along with games that can't be
+    replayed and a game recorded with the wrong result, and check every rate
+    and count of the statistics.
+    """
+    simulated_path = str(tmp_path / "simulated.ttgr")
+    with GameRecordWriter(simulated_path) as writer:
+        report_3x3 = simulate(
+            60, board_size=3, first_player=1, seed=0, game_recorder=writer
+        )
+        report_4x4 = simulate(
+            40, board_size=4, win_length=3, first_player=2, seed=1, game_recorder=writer
+        )
+    handmade_path = str(tmp_path / "handmade.ttgr")
+    with GameRecordWriter(handmade_path) as writer:
+        for game in INVALID_GAMES + (MISMATCHED_GAME, UNFINISHED_GAME):
+            writer.write_game(game)
+
+    statistics = compute_statistics(
+        read_all_game_records([simulated_path, handmade_path])
+    ).as_dict()
+
+    assert statistics["games_counted"] == 100 + 2
+    assert statistics["invalid_games"] == len(INVALID_GAMES)
+    assert statistics["mismatched_results"] == 1
+
+    # X moved first on 3x3, and the mismatched game is counted as X's win
+    # while the unfinished game only counts as unfinished
+    shape_3x3 = statistics["by_shape"]["3x3 k=3"]
+    assert shape_3x3["games"] == 62
+    assert shape_3x3[FIRST_PLAYER_WON] == pytest.approx(
+        (report_3x3.wins_by_player[1] + 1) / 62
+    )
+    assert shape_3x3[SECOND_PLAYER_WON] == pytest.approx(
+        report_3x3.wins_by_player[2] / 62
+    )
+    assert shape_3x3[DRAWN] == pytest.approx(report_3x3.stalemates / 62)
+    assert shape_3x3[NOT_FINISHED] == pytest.approx(1 / 62)
+
+    # O moved first on 4x4, so its wins are the first player's
+    shape_4x4 = statistics["by_shape"]["4x4 k=3"]
+    assert shape_4x4["games"] == 40
+    assert shape_4x4[FIRST_PLAYER_WON] == pytest.approx(
+        report_4x4.wins_by_player[2] / 40
+    )
+    assert shape_4x4[SECOND_PLAYER_WON] == pytest.approx(
+        report_4x4.wins_by_player[1] / 40
+    )
+    assert shape_4x4[DRAWN] == pytest.approx(report_4x4.stalemates / 40)
+
+    assert statistics["by_first_player"][1]["games"] == 61
+    assert statistics["by_first_player"][2]["games"] == 41
+    assert statistics["by_first_player"][2][NOT_FINISHED] == pytest.approx(1 / 41)
+
+
+def test_games_are_grouped_by_opening(tmp_path):
+    """
+    Each opening move gets the outcomes of the games that started with it,
+    and the openings of a shape add up to its games.
+    """
+    path = str(tmp_path / "simulated.ttgr")
+    with GameRecordWriter(path) as writer:
+        simulate(80, board_size=3, seed=2, game_recorder=writer)
+
+    games = list(read_all_game_records([path]))
+    expected_outcomes = Counter()
+    for game in games:
+        expected_outcomes[game.moves[0], replay_game(game)] += 1
+
+    by_opening = compute_statistics(games).as_dict()["by_opening"]
+    assert sum(rates["games"] for rates in by_opening.values()) == len(games)
+    for cell_number in range(1, 10):
+        opening_games = sum(
+            count
+            for (opening, _), count in expected_outcomes.items()
+            if opening == cell_number
+        )
+        rates = by_opening.get(f"3x3 k=3 cell {cell_number}")
+        if not opening_games:
+            assert rates is None
+            continue
+        assert rates["games"] == opening_games
+        assert rates[FIRST_PLAYER_WON] == pytest.approx(
+            expected_outcomes[cell_number, PLAYER_1_WON] / opening_games
+        )
+        assert rates[DRAWN] == pytest.approx(
+            expected_outcomes[cell_number, DRAW] / opening_games
+        )
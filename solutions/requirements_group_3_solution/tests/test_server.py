@@ -0,0 +1,201 @@
+"""
+Checks of the match server protocol, with real connections to a server on a
+free local port.
+"""
+
+import asyncio
+import itertools
+import socket
+
+from solutions.requirements_group_3_solution import server as server_module
+from solutions.requirements_group_3_solution.server import MatchClient, MatchServer
+
+HOST = "127.0.0.1"
+STREAM_LIMIT = 1024
+TIMEOUT = 5
+
+
+async def start_server(server: MatchServer) -> asyncio.AbstractServer:
+    """
+    Start serving on a free port.
+    :param server: the match server.
+    :return: the asyncio server, with the port in its sockets.
+    """
+    return await asyncio.start_server(
+        server.handle_connection, HOST, 0, limit=STREAM_LIMIT
+    )
+
+
+def port_of(tcp_server: asyncio.AbstractServer) -> int:
+    """
+    Find the port a server listens on.
+    :param tcp_server: the asyncio server.
+    :return: the port.
+    """
+    return tcp_server.sockets[0].getsockname()[1]
+
+
+def test_create_join_and_move_until_a_win():
+    """
+    Two clients play a match to a win, each seeing the other's moves.
+    """
+
+    async def play() -> None:
+        server = MatchServer()
+        tcp_server = await start_server(server)
+        creator = await MatchClient.connect(HOST, port_of(tcp_server))
+        joiner = await MatchClient.connect(HOST, port_of(tcp_server))
+
+        assert await creator.request("CREATE 3") == "CREATED 1 1"
+        assert await creator.request("STATE 1") == "STATE 1 waiting 1 3x3 ........."
+        assert await creator.request("MOVE 1 5") == (
+            "ERROR Waiting for the other player to join."
+        )
+        assert await creator.request("JOIN 1") == (
+            "ERROR You are already playing match 1."
+        )
+
+        assert await joiner.request("JOIN 1") == "JOINED 1 2"
+        update = await asyncio.wait_for(creator.updates.get(), TIMEOUT)
+        assert update == "UPDATE 1 playing 1 3x3 ........."
+
+        assert await joiner.request("MOVE 1 5") == "ERROR It's not your turn."
+        for mover, other, cell_id in (
+            (creator, joiner, 1),
+            (joiner, creator, 4),
+            (creator, joiner, 2),
+            (joiner, creator, 5),
+        ):
+            state = await mover.request(f"MOVE 1 {cell_id}")
+            assert state.startswith("STATE 1 playing")
+            update = await asyncio.wait_for(other.updates.get(), TIMEOUT)
+            assert update == f"UPDATE{state[len('STATE'):]}"
+
+        assert await joiner.request("MOVE 1 3") == "ERROR It's not your turn."
+        assert await creator.request("MOVE 1 5") == (
+            "ERROR Can't write on cell, it has contents"
+        )
+        assert await creator.request("MOVE 1 10") == "ERROR There is no cell 10."
+        assert await creator.request("MOVE 1 3") == "STATE 1 won-1 2 3x3 XXXOO...."
+        assert await asyncio.wait_for(joiner.updates.get(), TIMEOUT) == (
+            "UPDATE 1 won-1 2 3x3 XXXOO...."
+        )
+        assert await joiner.request("MOVE 1 9") == "ERROR The match is finished."
+
+        await creator.close()
+        await joiner.close()
+        tcp_server.close()
+        await tcp_server.wait_closed()
+
+    asyncio.run(play())
+
+
+def test_undecodable_and_oversized_lines_are_answered_with_errors():
+    """
+    A line that is not UTF-8 gets an error and the connection goes on, while
+    a line over the stream limit gets an error and closes the connection.
+    """
+
+    async def send_bad_lines() -> None:
+        server = MatchServer()
+        tcp_server = await start_server(server)
+        reader, writer = await asyncio.open_connection(HOST, port_of(tcp_server))
+
+        writer.write(b"CREATE \xff\n" + b"CREATE\n")
+        await writer.drain()
+        assert await reader.readline() == b"ERROR Requests must be UTF-8 text.\n"
+        assert await reader.readline() == b"CREATED 1 1\n"
+
+        writer.write(b"X" * (2 * STREAM_LIMIT) + b"\n")
+        await writer.drain()
+        assert await reader.readline() == b"ERROR Request line too long.\n"
+        assert await asyncio.wait_for(reader.read(), TIMEOUT) == b""
+        # The only player of the match left, so it isn't hosted anymore
+        assert server.match_count == 0
+
+        writer.close()
+        tcp_server.close()
+        await tcp_server.wait_closed()
+
+    asyncio.run(send_bad_lines())
+
+
+def test_a_player_leaving_ends_the_match():
+    """
+    When a player disconnects in the middle of a match, the other player is
+    told who left, and the match is no longer hosted.
+    """
+
+    async def leave() -> None:
+        server = MatchServer()
+        tcp_server = await start_server(server)
+        creator = await MatchClient.connect(HOST, port_of(tcp_server))
+        joiner = await MatchClient.connect(HOST, port_of(tcp_server))
+
+        assert await creator.request("CREATE 3") == "CREATED 1 1"
+        assert await joiner.request("JOIN 1") == "JOINED 1 2"
+        await asyncio.wait_for(creator.updates.get(), TIMEOUT)
+        assert await creator.request("MOVE 1 1") == "STATE 1 playing 2 3x3 X........"
+
+        await joiner.close()
+        assert await asyncio.wait_for(creator.updates.get(), TIMEOUT) == (
+            "UPDATE 1 left-2 2 3x3 X........"
+        )
+        assert server.match_count == 0
+        assert await creator.request("MOVE 1 2") == "ERROR There is no match 1."
+
+        await creator.close()
+        tcp_server.close()
+        await tcp_server.wait_closed()
+
+    asyncio.run(leave())
+
+
+def test_a_client_that_does_not_read_its_updates_is_dropped(monkeypatch):
+    """
+    A player that stops reading falls behind on updates until it is
+    disconnected, which ends its matches instead of buffering without limit.
+    """
+    monkeypatch.setattr(server_module, "MAX_UPDATE_BACKLOG", 16 * 1024)
+    match_count = 100
+
+    async def fall_behind() -> None:
+        server = MatchServer()
+        connection_count = itertools.count()
+
+        async def handle_with_small_buffers(reader, writer):
+            # Shrink the buffers of the slow player, the second connection,
+            # so its updates pile up on the server side quickly
+            if next(connection_count) == 1:
+                writer.get_extra_info("socket").setsockopt(
+                    socket.SOL_SOCKET, socket.SO_SNDBUF, 4096
+                )
+            await server.handle_connection(reader, writer)
+
+        tcp_server = await asyncio.start_server(handle_with_small_buffers, HOST, 0)
+        creator = await MatchClient.connect(HOST, port_of(tcp_server))
+        slow_socket = socket.socket()
+        slow_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+        slow_socket.connect((HOST, port_of(tcp_server)))
+        slow_reader, slow_writer = await asyncio.open_connection(sock=slow_socket)
+
+        for match_id in range(1, match_count + 1):
+            assert await creator.request("CREATE 19") == f"CREATED {match_id} 1"
+            slow_writer.write(f"JOIN {match_id}\n".encode())
+            assert await slow_reader.readline() == f"JOINED {match_id} 2\n".encode()
+            await asyncio.wait_for(creator.updates.get(), TIMEOUT)
+
+        # Each move sends the slow player its 19x19 board, which it never reads
+        slow_writer.transport.pause_reading()
+        for match_id in range(1, match_count + 1):
+            await creator.request(f"MOVE {match_id} 1")
+        update = await asyncio.wait_for(creator.updates.get(), TIMEOUT)
+        assert update.split()[2] == "left-2"
+        assert server.match_count == 0
+
+        slow_writer.close()
+        await creator.close()
+        tcp_server.close()
+        await tcp_server.wait_closed()
+
+    asyncio.run(fall_behind())
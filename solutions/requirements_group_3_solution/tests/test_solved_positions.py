@@ -0,0 +1,136 @@
+"""
+Checks of the solved positions file: the values of every 3x3 position against
+a minimax search, and the checks made when a file is opened or looked up in.
+"""
+
+import pytest
+
+from solutions.requirements_group_3_solution.board import Board
+from solutions.requirements_group_3_solution.minimax import WIN_SCORE, MinimaxMoveSource
+from solutions.requirements_group_3_solution.move_sources import ScriptedMoveSource
+from solutions.requirements_group_3_solution.position_ranking import PositionRanking
+from solutions.requirements_group_3_solution.solved_positions import (
+    DRAW,
+    LOSS,
+    WIN,
+    PositionSolver,
+    SolvedPositions,
+    SolvedPositionsMoveSource,
+)
+from solutions.requirements_group_3_solution.symmetry import get_position
+
+
+def write_solved_file(path: str, column_count: int = 3, row_count: int = 3) -> str:
+    """
+    Solve every position of a board shape, with lines across the board, and
+    write the file.
+    :param path: where to write the file.
+    :param column_count: the number of cells in each row.
+    :param row_count: the number of rows.
+    :return: the path of the file.
+    """
+    solver = PositionSolver(column_count, row_count, min(column_count, row_count))
+    solver.solve_all()
+    solver.write(path)
+    return path
+
+
+def value_of_score(score: int) -> int:
+    """
+    Turn a minimax score into a game value.
+    :param score: the score, for the player that moves.
+    :return: WIN, LOSS or DRAW.
+    """
+    if score > WIN_SCORE // 2:
+        return WIN
+    if score < -WIN_SCORE // 2:
+        return LOSS
+    return DRAW
+
+
+def test_every_3x3_value_matches_minimax(tmp_path):
+    """
+    Every 3x3 position still being played has the value a full minimax search
+    gives it, and its best cell keeps that value.
+    """
+    solved_positions = SolvedPositions(write_solved_file(str(tmp_path / "3x3.ttsp")))
+    ranking = PositionRanking(3, 3, 3)
+    minimax = MinimaxMoveSource()
+
+    checked_count = 0
+    for position_index in range(0, ranking.position_count):
+        board = ranking.board_at(position_index)
+        if board.there_is_winning_combo or board.there_is_stalemate:
+            continue
+        position = get_position(board)
+        mark = "X" if position.count("X") == position.count("O") else "O"
+        value, best_cell = solved_positions.lookup(board, mark)
+
+        minimax.choose_cell(board, mark)
+        assert value == value_of_score(minimax.last_search_stats.best_score)
+
+        board.write_mark_on_cell_if_empty(best_cell, mark)
+        if not board.there_is_winning_combo:
+            opponent_value, _ = solved_positions.lookup(
+                board, "O" if mark == "X" else "X"
+            )
+            assert {WIN: LOSS, LOSS: WIN, DRAW: DRAW}[opponent_value] == value
+        checked_count += 1
+
+    assert checked_count == 4520
+    solved_positions.close()
+
+
+def test_positions_where_o_moved_first_are_looked_up_with_swapped_marks(tmp_path):
+    """
+    A position where O moved first has the value of the same position with
+    the marks swapped.
+    """
+    solved_positions = SolvedPositions(write_solved_file(str(tmp_path / "3x3.ttsp")))
+    o_first = Board.from_moves(size=3, moves=[(1, "O"), (5, "X"), (9, "O")])
+    x_first = Board.from_moves(size=3, moves=[(1, "X"), (5, "O"), (9, "X")])
+    assert solved_positions.lookup(o_first, "X") == solved_positions.lookup(
+        x_first, "O"
+    )
+    solved_positions.close()
+
+
+def test_files_of_the_wrong_size_or_kind_are_rejected(tmp_path):
+    """
+    Opening refuses files that are not solved positions files or that don't
+    have one entry per position of their board shape.
+    """
+    path = tmp_path / "3x3.ttsp"
+    write_solved_file(str(path))
+    contents = path.read_bytes()
+
+    for bad_contents in (
+        b"TTSP",  # Shorter than the header
+        b"NOPE" + contents[4:],  # Another kind of file
+        contents[:-1],  # One entry missing
+        contents + b"\0",  # One entry too many
+    ):
+        path.write_bytes(bad_contents)
+        with pytest.raises(ValueError):
+            SolvedPositions(str(path))
+
+
+def test_boards_of_another_shape_are_not_looked_up(tmp_path):
+    """
+    Boards and positions of another shape are refused, and the move source
+    asks its fallback for them instead.
+    """
+    solved_positions = SolvedPositions(write_solved_file(str(tmp_path / "3x3.ttsp")))
+    other_board = Board(size=4, win_length=3)
+
+    assert solved_positions.covers(Board(size=3))
+    assert not solved_positions.covers(other_board)
+    assert not solved_positions.covers(Board(size=3, win_length=2))
+    with pytest.raises(ValueError):
+        solved_positions.lookup(other_board, "X")
+    with pytest.raises(ValueError):
+        solved_positions.lookup_position(get_position(other_board), "X")
+
+    move_source = SolvedPositionsMoveSource(solved_positions, ScriptedMoveSource([7]))
+    assert move_source.choose_cell(other_board, "X") == 7
+    solved_positions.close()
@@ -0,0 +1,121 @@
+"""
+Checks that the Zobrist hashes kept up to date move by move match the ones of
+a fresh board with the same position, on every engine.
+"""
+
+import random
+
+import pytest
+
+from solutions.requirements_group_3_solution.match import BOARD_ENGINES
+from solutions.requirements_group_3_solution.symmetry import get_board_symmetries
+
+# Column count and row count, with lines across the whole board to win
+BOARD_SHAPES = ((3, 3), (4, 4), (4, 3), (5, 5))
+SEQUENCES_PER_SHAPE = 40
+
+
+def play_random_moves(column_count: int, row_count: int, rng: random.Random) -> list:
+    """
+    Play a random number of random moves, stopping early if the game ends.
+    :param column_count: the number of cells in each row.
+    :param row_count: the number of rows.
+    :param rng: the source of randomness.
+    :return: the number id of every cell played, with its mark.
+    """
+    board = BOARD_ENGINES["cells"](size=column_count, row_count=row_count)
+    moves = []
+    for _ in range(0, rng.randint(0, column_count * row_count)):
+        if board.there_is_winning_combo or board.there_is_stalemate:
+            break
+        move = (rng.choice(board.get_empty_cell_ids()), "XO"[len(moves) % 2])
+        board.write_mark_on_cell_if_empty(*move)
+        moves.append(move)
+    return moves
+
+
+@pytest.mark.parametrize("engine", sorted(BOARD_ENGINES))
+@pytest.mark.parametrize("column_count, row_count", BOARD_SHAPES)
+def test_hashes_match_a_fresh_board(engine: str, column_count: int, row_count: int):
+    """
+    Make, take back and write moves at random, and after every step compare
+    the hashes with the ones of a fresh board with the moves still on it.
+    """
+    board_class = BOARD_ENGINES[engine]
+    rng = random.Random(f"{engine}:{column_count}x{row_count}")
+
+    def fresh_board(moves):
+        return board_class.from_moves(
+            size=column_count, moves=moves, row_count=row_count
+        )
+
+    for _ in range(0, SEQUENCES_PER_SHAPE):
+        board = fresh_board([])
+        moves = []
+        for _ in range(0, 3 * column_count * row_count):
+            game_is_over = board.there_is_winning_combo or board.there_is_stalemate
+            if moves and (game_is_over or rng.random() < 0.3):
+                board.unmake_move()
+                moves.pop()
+            else:
+                cell_id = rng.choice(board.get_empty_cell_ids())
+                mark = "XO"[len(moves) % 2]
+                board.make_move(cell_id, mark)
+                moves.append((cell_id, mark))
+
+            expected = fresh_board(moves)
+            assert board.zobrist_hash == expected.zobrist_hash
+            assert board.symmetric_zobrist_hashes == expected.symmetric_zobrist_hashes
+
+
+@pytest.mark.parametrize("column_count, row_count", BOARD_SHAPES)
+def test_hashes_are_the_same_across_engines_and_move_orders(
+    column_count: int, row_count: int
+):
+    """
+    A position has the same hashes whatever the engine and the order its
+    moves were played in.
+    """
+    rng = random.Random(f"{column_count}x{row_count}")
+
+    for _ in range(0, SEQUENCES_PER_SHAPE):
+        moves = play_random_moves(column_count, row_count, rng)
+        shuffled_moves = rng.sample(moves, len(moves))
+
+        hashes = set()
+        for board_class in BOARD_ENGINES.values():
+            for move_order in (moves, shuffled_moves):
+                board = board_class(size=column_count, row_count=row_count)
+                for cell_id, mark in move_order:
+                    board.write_mark_on_cell_if_empty(cell_id, mark)
+                hashes.add(board.symmetric_zobrist_hashes)
+        assert len(hashes) == 1
+
+
+@pytest.mark.parametrize("column_count, row_count", BOARD_SHAPES)
+def test_symmetric_hashes_are_the_hashes_of_the_moved_positions(
+    column_count: int, row_count: int
+):
+    """
+    Each symmetric hash is the hash of the position moved by that symmetry.
+    """
+    symmetries = get_board_symmetries(column_count=column_count, row_count=row_count)
+    rng = random.Random(f"symmetries:{column_count}x{row_count}")
+
+    for _ in range(0, SEQUENCES_PER_SHAPE):
+        moves = play_random_moves(column_count, row_count, rng)
+        board = BOARD_ENGINES["cells"].from_moves(
+            size=column_count, moves=moves, row_count=row_count
+        )
+        for transform_index, symmetric_hash in enumerate(
+            board.symmetric_zobrist_hashes
+        ):
+            transformed_board = BOARD_ENGINES["cells"].from_moves(
+                size=column_count,
+                moves=[
+                    (symmetries.to_canonical_cell(cell_id, transform_index), mark)
+                    for cell_id, mark in moves
+                ],
+                row_count=row_count,
+            )
+            assert transformed_board.zobrist_hash == symmetric_hash
@@ -0,0 +1,94 @@
+"""
+Zobrist hashing of board positions: every (mark, cell) pair gets a random 64
+bit key, and the hash of a position is the XOR of the keys of its marks, so
+it can be updated with a single XOR when a mark is written or taken back.
+"""
+
+import random
+from functools import lru_cache
+from operator import xor
+from typing import Dict, Tuple
+
+from solutions.requirements_group_3_solution.symmetry import get_board_symmetries
+
+ZOBRIST_SEED = 20210416
+KEY_BITS = 64
+
+ZobristHashes = Tuple[int, ...]
+
+
+class ZobristTable:
+    """
+    The keys of every mark on every cell of a board shape.
+
+    Boards keep one hash per symmetry of their shape, in the order of
+    BoardSymmetries.transforms, the first being the hash of the position
+    itself. The keys of a cell are therefore a tuple with one key per
+    symmetry: the key of the cell the original one is moved to by that
+    symmetry. Keys are derived from the seed, the shape and the mark, so they
+    are the same on every run.
+    """
+
+    def __init__(self, column_count: int, row_count: int, seed: int = ZOBRIST_SEED):
+        """
+        Prepare the table for a board shape. Keys are generated for each mark
+        the first time it is used.
+        :param column_count: the number of cells in each row of the board.
+        :param row_count: the number of rows of the board.
+        :param seed: the seed the keys are derived from.
+        """
+        self.column_count = column_count
+        self.row_count = row_count
+        self.seed = seed
+        self._inverse_transforms = get_board_symmetries(
+            column_count=column_count, row_count=row_count
+        ).inverse_transforms
+        self.empty_hashes: ZobristHashes = (0,) * len(self._inverse_transforms)
+        self._keys_by_mark: Dict[str, Tuple[ZobristHashes, ...]] = {}
+
+    def toggle(
+        self, hashes: ZobristHashes, cell_number: int, mark: str
+    ) -> ZobristHashes:
+        """
+        Add a mark on a cell to the hashes of a position, or take it out, since
+        both are the same XOR.
+        :param hashes: the hashes of the position, one per symmetry.
+        :param cell_number: the number id of the cell.
+        :param mark: the mark on the cell.
+        :return: the updated hashes.
+        """
+        keys = self._keys_by_mark.get(mark) or self._generate_keys(mark)
+        return tuple(map(xor, hashes, keys[cell_number - 1]))
+
+    def _generate_keys(self, mark: str) -> Tuple[ZobristHashes, ...]:
+        """
+        Generate the keys of a mark that is used for the first time.
+        :param mark: the mark.
+        :return: the keys of the mark on every cell, by cell index, one per
+        symmetry.
+        """
+        rng = random.Random(f"{self.seed}:{self.column_count}x{self.row_count}:{mark}")
+        cell_keys = [
+            rng.getrandbits(KEY_BITS)
+            for _ in range(0, self.column_count * self.row_count)
+        ]
+        self._keys_by_mark[mark] = tuple(
+            tuple(
+                cell_keys[inverse_transform[cell_index]]
+                for inverse_transform in self._inverse_transforms
+            )
+            for cell_index in range(0, len(cell_keys))
+        )
+        return self._keys_by_mark[mark]
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_table(column_count: int, row_count: int) -> ZobristTable:
+    """
+    Get the Zobrist table of a board shape, building it only the first time
+    that shape is requested.
+    :param column_count: the number of cells in each row of the board.
+    :param row_count: the number of rows of the board.
+    :return: the shared table.
+    """
+    return ZobristTable(column_count=column_count, row_count=row_count)